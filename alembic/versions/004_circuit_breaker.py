@@ -0,0 +1,41 @@
+"""Add circuit_breaker table shared by the fetcher workers
+
+Revision ID: 004_circuit_breaker
+Revises: 003_conflicting_schema
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+# pylint: disable=C0103
+revision: str = "004_circuit_breaker"
+down_revision: Union[str, None] = "003_conflicting_schema"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+# pylint: enable=C0103
+
+
+def upgrade() -> None:
+    """Create circuit_breaker table, one row per origin host."""
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS circuit_breaker (
+            id TEXT PRIMARY KEY,  -- host name
+            state TEXT NOT NULL,
+            opened_at DOUBLE PRECISION,  -- unix time
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+    op.execute("""
+        CREATE TRIGGER update_circuit_breaker_updated_at
+            BEFORE UPDATE ON circuit_breaker
+            FOR EACH ROW EXECUTE FUNCTION update_updated_at_column()
+        """)
+
+
+def downgrade() -> None:
+    """Drop circuit_breaker table."""
+    op.execute("DROP TABLE IF EXISTS circuit_breaker")
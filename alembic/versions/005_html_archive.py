@@ -0,0 +1,40 @@
+"""Add html_blob, html_ref and html_dictionary tables for the raw page archive
+
+Revision ID: 005_html_archive
+Revises: 004_circuit_breaker
+Create Date: 2026-10-17
+"""
+
+import os
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+# pylint: disable=C0103
+revision: str = "005_html_archive"
+down_revision: Union[str, None] = "004_circuit_breaker"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+# pylint: enable=C0103
+
+
+def get_sql_file_path(filename: str) -> str:
+    """Get the full path to a SQL file in the versions directory."""
+    return os.path.join(os.path.dirname(__file__), filename)
+
+
+def upgrade() -> None:
+    """Create the raw page archive tables."""
+    sql_file = get_sql_file_path("005_html_archive_up.sql")
+    with open(sql_file, "r", encoding="utf-8") as f:
+        sql = f.read()
+    op.execute(sql)
+
+
+def downgrade() -> None:
+    """Drop the raw page archive tables."""
+    sql_file = get_sql_file_path("005_html_archive_down.sql")
+    with open(sql_file, "r", encoding="utf-8") as f:
+        sql = f.read()
+    op.execute(sql)
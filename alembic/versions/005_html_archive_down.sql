@@ -0,0 +1,10 @@
+-- Raw Page Archive Migration - DOWNGRADE
+-- Revision ID: 005_html_archive
+-- Revises: 004_circuit_breaker
+-- Create Date: 2026-10-17
+
+DROP TRIGGER IF EXISTS update_html_ref_updated_at ON html_ref;
+
+DROP TABLE IF EXISTS html_ref CASCADE;
+DROP TABLE IF EXISTS html_blob CASCADE;
+DROP TABLE IF EXISTS html_dictionary CASCADE;
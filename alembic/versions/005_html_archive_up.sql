@@ -0,0 +1,48 @@
+-- Raw Page Archive Migration
+-- Revision ID: 005_html_archive
+-- Revises: 004_circuit_breaker
+-- Create Date: 2026-10-17
+--
+-- Mapping:
+--   src/adapters/archive/postgresql.py -> html_blob, html_ref, html_dictionary
+
+-- ----------------------------------------------------------------------------
+-- Table: html_dictionary
+-- zstd dictionaries trained on receipt pages
+-- ----------------------------------------------------------------------------
+CREATE TABLE html_dictionary (
+    id BIGINT PRIMARY KEY,  -- zstd dictionary id
+    data BYTEA NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- ----------------------------------------------------------------------------
+-- Table: html_blob
+-- zstd compressed pages, keyed by content
+-- ----------------------------------------------------------------------------
+CREATE TABLE html_blob (
+    id TEXT PRIMARY KEY,  -- SHA-256 of the raw page
+    data BYTEA NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- the data is compressed already; EXTERNAL skips pglz and lets substring()
+-- reads fetch only the TOAST chunks they need
+ALTER TABLE html_blob ALTER COLUMN data SET STORAGE EXTERNAL;
+
+-- ----------------------------------------------------------------------------
+-- Table: html_ref
+-- latest page fetched for a receipt url
+-- ----------------------------------------------------------------------------
+CREATE TABLE html_ref (
+    id TEXT PRIMARY KEY,  -- MD5 hash of url
+    blob_id TEXT NOT NULL REFERENCES html_blob(id),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_html_ref_blob_id ON html_ref (blob_id);
+
+CREATE TRIGGER update_html_ref_updated_at
+    BEFORE UPDATE ON html_ref
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
@@ -0,0 +1,45 @@
+"""Add a GiST indexed location point to shop, generated from osm_data
+
+Revision ID: 006_shop_location
+Revises: 005_html_archive
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+# pylint: disable=C0103
+revision: str = "006_shop_location"
+down_revision: Union[str, None] = "005_html_archive"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+# pylint: enable=C0103
+
+# osm_data keeps lat and lon as strings, anything but a number gives no location
+NUMBER = r"^-?[0-9]+(\.[0-9]+)?$"
+
+
+def upgrade() -> None:
+    """Add shop.location = point(lon, lat) and its GiST index for box and KNN queries."""
+    op.execute(f"""
+        ALTER TABLE shop ADD COLUMN IF NOT EXISTS location point
+        GENERATED ALWAYS AS (
+            CASE WHEN osm_data->>'lat' ~ '{NUMBER}' AND osm_data->>'lon' ~ '{NUMBER}'
+            THEN point(
+                (osm_data->>'lon')::double precision,
+                (osm_data->>'lat')::double precision
+            )
+            END
+        ) STORED
+        """)
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_shop_location ON shop USING GIST (location)"
+    )
+
+
+def downgrade() -> None:
+    """Drop shop.location and its index."""
+    op.execute("DROP INDEX IF EXISTS idx_shop_location")
+    op.execute("ALTER TABLE shop DROP COLUMN IF EXISTS location")
@@ -0,0 +1,37 @@
+"""Add osm_lookup table caching the Nominatim lookups
+
+Revision ID: 007_osm_lookup
+Revises: 006_shop_location
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+# pylint: disable=C0103
+revision: str = "007_osm_lookup"
+down_revision: Union[str, None] = "006_shop_location"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+# pylint: enable=C0103
+
+
+def upgrade() -> None:
+    """Create osm_lookup table, one row per OSM id."""
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS osm_lookup (
+            id TEXT PRIMARY KEY,  -- get_osm_id, e.g. N123
+            data JSONB NOT NULL,  -- {} when Nominatim doesn't know the id
+            fetched_at DOUBLE PRECISION NOT NULL  -- unix time
+        )
+        """)
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_osm_lookup_fetched_at ON osm_lookup (fetched_at)"
+    )
+
+
+def downgrade() -> None:
+    """Drop osm_lookup table."""
+    op.execute("DROP TABLE IF EXISTS osm_lookup")
@@ -0,0 +1,78 @@
+"""Receipt pages used by the benchmarks: the sfs_md stubs plus synthetic large ones."""
+
+import html
+import json
+import os
+from glob import glob
+
+from src.parsers.sfs_md.receipt_parser import (
+    INITIAL_DATA_ANCHOR,
+    RECEIPT_COMPONENT_NAME,
+)
+from src.tests import get_stub_file_path
+from src.tests.stubs.receipts.sfs_md.expected_objects import (
+    KL_RECEIPT,
+    LIN_RECEIPT,
+    LIN_RECEIPT_2,
+    NANU_RECEIPT,
+)
+
+SECTION_DELIMITER = "````````````````````````````````````````````````"
+# purchase lines of the synthetic receipts, the largest real ones have ~80
+SYNTHETIC_SIZES = (100, 500)
+STUB_URLS = {
+    "kaufland": KL_RECEIPT.receipt_url,
+    "linella": LIN_RECEIPT.receipt_url,
+    "linella2": LIN_RECEIPT_2.receipt_url,
+    "nanu": NANU_RECEIPT.receipt_url,
+}
+
+
+def load_stub_pages() -> dict[str, tuple[str, bytes]]:
+    """Return {stub name: (receipt url, page bytes)} for every sfs_md stub."""
+    pages = {}
+    stubs_glob = get_stub_file_path(os.path.join("receipts", "sfs_md", "*.html"))
+    for path in sorted(glob(stubs_glob)):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, "rb") as file:
+            pages[name] = (STUB_URLS.get(name, KL_RECEIPT.receipt_url), file.read())
+    return pages
+
+
+def _attribute_bounds(page: str) -> tuple[int, int]:
+    start = page.find(INITIAL_DATA_ANCHOR)
+    while start != -1:
+        start += len(INITIAL_DATA_ANCHOR)
+        end = page.index('"', start)
+        if RECEIPT_COMPONENT_NAME in page[start:end]:
+            return start, end
+        start = page.find(INITIAL_DATA_ANCHOR, end)
+    raise ValueError("receipt component not found")
+
+
+def make_large_page(page: bytes, lines: int) -> bytes:
+    """Repeat the purchase section of a stub page until it has `lines` purchases."""
+    text = page.decode("utf-8")
+    start, end = _attribute_bounds(text)
+    data = json.loads(html.unescape(text[start:end]))
+
+    receipt = data["serverMemo"]["data"]["receipt"]
+    first = receipt.index(SECTION_DELIMITER)
+    second = receipt.index(SECTION_DELIMITER, first + 1)
+    # each purchase is a name/quantity row followed by a price row
+    section = receipt[first + 1 : second]
+    purchases = [section[i : i + 2] for i in range(0, len(section), 2)]
+    repeated = [row for i in range(lines) for row in purchases[i % len(purchases)]]
+    receipt[first + 1 : second] = repeated
+
+    attribute = html.escape(json.dumps(data)).replace("&#x27;", "&#039;")
+    return (text[:start] + attribute + text[end:]).encode("utf-8")
+
+
+def load_pages() -> dict[str, tuple[str, bytes]]:
+    """Stub pages plus synthetic receipts built from the Kaufland stub."""
+    pages = load_stub_pages()
+    url, kaufland = pages["kaufland"]
+    for lines in SYNTHETIC_SIZES:
+        pages[f"synthetic_{lines}"] = (url, make_large_page(kaufland, lines))
+    return pages
@@ -0,0 +1,56 @@
+"""Micro-benchmark for extracting the Livewire receipt payload.
+
+Compares the old regex + html.unescape path against extract_receipt_data
+on the sfs_md HTML stubs, for both str and bytes input.
+Run with: python -m benchmarks.parse_html
+"""
+
+import argparse
+import html
+import json
+import re
+import timeit
+from functools import partial
+
+from src.parsers.sfs_md.receipt_parser import RECEIPT_REGEX, extract_receipt_data
+from src.tests import get_stub_file_path
+
+STUB_NAMES = ["kaufland", "linella", "linella2", "nanu"]
+
+
+def regex_path(page: str) -> dict:
+    return json.loads(html.unescape(re.search(RECEIPT_REGEX, page).group(1)))
+
+
+def scanner_path(page: str | bytes) -> dict:
+    return json.loads(extract_receipt_data(page))
+
+
+def run(number: int, repeat: int) -> None:
+    print(
+        f"{'stub':<10} {'size':>8} {'regex':>10} {'str':>10} "
+        f"{'bytes':>10} {'speed-up':>9}"
+    )
+    for name in STUB_NAMES:
+        with open(get_stub_file_path(f"receipts/sfs_md/{name}.html"), "rb") as file:
+            raw = file.read()
+        page = raw.decode("utf-8")
+        assert regex_path(page) == scanner_path(page) == scanner_path(raw)
+
+        timings = []
+        for func, arg in ((regex_path, page), (scanner_path, page), (scanner_path, raw)):
+            best = min(timeit.repeat(partial(func, arg), number=number, repeat=repeat))
+            timings.append(best / number * 1e6)
+
+        print(
+            f"{name:<10} {len(raw):>8} {timings[0]:>8.1f}us {timings[1]:>8.1f}us "
+            f"{timings[2]:>8.1f}us {timings[0] / timings[2]:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark receipt payload extraction")
+    parser.add_argument("--number", type=int, default=200, help="calls per timing")
+    parser.add_argument("--repeat", type=int, default=5, help="timings per path")
+    args = parser.parse_args()
+    run(args.number, args.repeat)
@@ -0,0 +1,205 @@
+"""Parser benchmark suite with regression tracking.
+
+Times parse_html, build_receipt, model_dump and the whole
+parse_from_url_handler (with a stubbed fetcher and db_api) over the sfs_md stubs
+and synthetic large receipts.
+
+Run with:
+    python -m benchmarks.suite run --output bench_results.json
+    python -m benchmarks.suite compare base.json bench_results.json --threshold 0.1
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable
+from unittest.mock import patch
+from uuid import UUID
+
+from benchmarks.fixtures import load_pages
+from src.handlers.parse_from_url import parse_from_url_handler
+from src.parsers.sfs_md.receipt_parser import SfsMdReceiptParser
+from src.tests import USER_ID_1
+
+DEFAULT_ITERATIONS = 200
+WARMUP_ITERATIONS = 5
+DEFAULT_THRESHOLD = 0.1
+COMPARED_METRICS = ("p50_us", "p99_us")
+
+logger = logging.getLogger("benchmarks")
+logger.disabled = True
+
+
+def _db_api(*_) -> None:
+    return None
+
+
+def _parser(url: str) -> SfsMdReceiptParser:
+    return SfsMdReceiptParser(logger, UUID(USER_ID_1), url, _db_api)
+
+
+def peak_alloc(func: Callable[[], object]) -> int:
+    """Peak bytes allocated by the Python heap during one call of func."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(func: Callable[[], object], iterations: int) -> tuple[list[int], int]:
+    """Timings of the calls, and the peak allocation of one more call traced apart."""
+    for _ in range(WARMUP_ITERATIONS):
+        func()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        func()
+        timings.append(time.perf_counter_ns() - start)
+    # tracing slows the calls down, so the timed ones aren't traced
+    return timings, peak_alloc(func)
+
+
+def bench_parse_html(url: str, page: bytes, iterations: int) -> tuple[list[int], int]:
+    parser = _parser(url)
+    return measure(lambda: parser.parse_html(page), iterations)
+
+
+def bench_build_receipt(url: str, page: bytes, iterations: int) -> tuple[list[int], int]:
+    return measure(_parser(url).parse_html(page).build_receipt, iterations)
+
+
+def bench_model_dump(url: str, page: bytes, iterations: int) -> tuple[list[int], int]:
+    receipt = _parser(url).parse_html(page).build_receipt().receipt
+    return measure(lambda: receipt.model_dump(mode="json"), iterations)
+
+
+def bench_handler(url: str, page: bytes, iterations: int) -> tuple[list[int], int]:
+    with patch("src.handlers.parse_from_url.get_html", return_value=page):
+        return measure(
+            lambda: parse_from_url_handler(url, USER_ID_1, logger, _db_api), iterations
+        )
+
+
+STAGES = {
+    "parse_html": bench_parse_html,
+    "build_receipt": bench_build_receipt,
+    "model_dump": bench_model_dump,
+    "parse_from_url_handler": bench_handler,
+}
+
+
+def summarize(timings: list[int], peak_bytes: int) -> dict:
+    percentiles = statistics.quantiles(timings, n=100, method="inclusive")
+    return {
+        "iterations": len(timings),
+        "ops_per_sec": round(len(timings) / (sum(timings) / 1e9), 1),
+        "mean_us": round(statistics.fmean(timings) / 1e3, 1),
+        "p50_us": round(percentiles[49] / 1e3, 1),
+        "p99_us": round(percentiles[98] / 1e3, 1),
+        # of this stage alone, unlike the RSS of the process running all of them
+        "peak_alloc_kb": round(peak_bytes / 1024, 1),
+    }
+
+
+def run(iterations: int, stages: list[str]) -> dict:
+    pages = load_pages()
+    results = {}
+    for stage in stages:
+        results[stage] = {}
+        for name, (url, page) in pages.items():
+            summary = summarize(*STAGES[stage](url, page, iterations))
+            results[stage][name] = summary
+            print(
+                f"{stage:<24} {name:<15} {summary['ops_per_sec']:>10.1f}/s "
+                f"p50={summary['p50_us']:>9.1f}us p99={summary['p99_us']:>9.1f}us "
+                f"alloc={summary['peak_alloc_kb']}KB"
+            )
+    return {
+        "meta": {
+            "created_at": datetime.now(tz=timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": iterations,
+        },
+        "results": results,
+    }
+
+
+def compare(base: dict, new: dict, threshold: float) -> list[str]:
+    """Return a line per stage/case whose latency grew by more than threshold."""
+    regressions = []
+    for stage, cases in new["results"].items():
+        for name, summary in cases.items():
+            old = base["results"].get(stage, {}).get(name)
+            if not old:
+                continue
+            for metric in COMPARED_METRICS:
+                if old[metric] and summary[metric] > old[metric] * (1 + threshold):
+                    change = summary[metric] / old[metric] - 1
+                    regressions.append(
+                        f"{stage} {name} {metric}: {old[metric]} -> "
+                        f"{summary[metric]} (+{change:.0%})"
+                    )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Receipt parser benchmark suite")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument(
+        "--output", type=str, default="bench_results.json", help="Results JSON file"
+    )
+    run_parser.add_argument(
+        "--iterations", type=int, default=DEFAULT_ITERATIONS, help="Timed calls per case"
+    )
+    run_parser.add_argument(
+        "--stage",
+        action="append",
+        choices=list(STAGES),
+        help="Stage to run, can be repeated (default: all)",
+    )
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("base", type=str, help="Baseline results JSON file")
+    compare_parser.add_argument("new", type=str, help="New results JSON file")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Allowed relative latency growth (default: 0.1)",
+    )
+
+    args = parser.parse_args()
+
+    if args.action == "run":
+        results = run(args.iterations, args.stage or list(STAGES))
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"Results written to {args.output}")
+
+    elif args.action == "compare":
+        with open(args.base, "r", encoding="utf-8") as file:
+            base = json.load(file)
+        with open(args.new, "r", encoding="utf-8") as file:
+            new = json.load(file)
+
+        regressions = compare(base, new, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions found")
+
+
+if __name__ == "__main__":
+    main()
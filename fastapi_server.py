@@ -12,6 +12,8 @@ load_dotenv()
 # Add src to path for imports
 sys.path.insert(0, os.path.dirname(__file__))
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -19,16 +21,42 @@ from pydantic import BaseModel
 from typing import Optional
 import logging
 
-from src.handlers.add_barcodes import add_barcodes_handler
-from src.handlers.link_shop import link_shop_handler
+from src.adapters.db.instrumentation import query_metrics, request_summary, summarize
+from src.adapters.db.postgresql_async import async_pool_metrics, close_async_pools
+from src.adapters.db.postgresql_pool import pool_metrics
+from src.handlers.add_barcodes import async_add_barcodes_handler
+from src.handlers.link_shop import async_link_shop_handler
 from src.handlers.parse_from_url import parse_from_url_handler
-from src.handlers.shops import shops_handler
+from src.handlers.shops import async_nearest_shops_handler, async_shops_handler
+from src.helpers.circuit_breaker import (
+    breaker_metrics,
+    default_breaker_backend,
+    set_breaker_backend,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# DB_DEBUG=on adds a summary of the database calls to every handler response
+DB_DEBUG = os.environ.get("DB_DEBUG", "off").lower() in ("on", "1", "true")
+
+
+def handler_response(status, response, db_calls) -> JSONResponse:
+    if DB_DEBUG and isinstance(response, dict):
+        response = {**response, "_db": summarize(db_calls)}
+    return JSONResponse(content=response, status_code=status.value)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    set_breaker_backend(default_breaker_backend())
+    yield
+    await close_async_pools()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Receipt Parser API",
     description="API for parsing receipts and managing shop data",
     version="1.0.0",
@@ -67,27 +95,42 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "postgres_pools": pool_metrics(),
+        "postgres_async_pools": async_pool_metrics(),
+        "db_calls": query_metrics(),
+        "breakers": breaker_metrics(),
+    }
+
+
 
 
 @app.post("/parse")
 @app.post("/parse-from-url")
 async def parse_from_url(request: ParseFromUrlRequest):
-    status, response = parse_from_url_handler(request.url, request.user_id, logger)
-    return JSONResponse(content=response, status_code=status.value)
+    with request_summary() as db_calls:
+        status, response = parse_from_url_handler(request.url, request.user_id, logger)
+    return handler_response(status, response, db_calls)
 
 
 @app.post("/link-shop")
 async def link_shop(request: LinkShopRequest):
-    status, response = link_shop_handler(
-        request.url, request.user_id, request.receipt_id, logger
-    )
-    return JSONResponse(content=response, status_code=status.value)
+    with request_summary() as db_calls:
+        status, response = await async_link_shop_handler(
+            request.url, request.user_id, request.receipt_id, logger
+        )
+    return handler_response(status, response, db_calls)
 
 
 @app.post("/add-barcodes")
 async def add_barcodes(request: AddBarcodesRequest):
-    status, response = add_barcodes_handler(request.shop_id, request.items, logger)
-    return JSONResponse(content=response, status_code=status.value)
+    with request_summary() as db_calls:
+        status, response = await async_add_barcodes_handler(
+            request.shop_id, request.items, logger
+        )
+    return handler_response(status, response, db_calls)
 
 
 @app.get("/shops")
@@ -101,6 +144,7 @@ async def get_shops(
     lon_max: Optional[float] = None,
     limit: Optional[int] = 50,
     offset: Optional[int] = 0,
+    cursor: Optional[str] = None,
 ):
     query_params = {}
     if country_code:
@@ -117,9 +161,26 @@ async def get_shops(
         query_params["lon_max"] = lon_max
     query_params["limit"] = limit
     query_params["offset"] = offset
+    if cursor:
+        query_params["cursor"] = cursor
 
-    status, response = shops_handler(query_params, logger)
-    return JSONResponse(content=response, status_code=status.value)
+    with request_summary() as db_calls:
+        status, response = await async_shops_handler(query_params, logger)
+    return handler_response(status, response, db_calls)
+
+
+@app.get("/shops/nearest")
+async def get_nearest_shops(
+    lat: float,
+    lon: float,
+    k: Optional[int] = 10,
+    radius: Optional[float] = 5000,
+):
+    query_params = {"lat": lat, "lon": lon, "k": k, "radius": radius}
+
+    with request_summary() as db_calls:
+        status, response = await async_nearest_shops_handler(query_params, logger)
+    return handler_response(status, response, db_calls)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""Raw receipt page archive utility.
+
+Trains the zstd dictionary new pages are compressed with, and reads archived
+pages back. The archive is the one get_html writes to: a local directory in
+HTML_ARCHIVE_DIR (or --dir), or Postgres of HTML_ARCHIVE_POSTGRES_ENV.
+"""
+
+import os
+import shutil
+import sys
+
+from src.helpers.archive import DICT_SIZE, default_archive
+
+
+def train(files: list[str], dict_size: int = DICT_SIZE) -> int:
+    """Train a dictionary on sample receipt pages, return its id."""
+    pages = []
+    for path in files:
+        with open(path, "rb") as file:
+            pages.append(file.read())
+    return default_archive().train_dictionary(pages, dict_size)
+
+
+def get(url: str) -> bool:
+    """Stream the archived page of url to stdout."""
+    stream = default_archive().open(url)
+    if stream is None:
+        return False
+    with stream:
+        shutil.copyfileobj(stream, sys.stdout.buffer)
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Raw receipt page archive utility")
+    parser.add_argument(
+        "action",
+        choices=["train", "get"],
+        help="Action to perform",
+    )
+    parser.add_argument(
+        "--dir",
+        type=str,
+        help="Archive directory (default: HTML_ARCHIVE_DIR)",
+    )
+    parser.add_argument(
+        "--pages",
+        nargs="+",
+        help="Sample page files for train action",
+    )
+    parser.add_argument(
+        "--dict-size",
+        type=int,
+        default=DICT_SIZE,
+        help="Dictionary size in bytes for train action",
+    )
+    parser.add_argument(
+        "--url",
+        type=str,
+        help="Receipt URL for get action",
+    )
+
+    args = parser.parse_args()
+
+    if args.dir:
+        os.environ["HTML_ARCHIVE_DIR"] = args.dir
+    if default_archive() is None:
+        print("set HTML_ARCHIVE_DIR or HTML_ARCHIVE_POSTGRES_ENV", file=sys.stderr)
+        sys.exit(1)
+
+    if args.action == "train":
+        if not args.pages:
+            print("--pages is required for train action", file=sys.stderr)
+            sys.exit(1)
+        print(f"Trained dictionary {train(args.pages, args.dict_size)}")
+    elif args.action == "get":
+        if not args.url:
+            print("--url is required for get action", file=sys.stderr)
+            sys.exit(1)
+        if not get(args.url):
+            print(f"{args.url} is not archived", file=sys.stderr)
+            sys.exit(1)
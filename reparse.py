@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+"""Re-parse archived receipt pages and update the receipts whose data changed.
+
+Receipts are streamed in id order. Their archived pages are parsed in a process
+pool, the result is compared with the stored row, and only the changed
+receipts are written, in bulk batches and at a limited rate. The id of the last
+processed receipt is kept in a checkpoint file, so an interrupted run resumes
+where it stopped. With --dry-run nothing is written and the differences go to
+a JSON lines report instead.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from typing import Any, Iterator, TextIO
+
+from pydantic import ValidationError
+
+from src.adapters.db.base import BaseDBAdapter, WriteError
+from src.helpers.archive import PageArchive, default_archive
+from src.helpers.logging import set_logger
+from src.parsers.sfs_md.batch import PageInput, ParseError, parse_many
+from src.schemas.common import Operator, TableName
+from src.schemas.sfs_md.receipt import SfsMdReceipt
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_CHECKPOINT = "reparse_checkpoint.json"
+PROGRESS_INTERVAL = 10
+# set after parsing (link_shop, add_barcodes), the page doesn't know them
+PRESERVED_FIELDS = ("shop_id",)
+PRESERVED_PURCHASE_FIELDS = ("item_id", "status")
+
+
+def load_checkpoint(path: str) -> str | None:
+    """Return the id of the last processed receipt, if any."""
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)["last_id"]
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path: str, last_id: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump({"last_id": last_id}, file)
+    os.replace(tmp_path, path)
+
+
+class RateLimiter:
+    """Spaces out writes so that at most `rate` rows per second are written."""
+
+    def __init__(self, rate: float | None):
+        self.rate = rate
+        self._next_at = time.monotonic()
+
+    def wait(self, rows: int) -> None:
+        if not self.rate:
+            return
+        now = time.monotonic()
+        if self._next_at > now:
+            time.sleep(self._next_at - now)
+        self._next_at = max(now, self._next_at) + rows / self.rate
+
+
+class Progress:
+    def __init__(self, total: int, logger, interval: float = PROGRESS_INTERVAL):
+        self.total = total
+        self.logger = logger
+        self.interval = interval
+        self.counts = {
+            "processed": 0,
+            "changed": 0,
+            "written": 0,
+            "failed": 0,
+            "missing": 0,
+        }
+        self._started_at = time.monotonic()
+        self._reported_at = self._started_at
+
+    def add(self, key: str, count: int = 1) -> None:
+        self.counts[key] += count
+
+    def report(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._reported_at < self.interval:
+            return
+        self._reported_at = now
+        processed = self.counts["processed"]
+        rate = processed / max(now - self._started_at, 1e-9)
+        eta = (self.total - processed) / rate if rate else 0
+        self.logger.info(
+            "reparse %s/%s (%.1f/s, eta %.0fs): "
+            "changed=%s written=%s failed=%s missing=%s",
+            processed,
+            self.total,
+            rate,
+            eta,
+            self.counts["changed"],
+            self.counts["written"],
+            self.counts["failed"],
+            self.counts["missing"],
+        )
+
+
+def normalize(row: dict[str, Any]) -> dict[str, Any]:
+    """Stored receipt row in the JSON form the parser output is compared in."""
+    try:
+        return SfsMdReceipt.model_validate(row).model_dump(mode="json")
+    except ValidationError:
+        # an unreadable stored row always differs from a parsed receipt
+        return row
+
+
+def merge_stored(stored: dict[str, Any], receipt: SfsMdReceipt) -> dict[str, Any]:
+    """Parsed receipt with the fields set after parsing taken from the stored row."""
+    data = receipt.model_dump(mode="json")
+    for field in PRESERVED_FIELDS:
+        if stored.get(field) is not None:
+            data[field] = stored[field]
+
+    stored_purchases = stored.get("purchases") or []
+    for i, purchase in enumerate(data["purchases"]):
+        if i < len(stored_purchases) and stored_purchases[i]["name"] == purchase["name"]:
+            for field in PRESERVED_PURCHASE_FIELDS:
+                if field in stored_purchases[i]:
+                    purchase[field] = stored_purchases[i][field]
+    return data
+
+
+def diff_receipt(stored: dict[str, Any], new: dict[str, Any]) -> dict[str, list]:
+    """Return {field: [stored value, new value]} for the fields that differ."""
+    return {
+        field: [stored.get(field), value]
+        for field, value in new.items()
+        if stored.get(field) != value
+    }
+
+
+class Reparser:  # pylint: disable=too-many-instance-attributes
+    """
+    Re-parses the archived pages of the stored receipts and writes the changed ones.
+
+    When report is given this is a dry run: the differences are written to it as
+    JSON lines and the database is left untouched.
+    """
+
+    def __init__(
+        self,
+        db_session: BaseDBAdapter,
+        archive: PageArchive,
+        logger,
+        checkpoint: str = DEFAULT_CHECKPOINT,
+        report: TextIO | None = None,
+    ):
+        self.receipts = db_session.table(TableName.RECEIPT)
+        self.archive = archive
+        self.logger = logger
+        self.checkpoint = checkpoint
+        self.report = report
+        self.limiter = RateLimiter(None)
+        self.progress = Progress(0, logger)
+        self._batch = []
+        # rows whose pages are being parsed, parse_many keeps their order
+        self._parsing = deque()
+        # id of the last receipt read, the checkpoint once the run is done
+        self._last_id = None
+
+    def _where(self) -> dict[str, Any] | None:
+        """Keyset of the receipts left: those after the checkpoint in id order."""
+        last_id = load_checkpoint(self.checkpoint)
+        if not last_id:
+            return None
+        self.logger.info("reparse resuming after %s", last_id)
+        return {"id": (Operator.GT, last_id)}
+
+    def _rows(self, where: dict[str, Any] | None, batch_size: int) -> Iterator[dict]:
+        """Stream the receipts left in id order, without loading the table."""
+        return self.receipts.iter_many(where, batch_size=batch_size, order_by="id")
+
+    def _inputs(self, rows: Iterator[dict[str, Any]]) -> Iterator[PageInput]:
+        for row in rows:
+            self._last_id = row["id"]
+            page = self.archive.get(row["receipt_url"])
+            if page is None:
+                self.progress.add("missing")
+                self.progress.add("processed")
+                continue
+            self._parsing.append(row)
+            yield row["user_id"], row["receipt_url"], page
+
+    def _handle(self, row: dict[str, Any], receipt: SfsMdReceipt | ParseError) -> None:
+        self.progress.add("processed")
+        if isinstance(receipt, ParseError):
+            self.logger.warning("reparse %s failed: %s", row["id"], receipt)
+            self.progress.add("failed")
+            return
+
+        stored = normalize(row)
+        new = merge_stored(stored, receipt)
+        changes = diff_receipt(stored, new)
+        if not changes:
+            return
+        self.progress.add("changed")
+        if self.report is None:
+            self._batch.append(new)
+        else:
+            self.report.write(json.dumps({"id": row["id"], "changes": changes}) + "\n")
+
+    def _flush(self, processed_id: str) -> None:
+        if self.report is not None:
+            return
+        if self._batch:
+            self.limiter.wait(len(self._batch))
+            results = self.receipts.upsert_many(self._batch)
+            errors = [result for result in results if isinstance(result, WriteError)]
+            for error in errors:
+                self.logger.warning("reparse %s not written: %s", error.id, error.msg)
+            self.progress.add("written", len(results) - len(errors))
+            self.progress.add("failed", len(errors))
+            self._batch = []
+        # every receipt up to processed_id is handled now
+        save_checkpoint(self.checkpoint, processed_id)
+
+    def run(
+        self,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_writes_per_sec: float | None = None,
+        max_workers: int | None = None,
+    ) -> dict[str, int]:
+        self.limiter = RateLimiter(max_writes_per_sec)
+        where = self._where()
+        self.progress = Progress(self.receipts.count(where), self.logger)
+
+        unsaved = 0
+        rows = self._rows(where, batch_size)
+        for receipt in parse_many(self._inputs(rows), max_workers=max_workers):
+            row = self._parsing.popleft()
+            self._handle(row, receipt)
+            unsaved += 1
+            if len(self._batch) >= batch_size or unsaved >= batch_size:
+                self._flush(row["id"])
+                unsaved = 0
+            self.progress.report()
+
+        if self._last_id is not None:
+            self._flush(self._last_id)
+        self.progress.report(force=True)
+        return self.progress.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-parse archived receipt pages")
+    parser.add_argument("--env", type=str, required=True, help="[prod, stage, dev, test]")
+    parser.add_argument(
+        "--db",
+        type=str,
+        choices=["cosmos", "postgres"],
+        default="postgres",
+        help="Database with the stored receipts (default: postgres)",
+    )
+    parser.add_argument(
+        "--archive-dir",
+        type=str,
+        help="Page archive directory (default: the HTML_ARCHIVE_* configuration)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default=DEFAULT_CHECKPOINT,
+        help=f"Checkpoint file (default: {DEFAULT_CHECKPOINT})",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore the checkpoint and start from the first receipt",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Receipts written per batch (default: {DEFAULT_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--max-writes",
+        type=float,
+        default=None,
+        help="Max receipts written per second (default: unlimited)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Parser processes (default: CPUs)"
+    )
+    parser.add_argument(
+        "--dry-run",
+        type=str,
+        metavar="REPORT",
+        help="Write the differences to this JSON lines file instead of the database",
+    )
+
+    args = parser.parse_args()
+
+    os.environ["ENV_NAME"] = args.env.lower()
+    if args.archive_dir:
+        os.environ["HTML_ARCHIVE_DIR"] = args.archive_dir
+    archive = default_archive()
+    if archive is None:
+        print(
+            "set --archive-dir, HTML_ARCHIVE_DIR or HTML_ARCHIVE_POSTGRES_ENV",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    logger = set_logger()
+    # pylint: disable=import-outside-toplevel
+    if args.db == "cosmos":
+        from src.adapters.db.cosmos_db_core import init_db_session
+    else:
+        from src.adapters.db.postgresql_core import init_db_session
+    db_session = init_db_session(logger)
+
+    options = {
+        "batch_size": args.batch_size,
+        "max_writes_per_sec": args.max_writes,
+        "max_workers": args.workers,
+    }
+    if args.dry_run:
+        with open(args.dry_run, "w", encoding="utf-8") as report:
+            reparser = Reparser(db_session, archive, logger, args.checkpoint, report)
+            counts = reparser.run(**options)
+    else:
+        reparser = Reparser(db_session, archive, logger, args.checkpoint)
+        counts = reparser.run(**options)
+    print(json.dumps(counts))
+
+
+if __name__ == "__main__":
+    main()
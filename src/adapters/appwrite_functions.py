@@ -12,8 +12,13 @@ from src.adapters.doppler import load_doppler_secrets
 from src.handlers.add_barcodes import add_barcodes_handler
 from src.handlers.link_shop import link_shop_handler
 from src.handlers.parse_from_url import parse_from_url_handler
-from src.handlers.shops import shops_handler
+from src.handlers.shops import nearest_shops_handler, shops_handler
 from src.helpers.appwrite import appwrite_db_api
+from src.helpers.circuit_breaker import (
+    breakers,
+    default_breaker_backend,
+    set_breaker_backend,
+)
 
 
 class AppwriteLogger:
@@ -95,6 +100,13 @@ def handle_shops(context, logger):
     return context.res.json(response, status.value)
 
 
+def handle_nearest_shops(context, logger):
+    """Handle GET /shops/nearest - returns the k shops nearest to lat, lon."""
+    query_params = dict(context.req.query) if context.req.query else {}
+    status, response = nearest_shops_handler(query_params, logger)
+    return context.res.json(response, status.value)
+
+
 GET = "GET"
 POST = "POST"
 
@@ -106,6 +118,7 @@ ROUTES = {
     (GET, "/"): handle_health,
     (GET, "/health"): handle_health,
     (GET, "/shops"): handle_shops,
+    (GET, "/shops/nearest"): handle_nearest_shops,
 }
 
 
@@ -113,6 +126,9 @@ def main(context):
     logger = AppwriteLogger(context)
 
     load_doppler_secrets()
+    # once per instance, the configuration comes with the secrets
+    if breakers.backend is None:
+        set_breaker_backend(default_breaker_backend())
 
     method = context.req.method
     path = context.req.path
@@ -0,0 +1,40 @@
+from abc import ABC, abstractmethod
+from typing import BinaryIO
+
+
+class BaseArchiveBackend(ABC):
+    """
+    Storage for the raw page archive.
+
+    Blobs are compressed pages keyed by the sha256 of the raw page, refs map
+    make_hash(url) to the blob of the latest page fetched for that url, and
+    dictionaries are the zstd dictionaries the blobs were compressed with.
+    """
+
+    @abstractmethod
+    def put_blob(self, content_hash: str, data: bytes) -> bool:
+        """Store a blob, return False if it was already there."""
+
+    @abstractmethod
+    def open_blob(self, content_hash: str) -> BinaryIO | None:
+        pass
+
+    @abstractmethod
+    def put_ref(self, url_hash: str, content_hash: str) -> None:
+        pass
+
+    @abstractmethod
+    def get_ref(self, url_hash: str) -> str | None:
+        pass
+
+    @abstractmethod
+    def put_dictionary(self, dict_id: int, data: bytes) -> None:
+        pass
+
+    @abstractmethod
+    def get_dictionary(self, dict_id: int) -> bytes | None:
+        pass
+
+    @abstractmethod
+    def latest_dictionary_id(self) -> int | None:
+        pass
@@ -0,0 +1,82 @@
+import os
+import tempfile
+from typing import BinaryIO
+
+from src.adapters.archive.base import BaseArchiveBackend
+
+
+class FilesystemArchiveBackend(BaseArchiveBackend):
+    """
+    Archive under a local directory:
+    blobs/ab/abcd...zst, refs/<url hash> and dictionaries/<dict id>.dict, plus
+    dictionaries/latest with the id of the newest dictionary
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        for directory in ("blobs", "refs", "dictionaries"):
+            os.makedirs(os.path.join(root, directory), exist_ok=True)
+
+    def _blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.root, "blobs", content_hash[:2], f"{content_hash}.zst")
+
+    def _ref_path(self, url_hash: str) -> str:
+        return os.path.join(self.root, "refs", url_hash)
+
+    def _dictionary_path(self, dict_id: int) -> str:
+        return os.path.join(self.root, "dictionaries", f"{dict_id}.dict")
+
+    @staticmethod
+    def _write(path: str, data: bytes) -> None:
+        # readers never see a partially written file
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def _read(path: str) -> bytes | None:
+        try:
+            with open(path, "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def put_blob(self, content_hash: str, data: bytes) -> bool:
+        path = self._blob_path(content_hash)
+        if os.path.exists(path):
+            return False
+        self._write(path, data)
+        return True
+
+    def open_blob(self, content_hash: str) -> BinaryIO | None:
+        try:
+            return open(self._blob_path(content_hash), "rb")
+        except FileNotFoundError:
+            return None
+
+    def put_ref(self, url_hash: str, content_hash: str) -> None:
+        self._write(self._ref_path(url_hash), content_hash.encode())
+
+    def get_ref(self, url_hash: str) -> str | None:
+        data = self._read(self._ref_path(url_hash))
+        return data.decode() if data else None
+
+    def put_dictionary(self, dict_id: int, data: bytes) -> None:
+        self._write(self._dictionary_path(dict_id), data)
+        self._write(
+            os.path.join(self.root, "dictionaries", "latest"), str(dict_id).encode()
+        )
+
+    def get_dictionary(self, dict_id: int) -> bytes | None:
+        return self._read(self._dictionary_path(dict_id))
+
+    def latest_dictionary_id(self) -> int | None:
+        data = self._read(os.path.join(self.root, "dictionaries", "latest"))
+        return int(data) if data else None
@@ -0,0 +1,110 @@
+import io
+from typing import BinaryIO
+
+from src.adapters.archive.base import BaseArchiveBackend
+
+# bytes fetched per query by streaming reads
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class _ByteaReader(io.RawIOBase):
+    """Reads a bytea value in chunks, without loading all of it."""
+
+    def __init__(self, pool, content_hash: str, size: int):
+        self.pool = pool
+        self.content_hash = content_hash
+        self.size = size
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def _read_chunk(self, length: int) -> bytes:
+        length = min(length, self.size - self.position)
+        if length <= 0:
+            return b""
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            # substring() is 1-based
+            cursor.execute(
+                "SELECT substring(data FROM %s FOR %s) FROM html_blob WHERE id = %s",
+                (self.position + 1, length, self.content_hash),
+            )
+            chunk = bytes(cursor.fetchone()[0])
+        self.position += len(chunk)
+        return chunk
+
+    def readinto(self, buffer) -> int:
+        chunk = self._read_chunk(len(buffer))
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
+    def readall(self) -> bytes:
+        chunks = []
+        while chunk := self._read_chunk(READ_CHUNK_SIZE):
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+
+class PostgreSQLArchiveBackend(BaseArchiveBackend):
+    """Archive in the html_blob, html_ref and html_dictionary tables of a pool's db."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def put_blob(self, content_hash: str, data: bytes) -> bool:
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO html_blob (id, data) VALUES (%s, %s)"
+                " ON CONFLICT (id) DO NOTHING",
+                (content_hash, data),
+            )
+            return cursor.rowcount == 1
+
+    def open_blob(self, content_hash: str) -> BinaryIO | None:
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT octet_length(data) FROM html_blob WHERE id = %s", (content_hash,)
+            )
+            row = cursor.fetchone()
+        if not row:
+            return None
+        reader = _ByteaReader(self.pool, content_hash, row[0])
+        return io.BufferedReader(reader, buffer_size=READ_CHUNK_SIZE)
+
+    def put_ref(self, url_hash: str, content_hash: str) -> None:
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO html_ref (id, blob_id) VALUES (%s, %s)
+                ON CONFLICT (id) DO UPDATE SET blob_id = EXCLUDED.blob_id
+                """,
+                (url_hash, content_hash),
+            )
+
+    def get_ref(self, url_hash: str) -> str | None:
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute("SELECT blob_id FROM html_ref WHERE id = %s", (url_hash,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+    def put_dictionary(self, dict_id: int, data: bytes) -> None:
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO html_dictionary (id, data) VALUES (%s, %s)"
+                " ON CONFLICT (id) DO NOTHING",
+                (dict_id, data),
+            )
+
+    def get_dictionary(self, dict_id: int) -> bytes | None:
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute("SELECT data FROM html_dictionary WHERE id = %s", (dict_id,))
+            row = cursor.fetchone()
+            return bytes(row[0]) if row else None
+
+    def latest_dictionary_id(self) -> int | None:
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT id FROM html_dictionary ORDER BY created_at DESC, id DESC LIMIT 1"
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
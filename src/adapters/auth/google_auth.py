@@ -63,16 +63,16 @@ class GoogleAuth:
         auth_url, state = self.flow.authorization_url()
         user_session = GoogleUserSession(state=state)
 
-        self.db_session.use_table(TableName.USER_SESSION)
-        session_id = self.db_session.create_one(user_session.model_dump(mode="json"))
+        session_id = self.db_session.table(TableName.USER_SESSION).create_one(
+            user_session.model_dump(mode="json")
+        )
 
         return auth_url, UserSessionCookie(
             session_id=UUID(session_id), identity_provider=IdentityProvider.GOOGLE
         )
 
     def get_new_session(self, session_id: UUID) -> GoogleUserSession | None:
-        self.db_session.use_table(TableName.USER_SESSION)
-        session = self.db_session.read_one(
+        session = self.db_session.table(TableName.USER_SESSION).read_one(
             str(session_id), partition_key=IdentityProvider.GOOGLE
         )
         self.logger.info(session)
@@ -83,30 +83,31 @@ class GoogleAuth:
     def update_session(
         self, session: GoogleUserSession, google_auth: GoogleUserAuth
     ) -> GoogleUserSession:
-        self.db_session.use_table(TableName.USER_IDENTITY)
-        identity = self.db_session.read_one(
+        identities = self.db_session.table(TableName.USER_IDENTITY)
+        identity = identities.read_one(
             google_auth.google_id, partition_key=IdentityProvider.GOOGLE
         )
         if identity:
             user_id = identity["user_id"]
         else:
-            self.db_session.use_table(TableName.USER)
             user = User(email=google_auth.email, name=google_auth.name, id=None)
-            user_id = self.db_session.create_one(user.model_dump(mode="json"))
+            user_id = self.db_session.table(TableName.USER).create_one(
+                user.model_dump(mode="json")
+            )
 
             identity = UserIdentity(
                 id=google_auth.google_id,
                 provider=IdentityProvider.GOOGLE,
                 user_id=UUID(user_id),
             ).model_dump(mode="json")
-            self.db_session.use_table(TableName.USER_IDENTITY)
-            self.db_session.create_one(identity)
+            identities.create_one(identity)
 
         session.user_id = UUID(user_id)
         session.user_name = google_auth.name
-        self.db_session.use_table(TableName.USER_SESSION)
         self.logger.info(session.model_dump())
-        self.db_session.update_one(str(session.id), session.model_dump(mode="json"))
+        self.db_session.table(TableName.USER_SESSION).update_one(
+            str(session.id), session.model_dump(mode="json")
+        )
         return session
 
     def get_google_client_id(self) -> str:
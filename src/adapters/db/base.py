@@ -1,22 +1,49 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Self, List
+from typing import Any, Callable, Dict, Iterator, Self, List
 
-from src.schemas.common import EnvType, TableName
+from src.adapters.db.spatial import grid_indexes, nearest_rows
+from src.schemas.common import EnvType, Operator, TableName
 
 
-class BaseDBAdapter(ABC):
-    @abstractmethod
-    def __init__(self, env: EnvType, logger):
-        self.env = env
-        self.logger = logger
+class WriteError(Exception):
+    """A row of a bulk write that couldn't be stored."""
 
-    @abstractmethod
-    def use_db(self, db_name: str) -> Self:
-        pass
+    def __init__(self, _id: str | None, msg: str):
+        super().__init__(_id, msg)
+        self.id = _id
+        self.msg = msg
 
-    @abstractmethod
-    def use_table(self, table_name: TableName) -> Self:
-        pass
+    def __str__(self) -> str:
+        return f"{self.id}: {self.msg}"
+
+
+# outcome of every row of a bulk write, in input order: its id or its error
+WriteResult = List[str | WriteError]
+
+
+def where_conditions(value: Any) -> List[tuple[Operator, Any]]:
+    """
+    (operator, operand) pairs of a where value: a plain value is compared for
+    equality, (Operator, operand) applies the operator, and a list of such tuples
+    applies all of them, e.g. [(Operator.GTE, start), (Operator.LT, end)].
+    """
+    if isinstance(value, tuple):
+        return [value]
+    if isinstance(value, list) and value and all(isinstance(v, tuple) for v in value):
+        return value
+    return [(Operator.EQ, value)]
+
+
+class BaseTable(ABC):
+    """
+    CRUD on a single table of a database adapter.
+
+    Tables hold no mutable state, so one can be shared between threads, and
+    adapter.table() can be called for every operation.
+    """
+
+    def __init__(self, name: TableName):
+        self.name = name
 
     @abstractmethod
     def create_one(self, data: Dict[str, Any]) -> str:
@@ -27,15 +54,66 @@ class BaseDBAdapter(ABC):
         pass
 
     @abstractmethod
-    def read_one(self, _id: str, **kwargs) -> Dict[str, Any] | None:
+    def read_one(
+        self, _id: str, fields: List[str] | None = None, **kwargs
+    ) -> Dict[str, Any] | None:
         pass
 
     @abstractmethod
     def read_many(
-        self, where: Dict[str, Any] | None = None, limit: int | None = None, **kwargs
+        self,
+        where: Dict[str, Any] | None = None,
+        limit: int | None = None,
+        fields: List[str] | None = None,
+        **kwargs,
     ) -> List[Dict[str, Any]]:
         pass
 
+    def read_by_ids(
+        self, ids: List[str], fields: List[str] | None = None, **kwargs
+    ) -> Dict[str, Dict[str, Any] | None]:
+        """
+        Rows by id, in the order of ids, with None for the ids that don't exist.
+        The backends read them in a single query.
+        """
+        return {_id: self.read_one(_id, fields=fields, **kwargs) for _id in ids}
+
+    def iter_many(  # pylint: disable=unused-argument,too-many-arguments
+        self,
+        where: Dict[str, Any] | None = None,
+        batch_size: int = 1000,
+        fields: List[str] | None = None,
+        order_by: str | None = None,
+        **kwargs,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Rows matching where, sorted on the order_by field, fetched batch_size at a
+        time by the backends.
+        """
+        rows = self.read_many(where, limit=None, fields=fields, **kwargs)
+        if order_by is not None:
+            rows = sorted(rows, key=lambda row: row[order_by])
+        yield from rows
+
+    def count(self, where: Dict[str, Any] | None = None) -> int:
+        """Number of rows matching where; Postgres counts them in the query."""
+        return sum(1 for _ in self.iter_many(where, fields=["id"]))
+
+    def nearest(
+        self, lat: float, lon: float, k: int = 10, radius: float = 5000.0
+    ) -> List[Dict[str, Any]]:
+        """
+        The k rows nearest to (lat, lon) within radius meters, closest first, each
+        with its distance in meters. This scans the table into a grid index kept
+        in the process; Postgres answers it with the GiST index on location.
+        """
+        grid = grid_indexes.get(self._grid_key(), self.name, self.iter_many)
+        return nearest_rows(grid, lat, lon, k, radius)
+
+    def _grid_key(self) -> tuple:
+        """Key of the grid index of this table, shared by its instances."""
+        return type(self).__name__, self.name
+
     @abstractmethod
     def update_one(self, _id: str, data: Dict[str, Any]) -> bool:
         pass
@@ -44,6 +122,88 @@ class BaseDBAdapter(ABC):
     def delete_one(self, _id: str, **kwargs) -> bool:
         pass
 
+    def create_many(self, rows: List[Dict[str, Any]]) -> WriteResult:
+        """Create rows that don't exist yet; the backends write them in batches."""
+        return [self._write_row(self.create_one, row) for row in rows]
+
+    def upsert_many(self, rows: List[Dict[str, Any]]) -> WriteResult:
+        """Create or replace rows; the backends write them in batches."""
+        return [self._write_row(self.create_or_update_one, row) for row in rows]
+
+    @staticmethod
+    def _write_row(
+        write: Callable[[Dict[str, Any]], Any], row: Dict[str, Any]
+    ) -> str | WriteError:
+        try:
+            write(row)
+            return row["id"]
+        except Exception as e:  # pylint: disable=broad-except
+            return WriteError(row.get("id"), str(e))
+
+
+class BaseDBAdapter(ABC):
+    current_table: TableName | None = None
+
+    @abstractmethod
+    def __init__(self, env: EnvType, logger):
+        self.env = env
+        self.logger = logger
+
+    @abstractmethod
+    def use_db(self, db_name: str) -> Self:
+        pass
+
+    @abstractmethod
+    def table(self, table_name: TableName) -> BaseTable:
+        pass
+
+    def use_table(self, table_name: TableName) -> Self:
+        """Select the table of the CRUD methods below; prefer table() in new code."""
+        self.current_table = table_name
+        return self
+
+    def _selected_table(self) -> BaseTable:
+        if not self.current_table:
+            raise ValueError("Table not selected. Use use_table() first.")
+        return self.table(self.current_table)
+
+    def create_one(self, data: Dict[str, Any]) -> str:
+        return self._selected_table().create_one(data)
+
+    def create_or_update_one(self, data: Dict[str, Any]) -> bool:
+        return self._selected_table().create_or_update_one(data)
+
+    def read_one(self, _id: str, **kwargs) -> Dict[str, Any] | None:
+        return self._selected_table().read_one(_id, **kwargs)
+
+    def read_many(
+        self, where: Dict[str, Any] | None = None, limit: int | None = None, **kwargs
+    ) -> List[Dict[str, Any]]:
+        # leave the limit to the table's own default when it isn't given
+        if limit is not None:
+            kwargs["limit"] = limit
+        return self._selected_table().read_many(where, **kwargs)
+
+    def read_by_ids(self, ids: List[str], **kwargs) -> Dict[str, Dict[str, Any] | None]:
+        return self._selected_table().read_by_ids(ids, **kwargs)
+
+    def iter_many(
+        self, where: Dict[str, Any] | None = None, batch_size: int = 1000, **kwargs
+    ) -> Iterator[Dict[str, Any]]:
+        return self._selected_table().iter_many(where, batch_size, **kwargs)
+
+    def update_one(self, _id: str, data: Dict[str, Any]) -> bool:
+        return self._selected_table().update_one(_id, data)
+
+    def delete_one(self, _id: str, **kwargs) -> bool:
+        return self._selected_table().delete_one(_id, **kwargs)
+
+    def create_many(self, rows: List[Dict[str, Any]]) -> WriteResult:
+        return self._selected_table().create_many(rows)
+
+    def upsert_many(self, rows: List[Dict[str, Any]]) -> WriteResult:
+        return self._selected_table().upsert_many(rows)
+
     @abstractmethod
     def create_table(self, table_name: TableName, **kwargs) -> Self:
         pass
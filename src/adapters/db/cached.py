@@ -0,0 +1,306 @@
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, NamedTuple, Self
+
+from src.adapters.db.base import BaseDBAdapter, BaseTable, WriteResult
+from src.schemas.common import TableName
+
+
+class CacheConfig(NamedTuple):
+    ttl: float  # seconds a row is served from the cache
+    max_size: int  # ids kept per table, the least recently used are evicted
+    negative_ttl: float = 5.0  # seconds a missing row is remembered
+
+
+# read-mostly tables; the others are always read from the database
+CACHE_CONFIG = {
+    TableName.SHOP: CacheConfig(ttl=300, max_size=2000),
+    TableName.USER: CacheConfig(ttl=60, max_size=1000),
+    TableName.USER_IDENTITY: CacheConfig(ttl=60, max_size=1000),
+    TableName.USER_SESSION: CacheConfig(ttl=30, max_size=1000),
+}
+
+_MISSING = object()
+
+
+class TableCache:
+    """
+    LRU cache of the rows of one table by id, with expiry.
+
+    Rows are kept per id and per read_one options (e.g. the partition key), so
+    a read with other options doesn't get a row it couldn't see, and a write
+    drops all of them. None is cached for negative_ttl only.
+    """
+
+    def __init__(self, config: CacheConfig):
+        self.config = config
+        # id -> {options: (expires_at, row)}, least recently used first
+        self._rows: OrderedDict[str, Dict[tuple, tuple[float, Any]]] = OrderedDict()
+        # bumped by every invalidation, a read that started before one isn't stored
+        self._version = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "negative_hits": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, _id: str, options: tuple) -> Any:
+        """The cached row (or None), _MISSING when it must be read."""
+        with self._lock:
+            entry = self._rows.get(_id, {}).get(options)
+            if entry is None or entry[0] <= time.monotonic():
+                self._stats["misses"] += 1
+                return _MISSING
+            self._rows.move_to_end(_id)
+            row = entry[1]
+            self._stats["hits" if row is not None else "negative_hits"] += 1
+        # callers may modify the rows they read
+        return copy.deepcopy(row)
+
+    def put(self, _id: str, options: tuple, row: Dict[str, Any] | None, version: int):
+        ttl = self.config.ttl if row is not None else self.config.negative_ttl
+        if ttl <= 0:
+            return
+        row = copy.deepcopy(row)
+        with self._lock:
+            if version != self._version:
+                return
+            self._rows.setdefault(_id, {})[options] = (time.monotonic() + ttl, row)
+            self._rows.move_to_end(_id)
+            while len(self._rows) > self.config.max_size:
+                self._rows.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, *ids: str | None) -> None:
+        with self._lock:
+            self._version += 1
+            for _id in ids:
+                if self._rows.pop(_id, None) is not None:
+                    self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._rows.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["negative_hits"]
+            lookups += self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._rows),
+                "max_size": self.config.max_size,
+                "hit_rate": (
+                    (lookups - self._stats["misses"]) / lookups if lookups else 0.0
+                ),
+            }
+
+
+class CachedTable(BaseTable):
+    """
+    Read-through cache of read_one and read_by_ids around the table of another
+    adapter. Partial reads (fields) and queries aren't cached; writes through
+    this table drop the written ids.
+    """
+
+    def __init__(self, table: BaseTable, cache: TableCache):
+        super().__init__(table.name)
+        self.table = table
+        self.cache = cache
+
+    @staticmethod
+    def _options(kwargs: Dict[str, Any]) -> tuple:
+        return tuple(sorted((key, str(value)) for key, value in kwargs.items()))
+
+    def create_one(self, data: Dict[str, Any]) -> str:
+        try:
+            _id = self.table.create_one(data)
+        finally:
+            self.cache.invalidate(data.get("id"))
+        return _id
+
+    def create_or_update_one(self, data: Dict[str, Any]) -> bool:
+        try:
+            return self.table.create_or_update_one(data)
+        finally:
+            self.cache.invalidate(data.get("id"))
+
+    def read_one(
+        self, _id: str, fields: List[str] | None = None, **kwargs
+    ) -> Dict[str, Any] | None:
+        if fields:
+            return self.table.read_one(_id, fields=fields, **kwargs)
+        options = self._options(kwargs)
+        row = self.cache.get(_id, options)
+        if row is not _MISSING:
+            return row
+        version = self.cache.version
+        row = self.table.read_one(_id, **kwargs)
+        self.cache.put(_id, options, row, version)
+        return row
+
+    def read_many(
+        self,
+        where: Dict[str, Any] | None = None,
+        limit: int | None = None,
+        fields: List[str] | None = None,
+        **kwargs,
+    ) -> List[Dict[str, Any]]:
+        # leave the limit to the table's own default when it isn't given
+        if limit is not None:
+            kwargs["limit"] = limit
+        return self.table.read_many(where, fields=fields, **kwargs)
+
+    def read_by_ids(
+        self, ids: List[str], fields: List[str] | None = None, **kwargs
+    ) -> Dict[str, Dict[str, Any] | None]:
+        if fields:
+            return self.table.read_by_ids(ids, fields=fields, **kwargs)
+        options = self._options(kwargs)
+        results = {_id: self.cache.get(_id, options) for _id in dict.fromkeys(ids)}
+        missing = [_id for _id, row in results.items() if row is _MISSING]
+        if missing:
+            version = self.cache.version
+            for _id, row in self.table.read_by_ids(missing, **kwargs).items():
+                self.cache.put(_id, options, row, version)
+                results[_id] = row
+        return results
+
+    def iter_many(  # pylint: disable=too-many-arguments
+        self,
+        where: Dict[str, Any] | None = None,
+        batch_size: int = 1000,
+        fields: List[str] | None = None,
+        order_by: str | None = None,
+        **kwargs,
+    ) -> Iterator[Dict[str, Any]]:
+        return self.table.iter_many(
+            where, batch_size, fields=fields, order_by=order_by, **kwargs
+        )
+
+    def count(self, where: Dict[str, Any] | None = None) -> int:
+        return self.table.count(where)
+
+    def nearest(
+        self, lat: float, lon: float, k: int = 10, radius: float = 5000.0
+    ) -> List[Dict[str, Any]]:
+        return self.table.nearest(lat, lon, k, radius)
+
+    def update_one(self, _id: str, data: Dict[str, Any]) -> bool:
+        try:
+            return self.table.update_one(_id, data)
+        finally:
+            self.cache.invalidate(_id)
+
+    def delete_one(self, _id: str, **kwargs) -> bool:
+        try:
+            return self.table.delete_one(_id, **kwargs)
+        finally:
+            self.cache.invalidate(_id)
+
+    def create_many(self, rows: List[Dict[str, Any]]) -> WriteResult:
+        try:
+            return self.table.create_many(rows)
+        finally:
+            self.cache.invalidate(*(row.get("id") for row in rows))
+
+    def upsert_many(self, rows: List[Dict[str, Any]]) -> WriteResult:
+        try:
+            return self.table.upsert_many(rows)
+        finally:
+            self.cache.invalidate(*(row.get("id") for row in rows))
+
+
+class CacheRegistry:
+    """Table caches shared by all the sessions of a database in the process."""
+
+    def __init__(self, config: Dict[TableName, CacheConfig] | None = None):
+        self.config = CACHE_CONFIG if config is None else config
+        self._caches: Dict[tuple[str, TableName], TableCache] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, table_name: TableName) -> TableCache | None:
+        """Cache of a table of the namespace database, None if it isn't cached."""
+        if table_name not in self.config:
+            return None
+        with self._lock:
+            key = (namespace, table_name)
+            if key not in self._caches:
+                self._caches[key] = TableCache(self.config[table_name])
+            return self._caches[key]
+
+    def clear(self, namespace: str | None = None, table_name: TableName | None = None):
+        with self._lock:
+            caches = [
+                cache
+                for (cache_namespace, cache_table), cache in self._caches.items()
+                if namespace in (None, cache_namespace)
+                and table_name in (None, cache_table)
+            ]
+        for cache in caches:
+            cache.clear()
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            caches = list(self._caches.items())
+        return {
+            f"{namespace}/{table}": cache.metrics()
+            for (namespace, table), cache in caches
+        }
+
+
+table_caches = CacheRegistry()
+cache_metrics = table_caches.metrics
+
+
+class CachedDBAdapter(BaseDBAdapter):
+    """
+    Any adapter with the read-through caches of the CACHE_CONFIG tables.
+
+    Only the writes made through a CachedDBAdapter invalidate the cache; rows
+    written by other processes are seen once they expire.
+    """
+
+    def __init__(self, adapter: BaseDBAdapter, caches: CacheRegistry | None = None):
+        # pylint: disable=super-init-not-called
+        self.adapter = adapter
+        self.env = adapter.env
+        self.logger = adapter.logger
+        self.caches = table_caches if caches is None else caches
+        self.namespace = str(adapter.env)
+
+    def use_db(self, db_name: str) -> Self:
+        self.adapter.use_db(db_name)
+        self.namespace = f"{self.adapter.env}/{db_name}"
+        return self
+
+    def table(self, table_name: TableName) -> BaseTable:
+        table = self.adapter.table(table_name)
+        cache = self.caches.get(self.namespace, table_name)
+        return table if cache is None else CachedTable(table, cache)
+
+    def create_table(self, table_name: TableName, **kwargs) -> Self:
+        self.adapter.create_table(table_name, **kwargs)
+        return self
+
+    def drop_table(self, table_name: TableName) -> None:
+        self.adapter.drop_table(table_name)
+        self.caches.clear(self.namespace, table_name)
+
+
+def with_cache(adapter: BaseDBAdapter) -> BaseDBAdapter:
+    """adapter behind the table caches, unless DB_CACHE is off."""
+    if os.environ.get("DB_CACHE", "on").lower() in ("off", "0", "false"):
+        return adapter
+    return CachedDBAdapter(adapter)
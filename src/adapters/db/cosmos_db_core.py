@@ -1,6 +1,8 @@
 import os
+import re
 from abc import ABC
-from typing import Self, Dict, Any
+from collections import defaultdict
+from typing import Self, Dict, Any, Iterator, List
 
 from azure.cosmos import exceptions
 from azure.cosmos.container import ContainerProxy
@@ -8,76 +10,233 @@ from azure.cosmos.cosmos_client import CosmosClient
 from azure.cosmos.database import DatabaseProxy
 from azure.cosmos.partition_key import PartitionKey
 
-from src.adapters.db.base import BaseDBAdapter
+from src.adapters.db.base import (
+    BaseDBAdapter,
+    BaseTable,
+    WriteResult,
+    where_conditions,
+)
+from src.adapters.db.cached import with_cache
+from src.adapters.db.instrumentation import instrumented, note_request_charge
 from src.schemas.common import EnvType, TableName, Operator
 
+# max operations of a transactional batch
+BATCH_SIZE = 100
+FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+COMPARISONS = {
+    Operator.EQ: "=",
+    Operator.NE: "!=",
+    Operator.GT: ">",
+    Operator.GTE: ">=",
+    Operator.LT: "<",
+    Operator.LTE: "<=",
+}
 
-class CosmosDBCoreAdapter(BaseDBAdapter, ABC):
-    container = None
-    db = None
 
-    def __init__(self, env: EnvType, logger):
-        super().__init__(env, logger)
-        self.client = CosmosClient(
-            os.environ[f"{env.upper()}_COSMOS_DB_ACCOUNT_HOST"],
-            {"masterKey": os.environ[f"{env.upper()}_COSMOS_DB_ACCOUNT_KEY"]},
-        )
-
-    def use_db(self, db_name: str) -> Self:
-        self.db: DatabaseProxy = self.client.get_database_client(db_name)
-        return self
+class CosmosDBTable(BaseTable):
+    backend = "cosmos"
 
-    def use_table(self, table_name: TableName) -> Self:
-        self.container: ContainerProxy = self.db.get_container_client(table_name)
-        return self
+    def __init__(self, container: ContainerProxy, name: TableName):
+        super().__init__(name)
+        self.container = container
+        # read from the container on the first bulk write
+        self._partition_key_path: list[str] | None = None
 
+    @instrumented("create_one")
     def create_one(self, data: Dict[str, Any]) -> str:
         try:
-            return self.container.create_item(data)["id"]
+            return self.container.create_item(data, response_hook=note_request_charge)[
+                "id"
+            ]
         except exceptions.CosmosResourceExistsError:
             return data["id"]
 
+    @instrumented("create_or_update_one")
     def create_or_update_one(self, data: Dict[str, Any]) -> str:
-        return self.container.upsert_item(data)["id"]
+        return self.container.upsert_item(data, response_hook=note_request_charge)["id"]
 
-    def read_one(self, _id: str, **kwargs) -> Dict[str, Any] | None:
+    @instrumented("read_one")
+    def read_one(
+        self, _id: str, fields: list[str] | None = None, **kwargs
+    ) -> Dict[str, Any] | None:
         try:
-            return self.container.read_item(_id, kwargs["partition_key"])
+            item = self.container.read_item(
+                _id, kwargs["partition_key"], response_hook=note_request_charge
+            )
         except KeyError as exc:
             raise KeyError("missing argument: 'partition_key'") from exc
         except exceptions.CosmosResourceNotFoundError:
             return None
+        # point reads return the whole item
+        return {field: item.get(field) for field in fields} if fields else item
 
+    @instrumented("read_many")
     def read_many(
-        self, where: dict[str, str | tuple] | None = None, limit=10, **kwargs
+        self,
+        where: dict[str, str | tuple] | None = None,
+        limit=10,
+        fields: list[str] | None = None,
+        **kwargs,
     ) -> list[dict[str, Any]]:
         partition_key = kwargs.get("partition_key")
         if partition_key is None:
             raise ValueError("partition_key is required")
-        if where:
-            where_str, where_params = format_where(where)
+        if where or fields:
+            where_str, where_params = format_where(where or {})
+            query = f"SELECT {format_select(fields)} FROM r"
+            if where_str:
+                query += f" WHERE {where_str}"
             return list(
                 self.container.query_items(
-                    f"SELECT * FROM r WHERE {where_str}",
+                    query,
                     where_params,
                     partition_key,
                     max_item_count=limit,
+                    response_hook=note_request_charge,
                 )
             )
-        return list(self.container.read_all_items(limit))
+        return list(
+            self.container.read_all_items(limit, response_hook=note_request_charge)
+        )
+
+    @instrumented("read_by_ids")
+    def read_by_ids(
+        self, ids: list[str], fields: list[str] | None = None, **kwargs
+    ) -> dict[str, dict[str, Any] | None]:
+        """
+        Items by id, in the order of ids, with None for the ids that don't exist.
+        One query within partition_key, or across all partitions without it.
+        """
+        if fields and "id" not in fields:
+            fields = ["id"] + list(fields)
+        partition_key = kwargs.get("partition_key")
+        results = dict.fromkeys(ids)
+        if not results:
+            return results
+        items = self.container.query_items(
+            f"SELECT {format_select(fields)} FROM r WHERE ARRAY_CONTAINS(@ids, r.id)",
+            parameters=[{"name": "@ids", "value": list(results)}],
+            partition_key=partition_key,
+            enable_cross_partition_query=partition_key is None,
+            response_hook=note_request_charge,
+        )
+        for item in items:
+            results[item["id"]] = item
+        return results
 
+    @instrumented("iter_many")
+    def iter_many(  # pylint: disable=too-many-arguments
+        self,
+        where: dict[str, str | tuple] | None = None,
+        batch_size=1000,
+        fields: list[str] | None = None,
+        order_by: str | None = None,
+        **kwargs,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Stream the items page by page, following the continuation tokens. Without
+        a partition_key the query runs across all partitions.
+        """
+        partition_key = kwargs.get("partition_key")
+        query, params = f"SELECT {format_select(fields)} FROM r", []
+        if where:
+            where_str, params = format_where(where)
+            query += f" WHERE {where_str}"
+        if order_by is not None:
+            query += f" ORDER BY r.{order_by}"
+        items = self.container.query_items(
+            query,
+            parameters=params,
+            partition_key=partition_key,
+            enable_cross_partition_query=partition_key is None,
+            max_item_count=batch_size,
+            response_hook=note_request_charge,
+        )
+        for page in items.by_page():
+            yield from page
+
+    def _grid_key(self) -> tuple:
+        # one grid per container, the tables of a container share it
+        return self.backend, self.container.container_link
+
+    @instrumented("update_one")
     def update_one(self, _id: str, data: Dict[str, Any]) -> bool:
-        response = self.container.replace_item(_id, data)
+        response = self.container.replace_item(
+            _id, data, response_hook=note_request_charge
+        )
         return bool(response["_ts"])
 
+    @instrumented("delete_one")
     def delete_one(self, _id: str, **kwargs) -> bool:
         partition_key = kwargs.get("partition_key")
         if partition_key is None:
             raise ValueError("partition_key is required")
 
-        self.container.delete_item(_id, partition_key)
+        self.container.delete_item(_id, partition_key, response_hook=note_request_charge)
         return True
 
+    def _partition_key(self, row: Dict[str, Any]) -> Any:
+        if self._partition_key_path is None:
+            path = self.container.read()["partitionKey"]["paths"][0]
+            self._partition_key_path = path.strip("/").split("/")
+        value = row
+        for key in self._partition_key_path:
+            value = value.get(key) if isinstance(value, dict) else None
+        return value
+
+    def _write_many(self, operation: str, rows: List[Dict[str, Any]], write_one):
+        """
+        Write rows in transactional batches, one per partition key. A failed batch
+        is rolled back as a whole, its rows are then written one by one so only
+        the rows in error are reported.
+        """
+        results: WriteResult = [None] * len(rows)
+        by_partition = defaultdict(list)
+        for i, row in enumerate(rows):
+            by_partition[self._partition_key(row)].append(i)
+
+        for partition_key, indexes in by_partition.items():
+            for start in range(0, len(indexes), BATCH_SIZE):
+                batch = indexes[start : start + BATCH_SIZE]
+                try:
+                    self.container.execute_item_batch(
+                        [(operation, (rows[i],)) for i in batch],
+                        partition_key,
+                        response_hook=note_request_charge,
+                    )
+                    for i in batch:
+                        results[i] = rows[i]["id"]
+                except exceptions.CosmosBatchOperationError:
+                    for i in batch:
+                        results[i] = self._write_row(write_one, rows[i])
+        return results
+
+    @instrumented("create_many")
+    def create_many(self, rows: List[Dict[str, Any]]) -> WriteResult:
+        return self._write_many("create", rows, self.create_one)
+
+    @instrumented("upsert_many")
+    def upsert_many(self, rows: List[Dict[str, Any]]) -> WriteResult:
+        return self._write_many("upsert", rows, self.create_or_update_one)
+
+
+class CosmosDBCoreAdapter(BaseDBAdapter, ABC):
+    db = None
+
+    def __init__(self, env: EnvType, logger):
+        super().__init__(env, logger)
+        self.client = CosmosClient(
+            os.environ[f"{env.upper()}_COSMOS_DB_ACCOUNT_HOST"],
+            {"masterKey": os.environ[f"{env.upper()}_COSMOS_DB_ACCOUNT_KEY"]},
+        )
+
+    def use_db(self, db_name: str) -> Self:
+        self.db: DatabaseProxy = self.client.get_database_client(db_name)
+        return self
+
+    def table(self, table_name: TableName) -> CosmosDBTable:
+        return CosmosDBTable(self.db.get_container_client(table_name), table_name)
+
     def create_db(self, db_id: str | None = None) -> Self:
         if not db_id:
             db_id = os.environ[f"{self.env.upper()}_COSMOS_DB_DATABASE_ID"]
@@ -95,14 +254,12 @@ class CosmosDBCoreAdapter(BaseDBAdapter, ABC):
             raise ValueError("partition_key is required")
 
         try:
-            self.container = self.db.create_container(
-                table_name, PartitionKey(path=f"/{partition_key}")
-            )
+            self.db.create_container(table_name, PartitionKey(path=f"/{partition_key}"))
             self.logger.info("Container with id '%s' created", table_name)
         except exceptions.CosmosResourceExistsError:
             self.logger.info("Container with id '%s' already exists", table_name)
-            self.container = self.db.get_container_client(table_name)
-        return self
+        # the CRUD methods of the adapter work on the created table
+        return self.use_table(table_name)
 
     def drop_table(self, table_name: TableName) -> None:
         try:
@@ -118,23 +275,34 @@ class CosmosDBCoreAdapter(BaseDBAdapter, ABC):
             self.logger.info("Database with id '%s' was not found", self.db.id)
 
 
+# Function to format the projection of a CosmosDB query
+def format_select(fields: list[str] | None) -> str:
+    if not fields:
+        return "*"
+    for field in fields:
+        if not FIELD_NAME.match(field):
+            raise ValueError(f"Invalid field: {field}")
+    return ", ".join(f"r.{field}" for field in fields)
+
+
 # Function to format the where clause for CosmosDB query
 def format_where(where: dict[str, str | tuple]) -> tuple[str, list[dict[str, Any]]]:
     where_str = ""
     where_params = []
     for key, value in where.items():
-        if isinstance(value, tuple):
-            if value[0] == Operator.NE:
-                where_str += f"r.{key}!=@{key} AND "
-                where_params.append({"name": f"@{key}", "value": value[1]})
-        else:
-            where_str += f"r.{key}=@{key} AND "
-            where_params.append({"name": f"@{key}", "value": value})
+        for i, (operator, operand) in enumerate(where_conditions(value)):
+            name = f"@{key}_{i}" if i else f"@{key}"
+            if operator == Operator.IN:
+                where_str += f"ARRAY_CONTAINS({name}, r.{key}) AND "
+                operand = list(operand)
+            else:
+                where_str += f"r.{key}{COMPARISONS[operator]}{name} AND "
+            where_params.append({"name": name, "value": operand})
 
     return where_str.rstrip(" AND "), where_params
 
 
-def init_db_session(logger) -> CosmosDBCoreAdapter:
+def init_db_session(logger) -> BaseDBAdapter:
     env_name = os.environ["ENV_NAME"]
     db_name = os.environ[f"{env_name.upper()}_COSMOS_DB_DATABASE_ID"]
-    return CosmosDBCoreAdapter(EnvType(env_name), logger).use_db(db_name)
+    return with_cache(CosmosDBCoreAdapter(EnvType(env_name), logger)).use_db(db_name)
@@ -0,0 +1,319 @@
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple
+
+from src.adapters.db.base import WriteError
+
+logger = logging.getLogger(__name__)
+
+# calls slower than this many milliseconds are logged with their queries
+DEFAULT_SLOW_QUERY_MS = 500.0
+# statements logged in full, longer ones are cut
+MAX_QUERY_LENGTH = 2000
+
+
+class QueryEvent(NamedTuple):
+    """One call of a table method, with the queries it sent."""
+
+    backend: str
+    table: str
+    operation: str
+    duration: float  # seconds
+    rows: int
+    request_charge: float | None  # Cosmos request units
+    queries: tuple[str, ...]  # parameterized SQL, Postgres only
+    error: str | None = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "table": self.table,
+            "operation": self.operation,
+            "duration_ms": round(self.duration * 1000, 3),
+            "rows": self.rows,
+            "request_charge": self.request_charge,
+            "error": self.error,
+        }
+
+
+class _Call:  # pylint: disable=too-many-instance-attributes
+    def __init__(self, backend: str, table: str, operation: str):
+        self.backend = backend
+        self.table = table
+        self.operation = operation
+        self.duration = 0.0
+        self.rows = 0
+        self.request_charge: float | None = None
+        self.queries: List[str] = []
+        self.error: str | None = None
+
+    def event(self) -> QueryEvent:
+        return QueryEvent(
+            self.backend,
+            self.table,
+            self.operation,
+            self.duration,
+            self.rows,
+            self.request_charge,
+            tuple(self.queries),
+            self.error,
+        )
+
+
+class QuerySink(ABC):
+    """Receives every QueryEvent, e.g. to export it to a metrics backend."""
+
+    @abstractmethod
+    def record(self, event: QueryEvent) -> None:
+        pass
+
+
+class MetricsSink(QuerySink):
+    """Totals per backend, table and operation, for GET /metrics."""
+
+    def __init__(self):
+        self._totals: Dict[tuple[str, str, str], Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, event: QueryEvent) -> None:
+        key = (event.backend, event.table, event.operation)
+        with self._lock:
+            totals = self._totals.setdefault(
+                key,
+                {
+                    "calls": 0,
+                    "errors": 0,
+                    "rows": 0,
+                    "time_total": 0.0,
+                    "time_max": 0.0,
+                    "request_charge": 0.0,
+                },
+            )
+            totals["calls"] += 1
+            totals["errors"] += event.error is not None
+            totals["rows"] += event.rows
+            totals["time_total"] += event.duration
+            totals["time_max"] = max(totals["time_max"], event.duration)
+            totals["request_charge"] += event.request_charge or 0.0
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {"/".join(key): dict(totals) for key, totals in self._totals.items()}
+
+
+class LoggingSink(QuerySink):
+    """Logs every call at debug level."""
+
+    def __init__(self, log: logging.Logger = logger):
+        self.log = log
+
+    def record(self, event: QueryEvent) -> None:
+        self.log.debug("db %s", event.as_dict())
+
+
+_current_call: ContextVar[_Call | None] = ContextVar("db_current_call", default=None)
+_request_events: ContextVar[List[QueryEvent] | None] = ContextVar(
+    "db_request_events", default=None
+)
+
+
+def _count_rows(operation: str, result: Any) -> int:
+    if result is None:
+        return 0
+    if operation == "read_by_ids":
+        return sum(row is not None for row in result.values())
+    if isinstance(result, list):
+        return sum(not isinstance(row, WriteError) for row in result)
+    return 1 if result else 0
+
+
+def _short(query: str) -> str:
+    query = " ".join(query.split())
+    return query if len(query) <= MAX_QUERY_LENGTH else query[:MAX_QUERY_LENGTH] + "..."
+
+
+class QueryRecorder:
+    """
+    Times the table calls of the database adapters and sends them to the sinks.
+
+    Calls slower than slow_query_ms are logged with their parameterized SQL;
+    with explain, the plan of each slow SELECT is logged too, from a second run
+    of it under EXPLAIN (ANALYZE, BUFFERS). Calls made by another call (e.g. the
+    row by row retry of a bulk write) count as part of it.
+    """
+
+    def __init__(self):
+        self.sinks: List[QuerySink] = [MetricsSink()]
+        self.slow_query_ms = float(
+            os.environ.get("DB_SLOW_QUERY_MS", DEFAULT_SLOW_QUERY_MS)
+        )
+        self.explain = os.environ.get("DB_SLOW_QUERY_EXPLAIN", "off").lower() in (
+            "on",
+            "1",
+            "true",
+        )
+
+    def add_sink(self, sink: QuerySink) -> None:
+        self.sinks.append(sink)
+
+    def remove_sink(self, sink: QuerySink) -> None:
+        self.sinks.remove(sink)
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        for sink in self.sinks:
+            if isinstance(sink, MetricsSink):
+                return sink.metrics()
+        return {}
+
+    def is_slow(self, duration: float) -> bool:
+        return duration * 1000 >= self.slow_query_ms
+
+    @contextmanager
+    def _active(self, call: _Call) -> Iterator[None]:
+        token = _current_call.set(call)
+        started_at = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            call.error = type(e).__name__
+            raise
+        finally:
+            call.duration += time.perf_counter() - started_at
+            _current_call.reset(token)
+
+    def _finish(self, call: _Call) -> None:
+        event = call.event()
+        if self.is_slow(event.duration):
+            logger.warning(
+                "slow db call %s.%s on %s took %.1f ms, %s rows: %s",
+                event.table,
+                event.operation,
+                event.backend,
+                event.duration * 1000,
+                event.rows,
+                [_short(query) for query in event.queries],
+            )
+        events = _request_events.get()
+        if events is not None:
+            events.append(event)
+        for sink in self.sinks:
+            try:
+                sink.record(event)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.warning("query sink %s failed: %s", type(sink).__name__, e)
+
+    def instrumented(self, operation: str) -> Callable:
+        """
+        Decorator of the table methods; the table has a name and a backend. Works
+        on plain methods, coroutines and generators (timed while producing).
+        """
+
+        def decorator(method):
+            if inspect.isgeneratorfunction(method):
+
+                @functools.wraps(method)
+                def generator_wrapper(table, *args, **kwargs):
+                    if _current_call.get() is not None:
+                        yield from method(table, *args, **kwargs)
+                        return
+                    call = _Call(table.backend, table.name, operation)
+                    rows = method(table, *args, **kwargs)
+                    try:
+                        while True:
+                            with self._active(call):
+                                row = next(rows, StopIteration)
+                            if row is StopIteration:
+                                break
+                            call.rows += 1
+                            yield row
+                    finally:
+                        self._finish(call)
+
+                return generator_wrapper
+
+            if inspect.iscoroutinefunction(method):
+
+                @functools.wraps(method)
+                async def coroutine_wrapper(table, *args, **kwargs):
+                    if _current_call.get() is not None:
+                        return await method(table, *args, **kwargs)
+                    call = _Call(table.backend, table.name, operation)
+                    try:
+                        with self._active(call):
+                            result = await method(table, *args, **kwargs)
+                        call.rows = _count_rows(operation, result)
+                        return result
+                    finally:
+                        self._finish(call)
+
+                return coroutine_wrapper
+
+            @functools.wraps(method)
+            def wrapper(table, *args, **kwargs):
+                if _current_call.get() is not None:
+                    return method(table, *args, **kwargs)
+                call = _Call(table.backend, table.name, operation)
+                try:
+                    with self._active(call):
+                        result = method(table, *args, **kwargs)
+                    call.rows = _count_rows(operation, result)
+                    return result
+                finally:
+                    self._finish(call)
+
+            return wrapper
+
+        return decorator
+
+
+recorder = QueryRecorder()
+instrumented = recorder.instrumented
+add_query_sink = recorder.add_sink
+remove_query_sink = recorder.remove_sink
+query_metrics = recorder.metrics
+
+
+def note_query(query: str | bytes) -> None:
+    """Add a statement sent by the backend to the current call."""
+    call = _current_call.get()
+    if call is not None:
+        call.queries.append(query.decode() if isinstance(query, bytes) else str(query))
+
+
+def note_request_charge(headers: Dict[str, Any], *_args) -> None:
+    """Cosmos response_hook adding the request units of a response to the call."""
+    call = _current_call.get()
+    charge = headers.get("x-ms-request-charge") if headers else None
+    if call is not None and charge is not None:
+        call.request_charge = (call.request_charge or 0.0) + float(charge)
+
+
+@contextmanager
+def request_summary() -> Iterator[List[QueryEvent]]:
+    """Collect the events of the database calls made within the block."""
+    events: List[QueryEvent] = []
+    token = _request_events.set(events)
+    try:
+        yield events
+    finally:
+        _request_events.reset(token)
+
+
+def summarize(events: List[QueryEvent]) -> Dict[str, Any]:
+    """Debug summary of the calls of a request, for the handler response."""
+    charges = [event.request_charge for event in events if event.request_charge]
+    return {
+        "calls": len(events),
+        "duration_ms": round(sum(event.duration for event in events) * 1000, 3),
+        "rows": sum(event.rows for event in events),
+        "request_charge": sum(charges) if charges else None,
+        "slow_calls": sum(recorder.is_slow(event.duration) for event in events),
+        "details": [event.as_dict() for event in events],
+    }
@@ -0,0 +1,258 @@
+import asyncio
+import os
+import uuid
+from typing import Any, Dict, List
+
+from psycopg import AsyncConnection, Error as PsycopgError
+from psycopg.types.json import Jsonb
+from psycopg.types.string import TextLoader
+from psycopg_pool import AsyncConnectionPool
+
+from src.adapters.db.base import WriteError, WriteResult
+from src.adapters.db.instrumentation import instrumented, note_query
+from src.adapters.db.postgresql_core import (
+    READ_BY_IDS_CHUNK,
+    TABLE_COLUMNS,
+    TABLES_WITH_DATA_COLUMN,
+    PostgreSQLQueries,
+)
+from src.adapters.db.postgresql_pool import (
+    DEFAULT_MAX_LIFETIME,
+    DEFAULT_MAX_SIZE,
+    DEFAULT_MIN_SIZE,
+    DEFAULT_TIMEOUT,
+    connection_params,
+)
+from src.schemas.common import EnvType, TableName
+
+
+async def _configure(connection: AsyncConnection) -> None:
+    # uuid columns are read as str, like psycopg2 does
+    connection.adapters.register_loader("uuid", TextLoader)
+
+
+class AsyncPostgreSQLTable(PostgreSQLQueries):
+    """
+    The CRUD of PostgreSQLTable as coroutines, on a psycopg 3 async pool.
+    The SQL is the same, only the parameters are adapted for psycopg 3.
+    """
+
+    backend = "postgres"
+
+    def __init__(self, pool: AsyncConnectionPool, name: TableName):
+        self.name = name
+        self.pool = pool
+        self.columns = TABLE_COLUMNS.get(name, [])
+        self.has_data_column = name in TABLES_WITH_DATA_COLUMN
+
+    @staticmethod
+    def _json(value: Any) -> Any:
+        return Jsonb(value)
+
+    @staticmethod
+    def _in(column: str, values: list) -> tuple[str, Any]:
+        # psycopg 3 sends a list of str untyped, Postgres types it like the column
+        return f"{column} = ANY(%s)", list(values)
+
+    async def _execute(self, query: str, params) -> tuple[list, Any, int]:
+        """Run a query, return its rows (if any), description and row count."""
+        async with self.pool.connection() as connection:
+            async with connection.cursor() as cursor:
+                note_query(query)
+                await cursor.execute(query, params)
+                rows = await cursor.fetchall() if cursor.description else []
+                return rows, cursor.description, cursor.rowcount
+
+    @instrumented("create_one")
+    async def create_one(self, data: Dict[str, Any]) -> str:
+        _id = data.get("id")
+        if not _id:
+            _id = str(uuid.uuid4())
+            data["id"] = _id
+
+        rows, _, _ = await self._execute(*self._insert_query(data))
+        return rows[0][0] if rows else _id
+
+    @instrumented("create_or_update_one")
+    async def create_or_update_one(self, data: Dict[str, Any]) -> bool:
+        if not data.get("id"):
+            raise ValueError("ID is required for create_or_update_one")
+
+        await self._execute(*self._insert_query(data, upsert=True))
+        return True
+
+    @instrumented("read_one")
+    async def read_one(  # pylint: disable=unused-argument
+        self, _id: str, fields: List[str] | None = None, **kwargs
+    ) -> Dict[str, Any] | None:
+        rows, description, _ = await self._execute(
+            f"SELECT {self._select(fields)} FROM {self.name} WHERE id = %s", (_id,)
+        )
+        return self._row_decoder(description, fields)(rows[0]) if rows else None
+
+    @instrumented("read_many")
+    async def read_many(  # pylint: disable=unused-argument
+        self,
+        where: Dict[str, Any] | None = None,
+        limit: int | None = None,
+        fields: List[str] | None = None,
+        order_by: str | None = None,
+        offset: int | None = None,
+        **kwargs,
+    ) -> List[Dict[str, Any]]:
+        rows, description, _ = await self._execute(
+            *self._select_query(where, fields, limit, order_by, offset)
+        )
+        decode = self._row_decoder(description, fields)
+        return [decode(row) for row in rows]
+
+    @instrumented("count")
+    async def count(self, where: Dict[str, Any] | None = None) -> int:
+        rows, _, _ = await self._execute(*self._count_query(where))
+        return rows[0][0]
+
+    @instrumented("nearest")
+    async def nearest(
+        self, lat: float, lon: float, k: int = 10, radius: float = 5000.0
+    ) -> List[Dict[str, Any]]:
+        rows, description, _ = await self._execute(
+            *self._nearest_query(lat, lon, k, radius)
+        )
+        decode = self._row_decoder(description, None)
+        return [row for row in map(decode, rows) if row["distance"] <= radius]
+
+    @instrumented("read_by_ids")
+    async def read_by_ids(  # pylint: disable=unused-argument
+        self, ids: List[str], fields: List[str] | None = None, **kwargs
+    ) -> Dict[str, Dict[str, Any] | None]:
+        if fields and "id" not in fields:
+            fields = ["id"] + list(fields)
+        results = dict.fromkeys(ids)
+        unique_ids = list(results)
+        for start in range(0, len(unique_ids), READ_BY_IDS_CHUNK):
+            condition, param = self._in(
+                "id", unique_ids[start : start + READ_BY_IDS_CHUNK]
+            )
+            rows, description, _ = await self._execute(
+                f"SELECT {self._select(fields)} FROM {self.name} WHERE {condition}",
+                (param,),
+            )
+            decode = self._row_decoder(description, fields)
+            for row in rows:
+                row = decode(row)
+                results[str(row["id"])] = row
+        return results
+
+    @instrumented("update_one")
+    async def update_one(self, _id: str, data: Dict[str, Any]) -> bool:
+        update = self._update_query(_id, data)
+        if update is None:
+            return False
+        _, _, rowcount = await self._execute(*update)
+        return rowcount > 0
+
+    @instrumented("delete_one")
+    async def delete_one(  # pylint: disable=unused-argument
+        self, _id: str, **kwargs
+    ) -> bool:
+        _, _, rowcount = await self._execute(
+            f"DELETE FROM {self.name} WHERE id = %s", (_id,)
+        )
+        return rowcount > 0
+
+    @instrumented("upsert_many")
+    async def upsert_many(self, rows: List[Dict[str, Any]]) -> WriteResult:
+        """
+        Create or update rows with one pipelined executemany per column list; a
+        failing group is retried row by row, so only the rows in error are reported.
+        """
+        results: WriteResult = [
+            None if row.get("id") else WriteError(None, "ID is required for upsert")
+            for row in rows
+        ]
+        groups: Dict[str, list] = {}
+        for i, row in enumerate(rows):
+            if results[i] is None:
+                query, values = self._insert_query(row, upsert=True)
+                groups.setdefault(query, []).append((i, values))
+
+        async with self.pool.connection() as connection:
+            for query, group in groups.items():
+                note_query(query)
+                try:
+                    async with connection.cursor() as cursor:
+                        await cursor.executemany(query, [values for _, values in group])
+                    for i, _ in group:
+                        results[i] = rows[i]["id"]
+                except PsycopgError:
+                    for i, values in group:
+                        try:
+                            await connection.execute(query, values)
+                            results[i] = rows[i]["id"]
+                        except PsycopgError as e:
+                            results[i] = WriteError(rows[i]["id"], str(e).strip())
+        return results
+
+
+class AsyncPostgreSQLCoreAdapter:
+    """Async counterpart of PostgreSQLCoreAdapter: tables of coroutines."""
+
+    def __init__(self, env: EnvType, logger, pool: AsyncConnectionPool):
+        self.env = env
+        self.logger = logger
+        self.pool = pool
+
+    def table(self, table_name: TableName) -> AsyncPostgreSQLTable:
+        return AsyncPostgreSQLTable(self.pool, table_name)
+
+
+class AsyncPoolRegistry:
+    """One open async pool per EnvType, within the event loop that opened it."""
+
+    def __init__(self):
+        self._pools: Dict[EnvType, AsyncConnectionPool] = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, env: EnvType) -> AsyncConnectionPool:
+        """Return the opened pool of env, sized like the psycopg2 pools."""
+        async with self._lock:
+            if env not in self._pools:
+                params = connection_params(env)
+                params["dbname"] = params.pop("database")
+                prefix = f"{env.upper()}_POSTGRES_POOL"
+                pool = AsyncConnectionPool(
+                    kwargs={**params, "autocommit": True},
+                    min_size=int(os.environ.get(f"{prefix}_MIN", DEFAULT_MIN_SIZE)),
+                    max_size=int(os.environ.get(f"{prefix}_MAX", DEFAULT_MAX_SIZE)),
+                    max_lifetime=float(
+                        os.environ.get(f"{prefix}_MAX_LIFETIME", DEFAULT_MAX_LIFETIME)
+                    ),
+                    timeout=DEFAULT_TIMEOUT,
+                    configure=_configure,
+                    check=AsyncConnectionPool.check_connection,
+                    open=False,
+                )
+                await pool.open()
+                self._pools[env] = pool
+            return self._pools[env]
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {str(env): pool.get_stats() for env, pool in list(self._pools.items())}
+
+    async def close(self) -> None:
+        async with self._lock:
+            closing, self._pools = list(self._pools.values()), {}
+        for pool in closing:
+            await pool.close()
+
+
+async_pools = AsyncPoolRegistry()
+get_async_pool = async_pools.get
+async_pool_metrics = async_pools.metrics
+close_async_pools = async_pools.close
+
+
+async def init_async_db_session(logger) -> AsyncPostgreSQLCoreAdapter:
+    """Async PostgreSQL session on the process-wide async pool of ENV_NAME."""
+    env = EnvType(os.environ.get("ENV_NAME", "local"))
+    return AsyncPostgreSQLCoreAdapter(env, logger, await get_async_pool(env))
@@ -1,14 +1,30 @@
+import io
+import json
 import os
+import re
 import uuid
-from typing import Any, Dict, List, Self
-
-from psycopg2 import connect
-from psycopg2.extras import RealDictCursor, Json
-
-from src.adapters.db.base import BaseDBAdapter
-from src.schemas.common import EnvType, TableName
-
-# Define the relational columns for each table (excluding id, data, created_at, updated_at)
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Self
+
+from psycopg2 import Error as PsycopgError
+from psycopg2.extras import Json, execute_values
+from pydantic_core import to_jsonable_python
+
+from src.adapters.db.base import (
+    BaseDBAdapter,
+    BaseTable,
+    WriteError,
+    WriteResult,
+    where_conditions,
+)
+from src.adapters.db.cached import with_cache
+from src.adapters.db.instrumentation import instrumented
+from src.adapters.db.postgresql_pool import ConnectionPool, get_pool
+from src.helpers.geo import EARTH_RADIUS, min_cos_lat, radius_box
+from src.schemas.common import EnvType, Operator, TableName
+
+# Relational columns of each table (excluding id, data, created_at and updated_at)
 TABLE_COLUMNS = {
     TableName.RECEIPT: [
         "user_id",
@@ -48,6 +64,22 @@ TABLE_COLUMNS = {
     ],
     TableName.USER_IDENTITY: ["provider", "user_id"],
     TableName.USER_SESSION: ["identity_provider", "user_id", "user_name", "state"],
+    TableName.CIRCUIT_BREAKER: ["state", "opened_at"],
+}
+
+# rows per INSERT statement of the bulk writes
+PAGE_SIZE = 500
+# create_many loads at least this many rows with COPY through a staging table
+COPY_THRESHOLD = 5000
+STAGE_TABLE = "bulk_insert_stage"
+# ids per query of read_by_ids
+READ_BY_IDS_CHUNK = 1000
+# rows per round trip of the iter_many server-side cursor
+ITER_BATCH_SIZE = 1000
+
+# Columns computed by Postgres: filtered and sorted on, never written or returned
+GENERATED_COLUMNS = {
+    TableName.SHOP: ["location"],  # point(lon, lat) of osm_data, GiST indexed
 }
 
 # Tables that have the 'data' JSONB column for extra fields
@@ -58,35 +90,176 @@ TABLES_WITH_DATA_COLUMN = {
 }
 
 
-class PostgreSQLCoreAdapter(BaseDBAdapter):
-    def __init__(self, env: EnvType, logger):
-        super().__init__(env, logger)
-        self.connection = connect(
-            host=os.environ.get(f"{env.upper()}_POSTGRES_HOST", "localhost"),
-            port=os.environ.get(f"{env.upper()}_POSTGRES_PORT", "5432"),
-            database=os.environ.get(f"{env.upper()}_POSTGRES_DB", "postgres"),
-            user=os.environ.get(f"{env.upper()}_POSTGRES_USER", "postgres"),
-            password=os.environ.get(f"{env.upper()}_POSTGRES_PASSWORD", "postgres"),
-        )
-        self.connection.autocommit = True
-        self.current_table = None
-        self.current_db = None
-
-    def use_db(self, db_name: str) -> Self:
-        self.current_db = db_name
-        return self
-
-    def use_table(self, table_name: TableName) -> Self:
-        self.current_table = table_name
-        return self
+COMPARISONS = {
+    Operator.EQ: "=",
+    Operator.NE: "<>",
+    Operator.GT: ">",
+    Operator.GTE: ">=",
+    Operator.LT: "<",
+    Operator.LTE: "<=",
+}
+# haversine distance in meters of the location column to the point (lat, lat, lon)
+LOCATION_DISTANCE = (
+    f"2 * {EARTH_RADIUS} * asin(least(1, sqrt("
+    "power(sin(radians(location[1] - %s) / 2), 2)"
+    " + cos(radians(%s)) * cos(radians(location[1]))"
+    " * power(sin(radians(location[0] - %s) / 2), 2))))"
+)
+FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# columns left out of the row dicts of SELECT *
+HIDDEN_COLUMNS = ("created_at", "updated_at", "location")
+
+
+@lru_cache(maxsize=256)
+def _select_list(table: TableName, fields: tuple[str, ...] | None) -> str:
+    """Select list of the fields: columns, or data->'key' for the JSONB fields."""
+    if not fields:
+        return "*"
+    columns = ["id"] + TABLE_COLUMNS.get(table, [])
+    select = []
+    for field in fields:
+        if field in columns:
+            select.append(field)
+        elif table in TABLES_WITH_DATA_COLUMN and FIELD_NAME.match(field):
+            select.append(f"data->'{field}' AS \"{field}\"")
+        else:
+            raise ValueError(f"Unknown field of {table}: {field}")
+    return ", ".join(select)
+
+
+@lru_cache(maxsize=256)
+def _row_keys(
+    names: tuple[str, ...], projected: bool, has_data_column: bool
+) -> tuple[tuple[tuple[int, str], ...], int | None]:
+    """
+    (position, key) of the selected columns that go into the row dicts, and the
+    position of the data JSONB column merged into them.
+    """
+    if projected:
+        return tuple(enumerate(names)), None
+    data_index = names.index("data") if has_data_column and "data" in names else None
+    keys = tuple(
+        (i, name)
+        for i, name in enumerate(names)
+        if name not in HIDDEN_COLUMNS and i != data_index
+    )
+    return keys, data_index
+
+
+def _copy_value(value: Any) -> str:
+    """Value in the text format of COPY."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, Json):
+        value = json.dumps(value.adapted)
+    text = str(value)
+    for char, escaped in (("\\", "\\\\"), ("\t", "\\t"), ("\n", "\\n"), ("\r", "\\r")):
+        text = text.replace(char, escaped)
+    return text
+
+
+class PostgreSQLQueries:
+    """
+    SQL and parameters of the table operations, shared by the psycopg2 tables
+    and the async ones. Subclasses set name, columns and has_data_column.
+    """
+
+    name: TableName
+    columns: List[str]
+    has_data_column: bool
 
     def _get_table_columns(self) -> List[str]:
-        """Get the relational columns for the current table."""
-        return TABLE_COLUMNS.get(self.current_table, [])
+        """Get the relational columns for the table."""
+        return self.columns
 
     def _has_data_column(self) -> bool:
-        """Check if current table has a data JSONB column."""
-        return self.current_table in TABLES_WITH_DATA_COLUMN
+        """Check if the table has a data JSONB column."""
+        return self.has_data_column
+
+    @staticmethod
+    def _json(value: Any) -> Any:
+        return Json(value)
+
+    def _json_operand(self, value: Any) -> Any:
+        """
+        JSON of a where value in the form the rows are stored in, model_dump(mode=
+        "json"): UUIDs and datetimes as strings, enums as their values.
+        """
+        return self._json(to_jsonable_python(value))
+
+    @staticmethod
+    def _in(column: str, values: list) -> tuple[str, Any]:
+        """Membership test of a column; IN types the values like the column."""
+        return f"{column} IN %s", tuple(values)
+
+    def _select(self, fields: List[str] | None) -> str:
+        return _select_list(self.name, tuple(fields) if fields else None)
+
+    def _query_columns(self) -> List[str]:
+        """Columns the rows can be filtered and sorted on."""
+        return ["id"] + self._get_table_columns() + GENERATED_COLUMNS.get(self.name, [])
+
+    def _select_query(  # pylint: disable=too-many-arguments
+        self,
+        where: Dict[str, Any] | None,
+        fields: List[str] | None = None,
+        limit: int | None = None,
+        order_by: str | None = None,
+        offset: int | None = None,
+    ) -> tuple[str, tuple]:
+        """SELECT of the rows matching where, sorted on the order_by column."""
+        where_sql, params = self._where(where)
+        query = f"SELECT {self._select(fields)} FROM {self.name}{where_sql}"
+        if order_by is not None:
+            if order_by not in self._query_columns():
+                raise ValueError(f"Unknown column of {self.name}: {order_by}")
+            query += f" ORDER BY {order_by}"
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        if offset:
+            query += " OFFSET %s"
+            params.append(offset)
+        return query, tuple(params)
+
+    def _nearest_query(
+        self, lat: float, lon: float, k: int, radius: float
+    ) -> tuple[str, tuple]:
+        """
+        SELECT of the k rows nearest to the point, with their distance in meters.
+
+        The GiST index orders the points by their distance in degrees, which
+        shrinks a degree of longitude less than the Earth does: the k nearest in
+        degrees only bound the search. Every row closer than the k-th of them is
+        in a circle 1 / cos(latitude) larger, whose rows are sorted by their
+        haversine distance.
+        """
+        if "location" not in GENERATED_COLUMNS.get(self.name, []):
+            raise ValueError(f"{self.name} has no location")
+        query = f"""
+            WITH knn AS (
+                SELECT location <-> point(%s, %s) AS degrees FROM {self.name}
+                WHERE location <@ box(point(%s, %s), point(%s, %s))
+                ORDER BY location <-> point(%s, %s)
+                LIMIT %s
+            )
+            SELECT *, {LOCATION_DISTANCE} AS distance FROM {self.name}
+            WHERE location <@ circle(
+                point(%s, %s), (SELECT coalesce(max(degrees), 0) FROM knn) * %s
+            )
+            ORDER BY distance
+            LIMIT %s
+        """
+        params = (
+            (lon, lat, *radius_box(lat, lon, radius), lon, lat, k)
+            + (lat, lat, lon)
+            + (lon, lat, 1 / min_cos_lat(lat, radius), k)
+        )
+        return query, params
+
+    def _count_query(self, where: Dict[str, Any] | None) -> tuple[str, tuple]:
+        where_sql, params = self._where(where)
+        return f"SELECT count(*) FROM {self.name}{where_sql}", tuple(params)
 
     def _build_insert_data(self, data: Dict[str, Any]) -> tuple:
         """Build column names, placeholders, and values for INSERT."""
@@ -104,7 +277,7 @@ class PostgreSQLCoreAdapter(BaseDBAdapter):
                 columns.append(key)
                 # Handle special types
                 if isinstance(value, dict):
-                    values.append(Json(value))
+                    values.append(self._json(value))
                 else:
                     values.append(value)
                 placeholders.append("%s")
@@ -115,168 +288,412 @@ class PostgreSQLCoreAdapter(BaseDBAdapter):
         # Include data column only for tables that have it
         if self._has_data_column():
             columns.append("data")
-            values.append(Json(extra_data))
+            values.append(self._json(extra_data))
             placeholders.append("%s")
 
         return columns, placeholders, values
 
-    def create_one(self, data: Dict[str, Any]) -> str:
-        if not self.current_table:
-            raise ValueError("Table not selected. Use use_table() first.")
+    def _insert_query(self, data: Dict[str, Any], upsert: bool = False) -> tuple:
+        """INSERT of a row; upsert updates an existing id instead of skipping it."""
+        columns, placeholders, values = self._build_insert_data(data)
+        if upsert:
+            # Build UPDATE SET clause (exclude id)
+            update_set = ", ".join(f"{col} = EXCLUDED.{col}" for col in columns[1:])
+            conflict = f"DO UPDATE SET {update_set}"
+        else:
+            conflict = "DO NOTHING RETURNING id"
+        query = (
+            f"INSERT INTO {self.name} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(placeholders)}) ON CONFLICT (id) {conflict}"
+        )
+        return query, values
 
+    def _update_query(self, _id: str, data: Dict[str, Any]) -> tuple | None:
+        """UPDATE of a row, None when there is nothing to set."""
+        table_columns = self._get_table_columns()
+        set_parts = []
+        values = []
+        extra_data = {}
+
+        for key, value in data.items():
+            if key == "id":
+                continue
+            if key in table_columns:
+                set_parts.append(f"{key} = %s")
+                if isinstance(value, dict):
+                    values.append(self._json(value))
+                else:
+                    values.append(value)
+            elif self._has_data_column():
+                extra_data[key] = value
+
+        # Update data JSONB column only for tables that have it
+        if self._has_data_column():
+            set_parts.append("data = %s")
+            values.append(self._json(extra_data))
+
+        if not set_parts:
+            return None
+
+        values.append(_id)
+
+        query = f"UPDATE {self.name} SET {', '.join(set_parts)} WHERE id = %s"
+        return query, values
+
+    def _row_decoder(self, description, fields: List[str] | None):
+        """Convert tuple rows to flat dictionaries, merging the data JSONB."""
+        keys, data_index = _row_keys(
+            tuple(column.name for column in description),
+            bool(fields),
+            self._has_data_column(),
+        )
+
+        def decode(row: tuple) -> Dict[str, Any]:
+            result = {key: row[i] for i, key in keys}
+            # Merge extra data from JSONB column
+            if data_index is not None and row[data_index]:
+                result.update(row[data_index])
+            return result
+
+        return decode
+
+    def _where(  # pylint: disable=too-many-branches
+        self, where: Dict[str, Any] | None
+    ) -> tuple[str, list]:
+        """
+        WHERE clause (empty without conditions) and its parameters.
+
+        Equality on keys of the data JSONB column is grouped into a single
+        data @> ... containment check, which the GIN index on data can answer.
+        The other operators compare the JSONB values, so types must match.
+        """
+        conditions = []
+        params = []
+        contained = {}
+        table_columns = self._query_columns()
+        for key, value in (where or {}).items():
+            is_column = key in table_columns
+            if not is_column and not self._has_data_column():
+                # Query JSONB field only for tables that have it
+                continue
+            for operator, operand in where_conditions(value):
+                if operator == Operator.IN:
+                    operand = list(operand)
+                    if not operand:
+                        conditions.append("FALSE")
+                    elif is_column:
+                        condition, param = self._in(key, operand)
+                        conditions.append(condition)
+                        params.append(param)
+                    else:
+                        # an OR of containments still uses the GIN index
+                        options = ["data @> %s::jsonb"] * len(operand)
+                        conditions.append(f"({' OR '.join(options)})")
+                        params.extend(self._json_operand({key: item}) for item in operand)
+                elif operator == Operator.WITHIN:
+                    # answered by a GiST index on the point column
+                    conditions.append(f"{key} <@ box(point(%s, %s), point(%s, %s))")
+                    params.extend(operand)
+                elif is_column:
+                    conditions.append(f"{key} {COMPARISONS[operator]} %s")
+                    params.append(operand)
+                elif operator == Operator.EQ:
+                    contained[key] = operand
+                else:
+                    conditions.append(f"data->%s {COMPARISONS[operator]} %s::jsonb")
+                    params.extend([key, self._json_operand(operand)])
+
+        if contained:
+            conditions.append("data @> %s::jsonb")
+            params.append(self._json_operand(contained))
+        if not conditions:
+            return "", params
+        return " WHERE " + " AND ".join(conditions), params
+
+
+class PostgreSQLTable(PostgreSQLQueries, BaseTable):
+    backend = "postgres"
+
+    def __init__(self, pool: ConnectionPool, name: TableName):
+        super().__init__(name)
+        self.pool = pool
+        self.columns = TABLE_COLUMNS.get(name, [])
+        self.has_data_column = name in TABLES_WITH_DATA_COLUMN
+
+    @instrumented("create_one")
+    def create_one(self, data: Dict[str, Any]) -> str:
         _id = data.get("id")
         if not _id:
             _id = str(uuid.uuid4())
             data["id"] = _id
 
-        columns, placeholders, values = self._build_insert_data(data)
-
-        with self.connection.cursor() as cursor:
-            query = (
-                f"INSERT INTO {self.current_table} ({', '.join(columns)}) "
-                f"VALUES ({', '.join(placeholders)}) "
-                "ON CONFLICT (id) DO NOTHING RETURNING id"
-            )
-            cursor.execute(query, values)
+        with self.pool.cursor() as cursor:
+            cursor.execute(*self._insert_query(data))
             result = cursor.fetchone()
             return result[0] if result else _id
 
+    @instrumented("create_or_update_one")
     def create_or_update_one(self, data: Dict[str, Any]) -> bool:
-        if not self.current_table:
-            raise ValueError("Table not selected. Use use_table() first.")
-
-        _id = data.get("id")
-        if not _id:
+        if not data.get("id"):
             raise ValueError("ID is required for create_or_update_one")
 
-        columns, placeholders, values = self._build_insert_data(data)
-
-        # Build UPDATE SET clause (exclude id)
-        update_cols = [c for c in columns if c != "id"]
-        update_set = ", ".join([f"{col} = EXCLUDED.{col}" for col in update_cols])
-
-        with self.connection.cursor() as cursor:
-            query = f"""
-                INSERT INTO {self.current_table} ({', '.join(columns)})
-                VALUES ({', '.join(placeholders)})
-                ON CONFLICT (id)
-                DO UPDATE SET {update_set}
-            """
-            cursor.execute(query, values)
+        with self.pool.cursor() as cursor:
+            cursor.execute(*self._insert_query(data, upsert=True))
             return True
 
-    def read_one(self, _id: str, **kwargs) -> Dict[str, Any] | None:
-        if not self.current_table:
-            raise ValueError("Table not selected. Use use_table() first.")
-
-        with self.connection.cursor(cursor_factory=RealDictCursor) as cursor:
-            query = f"SELECT * FROM {self.current_table} WHERE id = %s"
+    @instrumented("read_one")
+    def read_one(
+        self, _id: str, fields: List[str] | None = None, **kwargs
+    ) -> Dict[str, Any] | None:
+        """Row with the id; only the given fields of it when fields are given."""
+        select = self._select(fields)
+        with self.pool.cursor() as cursor:
+            query = f"SELECT {select} FROM {self.name} WHERE id = %s"
             cursor.execute(query, (_id,))
             row = cursor.fetchone()
             if row:
-                return self._row_to_dict(row)
+                return self._row_decoder(cursor.description, fields)(row)
             return None
 
-    def _row_to_dict(self, row: Dict[str, Any]) -> Dict[str, Any]:
-        """Convert a database row to a flat dictionary, merging data JSONB."""
-        result = {}
-        extra_data = {}
-
-        for key, value in row.items():
-            if key in ("created_at", "updated_at"):
-                continue
-            if key == "data" and self._has_data_column():
-                extra_data = value if value else {}
-            else:
-                result[key] = value
-
-        # Merge extra data from JSONB column
-        result.update(extra_data)
-        return result
+    @instrumented("read_by_ids")
+    def read_by_ids(
+        self, ids: List[str], fields: List[str] | None = None, **kwargs
+    ) -> Dict[str, Dict[str, Any] | None]:
+        """
+        Rows by id, in the order of ids, with None for the ids that don't exist,
+        read READ_BY_IDS_CHUNK ids per query.
+        """
+        if fields and "id" not in fields:
+            fields = ["id"] + list(fields)
+        select = self._select(fields)
+        results = dict.fromkeys(ids)
+        unique_ids = list(results)
+        with self.pool.cursor() as cursor:
+            for start in range(0, len(unique_ids), READ_BY_IDS_CHUNK):
+                condition, param = self._in(
+                    "id", unique_ids[start : start + READ_BY_IDS_CHUNK]
+                )
+                cursor.execute(
+                    f"SELECT {select} FROM {self.name} WHERE {condition}", (param,)
+                )
+                decode = self._row_decoder(cursor.description, fields)
+                for row in cursor.fetchall():
+                    row = decode(row)
+                    results[str(row["id"])] = row
+        return results
+
+    def explain(
+        self, where: Dict[str, Any] | None = None, fields: List[str] | None = None
+    ) -> str:
+        """Query plan of read_many(where, fields=fields)."""
+        where_sql, params = self._where(where)
+        select = self._select(fields)
+        with self.pool.cursor() as cursor:
+            cursor.execute(
+                f"EXPLAIN SELECT {select} FROM {self.name}{where_sql}", tuple(params)
+            )
+            return "\n".join(row[0] for row in cursor.fetchall())
 
+    @instrumented("read_many")
     def read_many(
-        self, where: Dict[str, Any] | None = None, limit: int | None = None, **kwargs
+        self,
+        where: Dict[str, Any] | None = None,
+        limit: int | None = None,
+        fields: List[str] | None = None,
+        order_by: str | None = None,
+        offset: int | None = None,
+        **kwargs,
     ) -> List[Dict[str, Any]]:
-        if not self.current_table:
-            raise ValueError("Table not selected. Use use_table() first.")
-
-        query = f"SELECT * FROM {self.current_table}"
-        params = []
-
-        if where:
-            conditions = []
-            table_columns = self._get_table_columns() + ["id"]
-            for key, value in where.items():
-                if key in table_columns:
-                    conditions.append(f"{key} = %s")
-                    params.append(value)
-                elif self._has_data_column():
-                    # Query JSONB field only for tables that have it
-                    conditions.append("data->>%s = %s")
-                    params.extend([key, str(value)])
-
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
-
-        if limit:
-            query += " LIMIT %s"
-            params.append(limit)
+        """Rows matching where; sorted on the order_by column for pagination."""
+        query = self._select_query(where, fields, limit, order_by, offset)
 
-        with self.connection.cursor(cursor_factory=RealDictCursor) as cursor:
-            cursor.execute(query, tuple(params))
+        with self.pool.cursor() as cursor:
+            cursor.execute(*query)
             rows = cursor.fetchall()
-            return [self._row_to_dict(row) for row in rows]
-
+            decode = self._row_decoder(cursor.description, fields)
+            return [decode(row) for row in rows]
+
+    @instrumented("count")
+    def count(self, where: Dict[str, Any] | None = None) -> int:
+        with self.pool.cursor() as cursor:
+            cursor.execute(*self._count_query(where))
+            return cursor.fetchone()[0]
+
+    @instrumented("nearest")
+    def nearest(
+        self, lat: float, lon: float, k: int = 10, radius: float = 5000.0
+    ) -> List[Dict[str, Any]]:
+        """The k rows nearest to (lat, lon) within radius meters, from the GiST index."""
+        with self.pool.cursor() as cursor:
+            cursor.execute(*self._nearest_query(lat, lon, k, radius))
+            decode = self._row_decoder(cursor.description, None)
+            rows = [decode(row) for row in cursor.fetchall()]
+        return [row for row in rows if row["distance"] <= radius]
+
+    @instrumented("iter_many")
+    def iter_many(  # pylint: disable=too-many-arguments
+        self,
+        where: Dict[str, Any] | None = None,
+        batch_size: int = ITER_BATCH_SIZE,
+        fields: List[str] | None = None,
+        order_by: str | None = None,
+        **kwargs,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the rows through a server-side cursor, batch_size rows per fetch.
+
+        The connection is held until the generator is exhausted or closed.
+        """
+        query = self._select_query(where, fields, order_by=order_by)
+        with self.pool.transaction() as connection:
+            with connection.cursor(name=f"iter_{self.name}") as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(*query)
+                decode = None
+                for row in cursor:
+                    # a named cursor describes the rows after the first fetch
+                    decode = decode or self._row_decoder(cursor.description, fields)
+                    yield decode(row)
+
+    @instrumented("update_one")
     def update_one(self, _id: str, data: Dict[str, Any]) -> bool:
-        if not self.current_table:
-            raise ValueError("Table not selected. Use use_table() first.")
-
-        table_columns = self._get_table_columns()
-        set_parts = []
-        values = []
-        extra_data = {}
+        update = self._update_query(_id, data)
+        if update is None:
+            return False
 
-        for key, value in data.items():
-            if key == "id":
-                continue
-            if key in table_columns:
-                set_parts.append(f"{key} = %s")
-                if isinstance(value, dict):
-                    values.append(Json(value))
-                else:
-                    values.append(value)
-            elif self._has_data_column():
-                extra_data[key] = value
+        with self.pool.cursor() as cursor:
+            cursor.execute(*update)
+            return cursor.rowcount > 0
 
-        # Update data JSONB column only for tables that have it
-        if self._has_data_column():
-            set_parts.append("data = %s")
-            values.append(Json(extra_data))
+    @instrumented("delete_one")
+    def delete_one(self, _id: str, **kwargs) -> bool:
+        with self.pool.cursor() as cursor:
+            query = f"DELETE FROM {self.name} WHERE id = %s"
+            cursor.execute(query, (_id,))
+            return cursor.rowcount > 0
 
-        if not set_parts:
+    def _group_rows(
+        self, rows: List[Dict[str, Any]]
+    ) -> Dict[tuple, List[tuple[int, list]]]:
+        """Insert values of the rows with an id by their columns, with the row index."""
+        groups = defaultdict(list)
+        for i, row in enumerate(rows):
+            if not row.get("id"):
+                continue
+            columns, _, values = self._build_insert_data(row)
+            groups[tuple(columns)].append((i, values))
+        return groups
+
+    def _insert_pages(
+        self, query: str, group: List[tuple[int, list]], rows, results: WriteResult
+    ) -> None:
+        """Insert the group with execute_values, a page per statement."""
+        with self.pool.cursor() as cursor:
+            for start in range(0, len(group), PAGE_SIZE):
+                page = group[start : start + PAGE_SIZE]
+                try:
+                    execute_values(
+                        cursor, query, [values for _, values in page], page_size=PAGE_SIZE
+                    )
+                    for i, _ in page:
+                        results[i] = rows[i]["id"]
+                except PsycopgError:
+                    # the statement failed as a whole, find the failing rows
+                    for i, values in page:
+                        try:
+                            execute_values(cursor, query, [values])
+                            results[i] = rows[i]["id"]
+                        except PsycopgError as e:
+                            results[i] = WriteError(rows[i]["id"], str(e).strip())
+
+    def _copy_insert(self, columns: tuple, group: List[tuple[int, list]]) -> bool:
+        """Load the group with COPY into a staging table, False if that failed."""
+        column_list = ", ".join(columns)
+        buffer = io.StringIO(
+            "".join(
+                "\t".join(_copy_value(value) for value in values) + "\n"
+                for _, values in group
+            )
+        )
+        try:
+            # the staging table lives until the end of the transaction
+            with self.pool.transaction() as connection, connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE TEMP TABLE {STAGE_TABLE} "
+                    f"(LIKE {self.name} INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+                cursor.copy_expert(
+                    f"COPY {STAGE_TABLE} ({column_list}) FROM STDIN", buffer
+                )
+                cursor.execute(
+                    f"INSERT INTO {self.name} ({column_list}) "
+                    f"SELECT {column_list} FROM {STAGE_TABLE} "
+                    "ON CONFLICT (id) DO NOTHING"
+                )
+            return True
+        except PsycopgError:
             return False
 
-        values.append(_id)
-
-        with self.connection.cursor() as cursor:
+    @instrumented("create_many")
+    def create_many(self, rows: List[Dict[str, Any]]) -> WriteResult:
+        """
+        Insert rows, skipping the ids that already exist like create_one.
+
+        Large inserts are loaded with COPY; if that fails, or for smaller ones,
+        rows are inserted PAGE_SIZE per statement and a failing page is retried
+        row by row, so only the rows in error are reported.
+        """
+        for row in rows:
+            if not row.get("id"):
+                row["id"] = str(uuid.uuid4())
+        results: WriteResult = [None] * len(rows)
+        for columns, group in self._group_rows(rows).items():
+            if len(group) >= COPY_THRESHOLD and self._copy_insert(columns, group):
+                for i, _ in group:
+                    results[i] = rows[i]["id"]
+                continue
             query = (
-                f"UPDATE {self.current_table} SET {', '.join(set_parts)} WHERE id = %s"
+                f"INSERT INTO {self.name} ({', '.join(columns)}) VALUES %s "
+                "ON CONFLICT (id) DO NOTHING"
             )
-            cursor.execute(query, values)
-            return cursor.rowcount > 0
+            self._insert_pages(query, group, rows, results)
+        return results
+
+    @instrumented("upsert_many")
+    def upsert_many(self, rows: List[Dict[str, Any]]) -> WriteResult:
+        """Create or update rows PAGE_SIZE per statement, like create_or_update_one."""
+        results: WriteResult = [
+            None if row.get("id") else WriteError(None, "ID is required for upsert")
+            for row in rows
+        ]
+        for columns, group in self._group_rows(rows).items():
+            update_set = ", ".join(f"{col} = EXCLUDED.{col}" for col in columns[1:])
+            query = (
+                f"INSERT INTO {self.name} ({', '.join(columns)}) VALUES %s "
+                f"ON CONFLICT (id) DO UPDATE SET {update_set}"
+            )
+            self._insert_pages(query, group, rows, results)
+        return results
 
-    def delete_one(self, _id: str, **kwargs) -> bool:
-        if not self.current_table:
-            raise ValueError("Table not selected. Use use_table() first.")
 
-        with self.connection.cursor() as cursor:
-            query = f"DELETE FROM {self.current_table} WHERE id = %s"
-            cursor.execute(query, (_id,))
-            return cursor.rowcount > 0
+class PostgreSQLCoreAdapter(BaseDBAdapter):
+    def __init__(self, env: EnvType, logger, pool: ConnectionPool | None = None):
+        super().__init__(env, logger)
+        # connections are borrowed from the process-wide pool for each query
+        self.pool = pool or get_pool(env)
+        self.current_table = None
+        self.current_db = None
+
+    def use_db(self, db_name: str) -> Self:
+        self.current_db = db_name
+        return self
+
+    def table(self, table_name: TableName) -> PostgreSQLTable:
+        return PostgreSQLTable(self.pool, table_name)
 
     def create_table(self, table_name: TableName, **kwargs) -> Self:
         """Create a table with id and jsonb data column, plus a GIN index."""
-        with self.connection.cursor() as cursor:
+        with self.pool.cursor() as cursor:
             query = f"""
                 CREATE TABLE IF NOT EXISTS {table_name} (
                     id TEXT PRIMARY KEY,
@@ -297,12 +714,12 @@ class PostgreSQLCoreAdapter(BaseDBAdapter):
         return self
 
     def drop_table(self, table_name: TableName) -> None:
-        with self.connection.cursor() as cursor:
+        with self.pool.cursor() as cursor:
             query = f"DROP TABLE IF EXISTS {table_name}"
             cursor.execute(query)
 
 
-def init_db_session(logger) -> PostgreSQLCoreAdapter:
+def init_db_session(logger) -> BaseDBAdapter:
     env_name = os.environ["ENV_NAME"]
     db_name = os.environ[f"{env_name.upper()}_POSTGRES_DB"]
-    return PostgreSQLCoreAdapter(EnvType(env_name), logger).use_db(db_name)
+    return with_cache(PostgreSQLCoreAdapter(EnvType(env_name), logger)).use_db(db_name)
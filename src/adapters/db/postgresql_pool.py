@@ -0,0 +1,304 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+from psycopg2 import connect, extensions, Error as PsycopgError
+
+from src.adapters.db.instrumentation import note_query, recorder
+from src.schemas.common import EnvType
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_SIZE = 1
+DEFAULT_MAX_SIZE = 10
+# seconds a connection is used before it is replaced, so server-side memory and
+# DNS/failover changes don't stick to a warm instance forever
+DEFAULT_MAX_LIFETIME = 30 * 60
+# seconds a checkout waits for a free connection before PoolTimeout
+DEFAULT_TIMEOUT = 5.0
+# connections idle for longer than this are pinged with SELECT 1 on checkout
+HEALTH_CHECK_IDLE = 5.0
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class InstrumentedCursor(extensions.cursor):
+    """
+    Cursor reporting its statements to the current instrumented call, and
+    logging the plan of the slow SELECTs when the recorder explains them.
+    """
+
+    def execute(self, query, vars=None):  # pylint: disable=redefined-builtin
+        note_query(query)
+        started_at = time.perf_counter()
+        result = super().execute(query, vars)
+        if recorder.explain and recorder.is_slow(time.perf_counter() - started_at):
+            self._explain(query, vars)
+        return result
+
+    def _explain(self, query, params) -> None:
+        text = query.decode() if isinstance(query, bytes) else str(query)
+        if not text.lstrip().upper().startswith("SELECT"):
+            return
+        try:
+            with self.connection.cursor(cursor_factory=extensions.cursor) as cursor:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {text}", params)
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+            logger.warning("plan of slow query %s\n%s", text, plan)
+        except PsycopgError as e:
+            logger.warning("explain of %s failed: %s", text, e)
+
+
+class _PooledConnection:
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.used_at = self.created_at
+
+
+def connection_params(env: EnvType) -> Dict[str, Any]:
+    return {
+        "host": os.environ.get(f"{env.upper()}_POSTGRES_HOST", "localhost"),
+        "port": os.environ.get(f"{env.upper()}_POSTGRES_PORT", "5432"),
+        "database": os.environ.get(f"{env.upper()}_POSTGRES_DB", "postgres"),
+        "user": os.environ.get(f"{env.upper()}_POSTGRES_USER", "postgres"),
+        "password": os.environ.get(f"{env.upper()}_POSTGRES_PASSWORD", "postgres"),
+    }
+
+
+class ConnectionPool:  # pylint: disable=too-many-instance-attributes
+    """
+    Thread-safe pool of autocommit psycopg2 connections.
+
+    connection() lends a connection for the duration of a with block. Idle
+    connections are health checked on checkout and replaced once they are older
+    than max_lifetime; broken ones are dropped when they are returned.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        connect_fn: Callable[[], Any],
+        *,
+        min_size: int = DEFAULT_MIN_SIZE,
+        max_size: int = DEFAULT_MAX_SIZE,
+        max_lifetime: float = DEFAULT_MAX_LIFETIME,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        self.connect_fn = connect_fn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self._idle: deque[_PooledConnection] = deque()
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "connects": 0,
+            "discarded": 0,
+            "peak_in_use": 0,
+        }
+        for _ in range(min_size):
+            self._idle.append(self._connect())
+            self._size += 1
+
+    def _connect(self) -> _PooledConnection:
+        connection = self.connect_fn()
+        connection.autocommit = True
+        with self._cond:
+            self._stats["connects"] += 1
+        return _PooledConnection(connection)
+
+    def _expired(self, pooled: _PooledConnection) -> bool:
+        return time.monotonic() - pooled.created_at > self.max_lifetime
+
+    @staticmethod
+    def _healthy(pooled: _PooledConnection) -> bool:
+        if pooled.connection.closed:
+            return False
+        if time.monotonic() - pooled.used_at < HEALTH_CHECK_IDLE:
+            return True
+        try:
+            with pooled.connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except PsycopgError:
+            return False
+
+    def _discard(self, pooled: _PooledConnection) -> None:
+        with self._cond:
+            self._stats["discarded"] += 1
+        try:
+            pooled.connection.close()
+        except PsycopgError:
+            pass
+
+    def _checkout(self, timeout: float) -> _PooledConnection:
+        start = time.monotonic()
+        waited = False
+        with self._cond:
+            while not self._idle and self._size >= self.max_size:
+                remaining = timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"no connection available within {timeout}s")
+                waited = True
+                self._cond.wait(remaining)
+            if self._closed:
+                raise PoolTimeout("pool is closed")
+
+            pooled = self._idle.pop() if self._idle else None
+            # reserve the slot before connecting outside of the lock
+            if pooled is None:
+                self._size += 1
+            self._in_use += 1
+            self._stats["checkouts"] += 1
+            self._stats["peak_in_use"] = max(self._stats["peak_in_use"], self._in_use)
+            if waited:
+                wait_time = time.monotonic() - start
+                self._stats["waits"] += 1
+                self._stats["wait_time_total"] += wait_time
+                self._stats["wait_time_max"] = max(
+                    self._stats["wait_time_max"], wait_time
+                )
+
+        try:
+            if pooled is not None and (
+                self._expired(pooled) or not self._healthy(pooled)
+            ):
+                self._discard(pooled)
+                pooled = None
+            return pooled or self._connect()
+        except BaseException:
+            self._release_slot()
+            raise
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._size -= 1
+            self._in_use -= 1
+            self._cond.notify()
+
+    def _checkin(self, pooled: _PooledConnection) -> None:
+        connection = pooled.connection
+        reusable = (
+            not self._closed
+            and not connection.closed
+            and connection.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+            and not self._expired(pooled)
+        )
+        if not reusable:
+            self._discard(pooled)
+            self._release_slot()
+            return
+        pooled.used_at = time.monotonic()
+        with self._cond:
+            self._idle.append(pooled)
+            self._in_use -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: float | None = None) -> Iterator[Any]:
+        pooled = self._checkout(self.timeout if timeout is None else timeout)
+        try:
+            yield pooled.connection
+        finally:
+            self._checkin(pooled)
+
+    @contextmanager
+    def cursor(self, **kwargs) -> Iterator[Any]:
+        """Cursor on a borrowed connection, both released when the block ends."""
+        with self.connection() as connection:
+            with connection.cursor(**kwargs) as cursor:
+                yield cursor
+
+    @contextmanager
+    def transaction(self, timeout: float | None = None) -> Iterator[Any]:
+        """
+        Borrowed connection with autocommit off, committed when the block ends or
+        rolled back on error, e.g. for named cursors or temporary tables.
+        """
+        with self.connection(timeout) as connection:
+            connection.autocommit = False
+            try:
+                with connection:
+                    yield connection
+            finally:
+                connection.autocommit = True
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self._stats,
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "max_size": self.max_size,
+                "saturation": self._in_use / self.max_size,
+            }
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            self._discard(pooled)
+
+
+class PoolRegistry:
+    """One pool per EnvType for the whole process."""
+
+    def __init__(self):
+        self._pools: Dict[EnvType, ConnectionPool] = {}
+        self._lock = threading.Lock()
+
+    def get(self, env: EnvType) -> ConnectionPool:
+        """Return the pool of env, sized by {ENV}_POSTGRES_POOL_MIN/MAX/MAX_LIFETIME."""
+        with self._lock:
+            if env not in self._pools:
+                params = connection_params(env)
+                prefix = f"{env.upper()}_POSTGRES_POOL"
+                self._pools[env] = ConnectionPool(
+                    lambda: connect(**params, cursor_factory=InstrumentedCursor),
+                    min_size=int(os.environ.get(f"{prefix}_MIN", DEFAULT_MIN_SIZE)),
+                    max_size=int(os.environ.get(f"{prefix}_MAX", DEFAULT_MAX_SIZE)),
+                    max_lifetime=float(
+                        os.environ.get(f"{prefix}_MAX_LIFETIME", DEFAULT_MAX_LIFETIME)
+                    ),
+                )
+            return self._pools[env]
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {str(env): pool.metrics() for env, pool in list(self._pools.items())}
+
+    def close(self) -> None:
+        with self._lock:
+            closing, self._pools = list(self._pools.values()), {}
+        for pool in closing:
+            pool.close()
+
+    def reset_after_fork(self) -> None:
+        # the parent's connections must not be used by a forked child
+        self._lock = threading.Lock()
+        self._pools = {}
+
+
+pools = PoolRegistry()
+get_pool = pools.get
+pool_metrics = pools.metrics
+close_pools = pools.close
+os.register_at_fork(after_in_child=pools.reset_after_fork)
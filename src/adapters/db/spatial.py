@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Tuple
+
+from src.helpers.geo import GridIndex, shop_location
+from src.schemas.common import TableName
+
+# (lat, lon) of the rows of the tables with a location
+LOCATIONS: Dict[TableName, Callable[[Dict[str, Any]], Tuple[float, float] | None]] = {
+    TableName.SHOP: shop_location,
+}
+# seconds a grid index is used before it is built again from the table
+DEFAULT_GRID_TTL = 300.0
+
+
+class GridIndexRegistry:
+    """
+    Grid indexes of the located tables of the backends without a spatial index,
+    built from a scan of the table and kept for ttl seconds. Rows written since
+    are found once the grid is built again.
+    """
+
+    def __init__(self, ttl: float | None = None):
+        self.ttl = (
+            float(os.environ.get("DB_GRID_TTL", DEFAULT_GRID_TTL)) if ttl is None else ttl
+        )
+        self._grids: Dict[Hashable, Tuple[float, GridIndex]] = {}
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        key: Hashable,
+        table_name: TableName,
+        scan: Callable[[], Iterable[Dict[str, Any]]],
+    ) -> GridIndex:
+        """Grid of the table key, built from the rows of scan when missing or expired."""
+        if table_name not in LOCATIONS:
+            raise ValueError(f"{table_name} has no location")
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        # one scan per table at a time, the other queries wait for its grid
+        with lock:
+            entry = self._grids.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                location = LOCATIONS[table_name]
+                grid = GridIndex()
+                for row in scan():
+                    if (point := location(row)) is not None:
+                        grid.add(*point, row)
+                entry = (time.monotonic() + self.ttl, grid)
+                self._grids[key] = entry
+            return entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._grids.clear()
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            "/".join(map(str, key)) if isinstance(key, tuple) else str(key): {
+                "size": grid.size,
+                "expires_in": round(expires_at - time.monotonic(), 1),
+            }
+            for key, (expires_at, grid) in list(self._grids.items())
+        }
+
+
+grid_indexes = GridIndexRegistry()
+grid_metrics = grid_indexes.metrics
+
+
+def nearest_rows(
+    grid: GridIndex, lat: float, lon: float, k: int, radius: float
+) -> List[Dict[str, Any]]:
+    """The k rows of the grid nearest to the point, with their distance in meters."""
+    return [
+        {**row, "distance": meters} for meters, row in grid.nearest(lat, lon, k, radius)
+    ]
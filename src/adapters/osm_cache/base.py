@@ -0,0 +1,29 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List
+
+
+class BaseOsmCacheBackend(ABC):
+    """
+    Persistent storage of the Nominatim lookups, shared by the processes.
+
+    Entries are keyed by the OSM id (get_osm_id, e.g. N123) and hold the lookup
+    result, {} for an id Nominatim doesn't know, with the unix time it was
+    fetched at; expiry is left to the reader.
+    """
+
+    @abstractmethod
+    def get(self, osm_id: str) -> tuple[Dict[str, Any], float] | None:
+        """(data, fetched_at) of the id, None if it was never stored."""
+
+    def get_many(self, osm_ids: List[str]) -> Dict[str, tuple[Dict[str, Any], float]]:
+        """(data, fetched_at) of the stored ids; the backends read them in bulk."""
+        entries = {osm_id: self.get(osm_id) for osm_id in osm_ids}
+        return {osm_id: entry for osm_id, entry in entries.items() if entry is not None}
+
+    @abstractmethod
+    def put(self, osm_id: str, data: Dict[str, Any], fetched_at: float) -> None:
+        pass
+
+    @abstractmethod
+    def delete_older(self, fetched_before: float) -> int:
+        """Delete the entries fetched before the time, return how many."""
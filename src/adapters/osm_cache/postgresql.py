@@ -0,0 +1,46 @@
+from typing import Any, Dict, List
+
+from psycopg2.extras import Json
+
+from src.adapters.osm_cache.base import BaseOsmCacheBackend
+
+
+class PostgreSQLOsmCacheBackend(BaseOsmCacheBackend):
+    """Cache in the osm_lookup table of a pool's db, shared by all the workers."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def get(self, osm_id: str) -> tuple[Dict[str, Any], float] | None:
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT data, fetched_at FROM osm_lookup WHERE id = %s", (osm_id,)
+            )
+            row = cursor.fetchone()
+            return (row[0], row[1]) if row else None
+
+    def get_many(self, osm_ids: List[str]) -> Dict[str, tuple[Dict[str, Any], float]]:
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT id, data, fetched_at FROM osm_lookup WHERE id = ANY(%s)",
+                (list(osm_ids),),
+            )
+            return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+    def put(self, osm_id: str, data: Dict[str, Any], fetched_at: float) -> None:
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO osm_lookup (id, data, fetched_at) VALUES (%s, %s, %s)
+                ON CONFLICT (id) DO UPDATE
+                SET data = EXCLUDED.data, fetched_at = EXCLUDED.fetched_at
+                """,
+                (osm_id, Json(data), fetched_at),
+            )
+
+    def delete_older(self, fetched_before: float) -> int:
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM osm_lookup WHERE fetched_at < %s", (fetched_before,)
+            )
+            return cursor.rowcount
@@ -0,0 +1,70 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List
+
+from src.adapters.osm_cache.base import BaseOsmCacheBackend
+
+# ids per query of get_many, below the 999 parameters of older SQLite versions
+GET_MANY_CHUNK = 500
+
+
+class SQLiteOsmCacheBackend(BaseOsmCacheBackend):
+    """Cache in the osm_lookup table of a local SQLite file, e.g. for a single host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        if directory := os.path.dirname(path):
+            os.makedirs(directory, exist_ok=True)
+        # one connection shared by the threads of the process, used under the lock
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            # other processes read while one writes
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS osm_lookup (
+                    id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+                """)
+
+    def get(self, osm_id: str) -> tuple[Dict[str, Any], float] | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data, fetched_at FROM osm_lookup WHERE id = ?", (osm_id,)
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def get_many(self, osm_ids: List[str]) -> Dict[str, tuple[Dict[str, Any], float]]:
+        entries = {}
+        for start in range(0, len(osm_ids), GET_MANY_CHUNK):
+            chunk = osm_ids[start : start + GET_MANY_CHUNK]
+            with self._lock:
+                rows = self._connection.execute(
+                    "SELECT id, data, fetched_at FROM osm_lookup"
+                    f" WHERE id IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+            entries.update({row[0]: (json.loads(row[1]), row[2]) for row in rows})
+        return entries
+
+    def put(self, osm_id: str, data: Dict[str, Any], fetched_at: float) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO osm_lookup (id, data, fetched_at)"
+                " VALUES (?, ?, ?)",
+                (osm_id, json.dumps(data), fetched_at),
+            )
+
+    def delete_older(self, fetched_before: float) -> int:
+        with self._lock, self._connection:
+            return self._connection.execute(
+                "DELETE FROM osm_lookup WHERE fetched_at < ?", (fetched_before,)
+            ).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -1,34 +1,75 @@
+import asyncio
 import json
 from http import HTTPStatus
 from uuid import UUID
 
+from src.adapters.db.base import WriteError, WriteResult
 from src.adapters.db.cosmos_db_core import init_db_session
 from src.schemas.common import TableName, ItemBarcodeStatus
 from src.schemas.shop_item import ShopItem
 
 
-def add_barcodes_handler(shop_id: str, items: list[dict], logger) -> (HTTPStatus, dict):
-    session = init_db_session(logger)
-    session.use_table(TableName.SHOP_ITEM)
+def shop_item(shop_id: str, item: dict) -> dict:
+    """Shop item row of a posted purchase, ValueError if it is invalid."""
+    # a new item gets the id generated by the schema
+    item_id = {"id": UUID(item["item_id"])} if item.get("item_id") else {}
+    return ShopItem(
+        **item_id,
+        shop_id=UUID(shop_id),
+        name="_".join(item["purchase_id"].split("_")[:-1]),
+        status=ItemBarcodeStatus(item["status"]),
+        barcode=item.get("barcode"),
+    ).model_dump(mode="json")
 
-    invalid_items = []
+
+def validate_items(shop_id: str, items: list[dict], logger) -> tuple[list, list]:
+    """Shop item rows of the valid items, and the errors of the invalid ones."""
+    rows, invalid_items = [], []
     for item in items:
         try:
-            item = ShopItem(
-                id=UUID(item["item_id"]) if item.get("item_id") else None,
-                shop_id=UUID(shop_id),
-                name="_".join(item["purchase_id"].split("_")[:-1]),
-                status=ItemBarcodeStatus(item["status"]),
-                barcode=item.get("barcode"),
-            ).model_dump(mode="json")
-            session.create_or_update_one(item)
+            rows.append(shop_item(shop_id, item))
         except ValueError as e:
             invalid_items.append({"name": item["name"], "error": str(e)})
             logger.error(f"Failed to add item: {json.dumps(item)}. Error: {e}")
+    return rows, invalid_items
+
+
+def write_errors(rows: list[dict], results: WriteResult, logger) -> list[dict]:
+    """The rows of a bulk upsert that failed, in the format of the invalid items."""
+    invalid_items = []
+    for row, result in zip(rows, results):
+        if isinstance(result, WriteError):
+            invalid_items.append({"name": row["name"], "error": result.msg})
+            logger.error(f"Failed to add item: {json.dumps(row)}. Error: {result.msg}")
+    return invalid_items
+
 
+def _response(invalid_items: list[dict]) -> tuple[HTTPStatus, dict]:
     if invalid_items:
         return HTTPStatus.BAD_REQUEST, {
             "msg": "Failed to add some items",
             "invalid_items": invalid_items,
         }
     return HTTPStatus.OK, {"msg": "Purchases successfully added. You can add another URL"}
+
+
+def add_barcodes_handler(shop_id: str, items: list[dict], logger) -> (HTTPStatus, dict):
+    shop_items = init_db_session(logger).table(TableName.SHOP_ITEM)
+
+    rows, invalid_items = validate_items(shop_id, items, logger)
+    if rows:
+        # one transactional batch per shop in Cosmos, a single INSERT in Postgres
+        results = shop_items.upsert_many(rows)
+        invalid_items += write_errors(rows, results, logger)
+
+    return _response(invalid_items)
+
+
+async def async_add_barcodes_handler(
+    shop_id: str, items: list[dict], logger
+) -> tuple[HTTPStatus, dict]:
+    """
+    add_barcodes_handler for the FastAPI server. Shop items stay in Cosmos, whose
+    client blocks, so the batch is written from a worker thread.
+    """
+    return await asyncio.to_thread(add_barcodes_handler, shop_id, items, logger)
@@ -1,3 +1,4 @@
+import asyncio
 from http import HTTPStatus
 
 from src.adapters.db.cosmos_db_core import init_db_session
@@ -7,6 +8,44 @@ from src.schemas.osm_data import OsmData
 from src.schemas.shop import Shop
 
 
+class LinkShopError(ValueError):
+    pass
+
+
+def new_shop(receipt: dict, url: str) -> dict:
+    """New shop of the receipt, with the details of the OSM url (blocking HTTP)."""
+    try:
+        osm_type, osm_key = parse_osm_url(url)
+    except ValueError as e:
+        raise LinkShopError("Invalid OSM URL") from e
+
+    osm_shop_data = lookup_osm_data(osm_type, osm_key)
+    if not osm_shop_data:
+        raise LinkShopError("Failed to get OSM shop details")
+
+    osm_data = OsmData(
+        type=OsmType(osm_type),
+        key=int(osm_key),
+        lat=osm_shop_data["lat"],
+        lon=osm_shop_data["lon"],
+        display_name=osm_shop_data["display_name"],
+        address=osm_shop_data["address"],
+    )
+    return Shop(
+        country_code=receipt["country_code"],
+        company_id=receipt["company_id"],
+        shop_address=receipt["shop_address"],
+        osm_data=osm_data,
+    ).model_dump(mode="json")
+
+
+def _linked(shop_id: str) -> tuple[HTTPStatus, dict]:
+    return HTTPStatus.OK, {
+        "msg": "Shop successfully linked",
+        "data": {"shop_id": shop_id},
+    }
+
+
 def link_shop_handler(
     url: str, user_id: str, receipt_id: str, logger
 ) -> (HTTPStatus, dict):
@@ -14,51 +53,39 @@ def link_shop_handler(
         return HTTPStatus.BAD_REQUEST, {"msg": "Unsupported URL"}
 
     session = init_db_session(logger)
-    session.use_table(TableName.RECEIPT)
-    receipt = session.read_one(receipt_id, partition_key=user_id)
+    receipts = session.table(TableName.RECEIPT)
+    shops_table = session.table(TableName.SHOP)
+    receipt = receipts.read_one(receipt_id, partition_key=user_id)
     if not receipt:
         return HTTPStatus.NOT_FOUND, {"msg": "Receipt not found"}
 
     # double check that the shop doesn't exist
-    session.use_table(TableName.SHOP)
-    shops = session.read_many(
+    shops = shops_table.read_many(
         {"company_id": receipt["company_id"], "shop_address": receipt["shop_address"]},
         partition_key=receipt["country_code"],
         limit=1,
+        fields=["id"],
     )
     if shops:
         shop = shops[0]
     else:
         try:
-            osm_type, osm_key = parse_osm_url(url)
-        except ValueError:
-            return HTTPStatus.BAD_REQUEST, {"msg": "Invalid OSM URL"}
-
-        osm_shop_data = lookup_osm_data(osm_type, osm_key)
-        if not osm_shop_data:
-            return HTTPStatus.BAD_REQUEST, {"msg": "Failed to get OSM shop details"}
-
-        osm_data = OsmData(
-            type=OsmType(osm_type),
-            key=int(osm_key),
-            lat=osm_shop_data["lat"],
-            lon=osm_shop_data["lon"],
-            display_name=osm_shop_data["display_name"],
-            address=osm_shop_data["address"],
-        )
-        shop = Shop(
-            country_code=receipt["country_code"],
-            company_id=receipt["company_id"],
-            shop_address=receipt["shop_address"],
-            osm_data=osm_data,
-        ).model_dump(mode="json")
-        session.use_table(TableName.SHOP)
-        session.create_one(shop)
-
-    session.use_table(TableName.RECEIPT)
+            shop = new_shop(receipt, url)
+        except LinkShopError as e:
+            return HTTPStatus.BAD_REQUEST, {"msg": str(e)}
+        shops_table.create_one(shop)
+
     receipt["shop_id"] = shop["id"]
-    session.update_one(receipt_id, receipt)
-    return HTTPStatus.OK, {
-        "msg": "Shop successfully linked",
-        "data": {"shop_id": shop["id"]},
-    }
+    receipts.update_one(receipt_id, receipt)
+    return _linked(shop["id"])
+
+
+async def async_link_shop_handler(
+    url: str, user_id: str, receipt_id: str, logger
+) -> tuple[HTTPStatus, dict]:
+    """
+    link_shop_handler for the FastAPI server. Receipts and shops stay in Cosmos,
+    whose client blocks, so the handler and its Nominatim request run in a worker
+    thread and don't stall the event loop.
+    """
+    return await asyncio.to_thread(link_shop_handler, url, user_id, receipt_id, logger)
@@ -1,14 +1,27 @@
+import time
 from http import HTTPStatus
 from typing import Any, Callable
 from uuid import UUID
 
+from src.helpers.archive import archive_page
 from src.helpers.common import get_html
 from src.parsers.sfs_md.receipt_parser import SfsMdReceiptParser
 
+# seconds the receipt fetch may take, leaving room within the 15 s Appwrite
+# function timeout (appwrite.json) to parse, persist and respond
+FETCH_TIME_BUDGET = 11
+
 
 def parse_from_url_handler(
-    url: str, user_id: str, logger: Any, db_api: Callable[[str, str, Any], Any]
+    url: str,
+    user_id: str,
+    logger: Any,
+    db_api: Callable[[str, str, Any], Any],
+    deadline: float | None = None,
 ) -> tuple[HTTPStatus, dict]:
+    if deadline is None:
+        deadline = time.monotonic() + FETCH_TIME_BUDGET
+
     if not url:
         return HTTPStatus.BAD_REQUEST, {"msg": "URL is required"}
 
@@ -29,20 +42,25 @@ def parse_from_url_handler(
 
     if receipt:
         logger.info("Receipt found in the db")
+        data = receipt.model_dump(mode="json")
     else:
-        receipt_html = get_html(url, logger)
+        receipt_html = get_html(url, logger, deadline=deadline, hedged=True)
         if not receipt_html:
             return HTTPStatus.BAD_REQUEST, {"msg": "Failed to fetch receipt"}
+        # keep the raw page, so a parser fix can be applied without fetching it again
+        archive_page(url, receipt_html, logger)
 
         try:
-            receipt = parser.parse_html(receipt_html).build_receipt().persist()
+            parser.parse_html(receipt_html).build_receipt().persist()
         except ValueError as e:
             return HTTPStatus.BAD_REQUEST, {"msg": str(e)}
         except Exception as e:  # pylint: disable=broad-except
             logger.error(f"Unexpected error parsing receipt: {e}")
             return HTTPStatus.INTERNAL_SERVER_ERROR, {"msg": "Internal server error"}
+        # reuse the payload already serialized for the db
+        data = parser.to_json()
 
     return HTTPStatus.OK, {
         "msg": "Receipt successfully processed",
-        "data": receipt.model_dump(mode="json"),
+        "data": data,
     }
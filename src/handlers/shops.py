@@ -1,9 +1,11 @@
+import base64
+import json
 import os
 from http import HTTPStatus
 from typing import Any
 
 from src.adapters.db.postgresql_core import PostgreSQLCoreAdapter
-from src.schemas.common import EnvType, TableName
+from src.schemas.common import EnvType, Operator, TableName
 
 # Chisinau area approximate bounding box
 CHISINAU_LAT_MIN = 46.95
@@ -11,28 +13,55 @@ CHISINAU_LAT_MAX = 47.07
 CHISINAU_LON_MIN = 28.77
 CHISINAU_LON_MAX = 28.90
 
+# k and radius (meters) of /shops/nearest
+DEFAULT_NEAREST_K = 10
+MAX_NEAREST_K = 50
+DEFAULT_RADIUS = 5000.0
+MAX_RADIUS = 50000.0
+
 
 def init_postgres_session(logger):
-    """Initialize PostgreSQL database session."""
+    """Initialize PostgreSQL database session on the process-wide connection pool."""
     env_name = os.environ.get("ENV_NAME", "local")
     return PostgreSQLCoreAdapter(EnvType(env_name), logger)
 
 
-def shops_handler(query_params: dict[str, Any], logger) -> tuple[HTTPStatus, dict]:
-    """
-    Get shops with optional filtering by query parameters.
+class InvalidCursor(ValueError):
+    pass
 
-    Supported query params:
-    - country_code: filter by country code (e.g., 'md')
-    - company_id: filter by company ID
-    - lat_min, lat_max, lon_min, lon_max: bounding box for location (optional)
-    - limit: max number of results (default 50)
-    - offset: pagination offset (default 0)
-    """
-    session = init_postgres_session(logger)
-    session.use_table(TableName.SHOP)
 
-    # Build where clause from query params
+def encode_cursor(last_id: str) -> str:
+    """Opaque cursor of the page after the row last_id."""
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))["id"]
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def _bbox(query_params: dict[str, Any]) -> tuple[float, float, float, float] | None:
+    """(lon_min, lat_min, lon_max, lat_max) of the requested bounding box, if any."""
+    has_location_filter = any(
+        key in query_params for key in ["lat_min", "lat_max", "lon_min", "lon_max"]
+    )
+    if not has_location_filter:
+        return None
+
+    try:
+        lat_min = float(query_params.get("lat_min", CHISINAU_LAT_MIN))
+        lat_max = float(query_params.get("lat_max", CHISINAU_LAT_MAX))
+        lon_min = float(query_params.get("lon_min", CHISINAU_LON_MIN))
+        lon_max = float(query_params.get("lon_max", CHISINAU_LON_MAX))
+    except (ValueError, TypeError):
+        lat_min, lat_max = CHISINAU_LAT_MIN, CHISINAU_LAT_MAX
+        lon_min, lon_max = CHISINAU_LON_MIN, CHISINAU_LON_MAX
+    return lon_min, lat_min, lon_max, lat_max
+
+
+def _where(query_params: dict[str, Any]) -> dict[str, Any]:
     where = {}
 
     if "country_code" in query_params:
@@ -41,57 +70,174 @@ def shops_handler(query_params: dict[str, Any], logger) -> tuple[HTTPStatus, dic
     if "company_id" in query_params:
         where["company_id"] = query_params["company_id"]
 
-    # Get limit and offset
+    # the GiST index on shop.location answers the bounding box
+    if bbox := _bbox(query_params):
+        where["location"] = (Operator.WITHIN, bbox)
+
+    return where
+
+
+def _page(query_params: dict[str, Any]) -> tuple[int, int]:
     try:
         limit = int(query_params.get("limit", 50))
-        limit = min(limit, 100)  # Cap at 100
+        limit = max(1, min(limit, 100))  # Between 1 and 100
     except (ValueError, TypeError):
         limit = 50
 
     try:
-        offset = int(query_params.get("offset", 0))
+        offset = max(0, int(query_params.get("offset", 0)))
     except (ValueError, TypeError):
         offset = 0
 
-    # Check if location filtering is requested
-    has_location_filter = any(
-        key in query_params for key in ["lat_min", "lat_max", "lon_min", "lon_max"]
-    )
+    return limit, offset
+
+
+def _page_query(query_params: dict[str, Any]) -> tuple[dict, dict, dict]:
+    """
+    Filter of the shops, filter of the requested page, and read_many options of it.
+    A cursor continues after its shop in id order, offset is kept for old clients.
+    """
+    where = _where(query_params)
+    limit, offset = _page(query_params)
+    page_where = where
+    if query_params.get("cursor"):
+        page_where = {**where, "id": (Operator.GT, decode_cursor(query_params["cursor"]))}
+        offset = 0
+    # one more row tells whether there is a next page
+    options = {"limit": limit + 1, "order_by": "id", "offset": offset}
+    return where, page_where, options
 
-    # Read shops from database
-    shops = session.read_many(where if where else None, limit=limit + offset)
-
-    # Apply location filter only if explicitly requested
-    if has_location_filter:
-        try:
-            lat_min = float(query_params.get("lat_min", CHISINAU_LAT_MIN))
-            lat_max = float(query_params.get("lat_max", CHISINAU_LAT_MAX))
-            lon_min = float(query_params.get("lon_min", CHISINAU_LON_MIN))
-            lon_max = float(query_params.get("lon_max", CHISINAU_LON_MAX))
-        except (ValueError, TypeError):
-            lat_min, lat_max = CHISINAU_LAT_MIN, CHISINAU_LAT_MAX
-            lon_min, lon_max = CHISINAU_LON_MIN, CHISINAU_LON_MAX
-
-        filtered_shops = []
-        for shop in shops:
-            osm_data = shop.get("osm_data", {})
-            if osm_data:
-                try:
-                    lat = float(osm_data.get("lat", 0))
-                    lon = float(osm_data.get("lon", 0))
-                    if lat_min <= lat <= lat_max and lon_min <= lon <= lon_max:
-                        filtered_shops.append(shop)
-                except (ValueError, TypeError):
-                    continue
-        shops = filtered_shops
-
-    # Apply offset and limit
-    total = len(shops)
-    result_shops = shops[offset : offset + limit]
+
+def _page_response(
+    shops: list[dict], total: int, options: dict
+) -> tuple[HTTPStatus, dict]:
+    limit = options["limit"] - 1
+    items = shops[:limit]
+    next_cursor = None
+    if items and len(shops) > limit:
+        next_cursor = encode_cursor(items[-1]["id"])
 
     return HTTPStatus.OK, {
-        "items": result_shops,
+        "items": items,
         "total": total,
         "limit": limit,
-        "offset": offset,
+        "offset": options["offset"],
+        "next_cursor": next_cursor,
     }
+
+
+def shops_handler(query_params: dict[str, Any], logger) -> tuple[HTTPStatus, dict]:
+    """
+    Get shops with optional filtering by query parameters.
+
+    Supported query params:
+    - country_code: filter by country code (e.g., 'md')
+    - company_id: filter by company ID
+    - lat_min, lat_max, lon_min, lon_max: bounding box for location (optional)
+    - limit: max number of results (default 50)
+    - cursor: next_cursor of the previous page
+    - offset: pagination offset (default 0), ignored with a cursor
+    """
+    shops_table = init_postgres_session(logger).table(TableName.SHOP)
+    try:
+        where, page_where, options = _page_query(query_params)
+    except InvalidCursor as e:
+        return HTTPStatus.BAD_REQUEST, {"msg": str(e)}
+
+    shops = shops_table.read_many(page_where, **options)
+    return _page_response(shops, shops_table.count(where), options)
+
+
+async def async_shops_handler(
+    query_params: dict[str, Any], logger
+) -> tuple[HTTPStatus, dict]:
+    """shops_handler on the async PostgreSQL adapter, for the FastAPI server."""
+    # psycopg 3 is only needed by the FastAPI server, not by the functions
+    # pylint: disable=import-outside-toplevel
+    from src.adapters.db.postgresql_async import init_async_db_session
+
+    shops_table = (await init_async_db_session(logger)).table(TableName.SHOP)
+    try:
+        where, page_where, options = _page_query(query_params)
+    except InvalidCursor as e:
+        return HTTPStatus.BAD_REQUEST, {"msg": str(e)}
+
+    shops = await shops_table.read_many(page_where, **options)
+    return _page_response(shops, await shops_table.count(where), options)
+
+
+def _nearest_query(query_params: dict[str, Any]) -> tuple[float, float, int, float]:
+    """lat, lon, k and radius of a nearest shops query, ValueError without a point."""
+    try:
+        lat = float(query_params["lat"])
+        lon = float(query_params["lon"])
+    except (KeyError, ValueError, TypeError) as e:
+        raise ValueError("lat and lon are required") from e
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("lat and lon are out of range")
+
+    try:
+        k = min(max(int(query_params.get("k", DEFAULT_NEAREST_K)), 1), MAX_NEAREST_K)
+    except (ValueError, TypeError):
+        k = DEFAULT_NEAREST_K
+
+    try:
+        radius = float(query_params.get("radius", DEFAULT_RADIUS))
+        radius = min(max(radius, 0.0), MAX_RADIUS)
+    except (ValueError, TypeError):
+        radius = DEFAULT_RADIUS
+
+    return lat, lon, k, radius
+
+
+def _nearest_response(
+    shops: list[dict], lat: float, lon: float, k: int, radius: float
+) -> tuple[HTTPStatus, dict]:
+    for shop in shops:
+        shop["distance"] = round(shop["distance"], 1)
+    return HTTPStatus.OK, {
+        "items": shops,
+        "lat": lat,
+        "lon": lon,
+        "k": k,
+        "radius": radius,
+    }
+
+
+def nearest_shops_handler(
+    query_params: dict[str, Any], logger
+) -> tuple[HTTPStatus, dict]:
+    """
+    Get the k shops nearest to a point, closest first, with their distance.
+
+    Supported query params:
+    - lat, lon: the point (required)
+    - k: max number of results (default 10, at most 50)
+    - radius: max distance in meters (default 5000, at most 50000)
+    """
+    try:
+        lat, lon, k, radius = _nearest_query(query_params)
+    except ValueError as e:
+        return HTTPStatus.BAD_REQUEST, {"msg": str(e)}
+
+    shops_table = init_postgres_session(logger).table(TableName.SHOP)
+    shops = shops_table.nearest(lat, lon, k, radius)
+    return _nearest_response(shops, lat, lon, k, radius)
+
+
+async def async_nearest_shops_handler(
+    query_params: dict[str, Any], logger
+) -> tuple[HTTPStatus, dict]:
+    """nearest_shops_handler on the async PostgreSQL adapter, for the FastAPI server."""
+    # psycopg 3 is only needed by the FastAPI server, not by the functions
+    # pylint: disable=import-outside-toplevel
+    from src.adapters.db.postgresql_async import init_async_db_session
+
+    try:
+        lat, lon, k, radius = _nearest_query(query_params)
+    except ValueError as e:
+        return HTTPStatus.BAD_REQUEST, {"msg": str(e)}
+
+    shops_table = (await init_async_db_session(logger)).table(TableName.SHOP)
+    shops = await shops_table.nearest(lat, lon, k, radius)
+    return _nearest_response(shops, lat, lon, k, radius)
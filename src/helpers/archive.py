@@ -0,0 +1,142 @@
+import hashlib
+import os
+import threading
+from functools import cache
+from typing import BinaryIO
+
+import zstandard
+
+from src.adapters.archive.base import BaseArchiveBackend
+from src.adapters.archive.filesystem import FilesystemArchiveBackend
+from src.adapters.archive.postgresql import PostgreSQLArchiveBackend
+from src.helpers.common import make_hash
+from src.schemas.common import EnvType
+
+COMPRESSION_LEVEL = 9
+# receipt pages are mostly shared boilerplate, a dictionary of this size holds it
+DICT_SIZE = 64 * 1024
+# enough for any zstd frame header, which carries the dictionary id
+FRAME_HEADER_SIZE = 18
+
+
+def content_hash(page: bytes) -> str:
+    return hashlib.sha256(page).hexdigest()
+
+
+class PageArchive:
+    """
+    Content-addressed archive of the raw receipt pages.
+
+    Each page is stored once per content, zstd compressed with the newest
+    dictionary trained on receipt pages, and make_hash(url) points to the last
+    page fetched for the url. Older blobs stay readable after retraining, as
+    every frame records the id of its dictionary.
+    """
+
+    def __init__(self, backend: BaseArchiveBackend, level: int = COMPRESSION_LEVEL):
+        self.backend = backend
+        self.level = level
+        self._dictionaries: dict[int, zstandard.ZstdCompressionDict] = {}
+        self._dict_id: int | None = None
+        # the newest dictionary, precomputed for the compression level once
+        self._compress_dict: zstandard.ZstdCompressionDict | None = None
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _dictionary(self, dict_id: int) -> zstandard.ZstdCompressionDict | None:
+        if dict_id not in self._dictionaries:
+            data = self.backend.get_dictionary(dict_id)
+            if data is None:
+                return None
+            self._dictionaries[dict_id] = zstandard.ZstdCompressionDict(data)
+        return self._dictionaries[dict_id]
+
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        # compressors aren't thread safe, the precomputed dictionary is shared
+        with self._lock:
+            if not self._loaded:
+                self._dict_id = self.backend.latest_dictionary_id()
+                dictionary = self._dict_id and self._dictionary(self._dict_id)
+                if dictionary:
+                    dictionary.precompute_compress(level=self.level)
+                    self._compress_dict = dictionary
+                self._loaded = True
+            dictionary = self._compress_dict
+        return zstandard.ZstdCompressor(level=self.level, dict_data=dictionary)
+
+    def train_dictionary(self, pages: list[bytes], dict_size: int = DICT_SIZE) -> int:
+        """Train a dictionary on sample pages and compress new pages with it."""
+        dictionary = zstandard.train_dictionary(dict_size, pages)
+        dictionary.precompute_compress(level=self.level)
+        dict_id = dictionary.dict_id()
+        self.backend.put_dictionary(dict_id, dictionary.as_bytes())
+        with self._lock:
+            self._dictionaries[dict_id] = dictionary
+            self._dict_id = dict_id
+            self._compress_dict = dictionary
+            self._loaded = True
+        return dict_id
+
+    def put(self, url: str, page: str | bytes) -> str:
+        """Archive a page fetched from url, return its content hash."""
+        if isinstance(page, str):
+            page = page.encode("utf-8")
+        page_hash = content_hash(page)
+        self.backend.put_blob(page_hash, self._compressor().compress(page))
+        self.backend.put_ref(make_hash(url), page_hash)
+        return page_hash
+
+    def open_content(self, page_hash: str) -> BinaryIO | None:
+        """Stream the decompressed page with the given content hash."""
+        blob = self.backend.open_blob(page_hash)
+        if blob is None:
+            return None
+        params = zstandard.get_frame_parameters(blob.peek(FRAME_HEADER_SIZE))
+        dictionary = None
+        if params.dict_id:
+            with self._lock:
+                dictionary = self._dictionary(params.dict_id)
+            if dictionary is None:
+                blob.close()
+                raise ValueError(f"missing dictionary {params.dict_id} for {page_hash}")
+        decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+        return decompressor.stream_reader(blob, closefd=True)
+
+    def open(self, url: str) -> BinaryIO | None:
+        """Stream the last page archived for url."""
+        page_hash = self.backend.get_ref(make_hash(url))
+        return self.open_content(page_hash) if page_hash else None
+
+    def get(self, url: str) -> bytes | None:
+        stream = self.open(url)
+        if stream is None:
+            return None
+        with stream:
+            return stream.read()
+
+
+@cache
+def default_archive() -> PageArchive | None:
+    """
+    Archive configured by the environment: a local directory in HTML_ARCHIVE_DIR,
+    or the Postgres database of the HTML_ARCHIVE_POSTGRES_ENV environment.
+    """
+    if directory := os.environ.get("HTML_ARCHIVE_DIR"):
+        return PageArchive(FilesystemArchiveBackend(directory))
+    if env := os.environ.get("HTML_ARCHIVE_POSTGRES_ENV"):
+        # psycopg2 is only needed when the archive is in Postgres
+        # pylint: disable=import-outside-toplevel
+        from src.adapters.db.postgresql_pool import get_pool
+
+        return PageArchive(PostgreSQLArchiveBackend(get_pool(EnvType(env))))
+    return None
+
+
+def archive_page(url: str, page: str | bytes, log) -> None:
+    """Archive a fetched page in the default archive; failures are only logged."""
+    try:
+        archive = default_archive()
+        if archive is not None:
+            archive.put(url, page)
+    except Exception as e:  # pylint: disable=broad-except
+        log.warning("archive %s failed: %s", url, e)
@@ -0,0 +1,227 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+from enum import StrEnum
+
+from src.adapters.db.base import BaseDBAdapter
+from src.schemas.common import EnvType, TableName
+
+logger = logging.getLogger(__name__)
+
+
+class BreakerState(StrEnum):
+    CLOSED = "closed"  # requests go to the origin, outcomes are tracked
+    OPEN = "open"  # the origin is skipped until the probe interval passes
+    HALF_OPEN = "half_open"  # a single probe request decides whether to close
+
+
+class DBBreakerBackend:
+    """Shares breaker state between workers through the circuit_breaker table."""
+
+    def __init__(self, db_session: BaseDBAdapter):
+        self.db_session = db_session
+
+    def load(self, name: str) -> tuple[BreakerState, float | None] | None:
+        row = self.db_session.table(TableName.CIRCUIT_BREAKER).read_one(
+            name, partition_key=name
+        )
+        if not row:
+            return None
+        return BreakerState(row["state"]), row.get("opened_at")
+
+    def save(self, name: str, state: BreakerState, opened_at: float | None) -> None:
+        self.db_session.table(TableName.CIRCUIT_BREAKER).create_or_update_one(
+            {"id": name, "state": state.value, "opened_at": opened_at}
+        )
+
+
+class CircuitBreaker:  # pylint: disable=too-many-instance-attributes
+    """
+    Failure-rate circuit breaker for a single origin host.
+
+    Opens when at least failure_rate of the last window_size calls failed (and
+    there were at least min_calls of them). While open, allow_request() returns
+    False except for one probe request per probe_interval seconds; the probe's
+    outcome closes the breaker or keeps it open.
+
+    With a backend, transitions are written to it and the shared state is read
+    back at most every sync_interval seconds, so all workers agree on the state.
+    The failure window and the probe are per process.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        name: str,
+        *,
+        window_size: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        probe_interval: float = 30.0,
+        backend: DBBreakerBackend | None = None,
+        sync_interval: float = 5.0,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.probe_interval = probe_interval
+        self.backend = backend
+        self.sync_interval = sync_interval
+        self.state = BreakerState.CLOSED
+        # wall clock, so the shared opened_at means the same in every worker
+        self.opened_at: float | None = None
+        self.transitions = Counter()
+        self._outcomes = deque(maxlen=window_size)
+        self._probe_started_at: float | None = None
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            self._sync()
+            if self.state == BreakerState.CLOSED:
+                return True
+            if self.state == BreakerState.OPEN:
+                if time.time() - self.opened_at < self.probe_interval:
+                    return False
+                self._transition(BreakerState.HALF_OPEN)
+            # a probe that never reported back (e.g. skipped for lack of time) is
+            # given up after another interval
+            if self._probe_started_at and (
+                time.time() - self._probe_started_at < self.probe_interval
+            ):
+                return False
+            self._probe_started_at = time.time()
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._outcomes.append(True)
+            if self.state != BreakerState.CLOSED:
+                self._probe_started_at = None
+                self._outcomes.clear()
+                self._transition(BreakerState.CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._outcomes.append(False)
+            if self.state == BreakerState.HALF_OPEN:
+                self._probe_started_at = None
+                self._transition(BreakerState.OPEN)
+            elif self.state == BreakerState.CLOSED and self._should_open():
+                self._transition(BreakerState.OPEN)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state.value,
+                "failure_rate": self._current_failure_rate(),
+                "calls": len(self._outcomes),
+                "transitions": {
+                    f"{from_state}->{to_state}": count
+                    for (from_state, to_state), count in self.transitions.items()
+                },
+            }
+
+    def _current_failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def _should_open(self) -> bool:
+        return (
+            len(self._outcomes) >= self.min_calls
+            and self._current_failure_rate() >= self.failure_rate
+        )
+
+    def _transition(self, state: BreakerState, shared: bool = True) -> None:
+        if state == self.state:
+            return
+        self.transitions[(self.state.value, state.value)] += 1
+        logger.warning(
+            "circuit breaker %s: %s -> %s (failure rate %.2f)",
+            self.name,
+            self.state,
+            state,
+            self._current_failure_rate(),
+        )
+        if state == BreakerState.OPEN:
+            self.opened_at = time.time()
+        self.state = state
+        if shared and self.backend:
+            try:
+                self.backend.save(self.name, self.state, self.opened_at)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.warning(
+                    "circuit breaker %s: failed to save state: %s", self.name, e
+                )
+
+    def _sync(self) -> None:
+        if not self.backend or time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        self._synced_at = time.monotonic()
+        try:
+            shared = self.backend.load(self.name)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("circuit breaker %s: failed to load state: %s", self.name, e)
+            return
+        if not shared or self.state == BreakerState.HALF_OPEN:
+            return
+        state, opened_at = shared
+        if state == BreakerState.OPEN and self.state == BreakerState.CLOSED:
+            self._transition(BreakerState.OPEN, shared=False)
+            self.opened_at = opened_at
+        elif state == BreakerState.CLOSED and self.state == BreakerState.OPEN:
+            self._outcomes.clear()
+            self._transition(BreakerState.CLOSED, shared=False)
+
+
+class BreakerRegistry:
+    """One breaker per host, optionally sharing state through a backend."""
+
+    def __init__(self):
+        self.backend: DBBreakerBackend | None = None
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def set_backend(self, backend: DBBreakerBackend | None) -> None:
+        """Share the state of all breakers through backend."""
+        with self._lock:
+            self.backend = backend
+            for breaker in self._breakers.values():
+                breaker.backend = backend
+
+    def get(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(host, backend=self.backend)
+            return self._breakers[host]
+
+    def metrics(self) -> list[dict]:
+        return [breaker.metrics() for breaker in list(self._breakers.values())]
+
+
+breakers = BreakerRegistry()
+get_breaker = breakers.get
+set_breaker_backend = breakers.set_backend
+breaker_metrics = breakers.metrics
+
+
+def default_breaker_backend() -> DBBreakerBackend | None:
+    """
+    Backend configured by the environment: the circuit_breaker table of the
+    Postgres database of the CIRCUIT_BREAKER_POSTGRES_ENV environment, else the
+    breakers are per process.
+    """
+    env = os.environ.get("CIRCUIT_BREAKER_POSTGRES_ENV")
+    if not env:
+        return None
+    # psycopg2 is only needed when the state is shared through Postgres
+    # pylint: disable=import-outside-toplevel
+    from src.adapters.db.postgresql_core import PostgreSQLCoreAdapter
+
+    # not cached, every worker must see the transitions of the others
+    db_session = PostgreSQLCoreAdapter(EnvType(env), logger)
+    return DBBreakerBackend(db_session.use_db(os.environ[f"{env.upper()}_POSTGRES_DB"]))
@@ -1,9 +1,24 @@
 import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from itertools import groupby
+from urllib.parse import urlsplit
 import hashlib
 
 import requests
 
+from src.helpers.circuit_breaker import get_breaker
+from src.helpers.fetcher import LatencyWindow, fetcher
+
+DIRECT_TIMEOUT = 5
+OXYLABS_TIMEOUT = 60
+# start the Oxylabs request once the direct one is slower than this share of
+# recent direct requests; the fixed delay is used until there are enough samples
+HEDGE_PERCENTILE = 0.9
+DEFAULT_HEDGE_DELAY = 2.0
+
+direct_latency = LatencyWindow()
+
 
 def get_templates_dir() -> str:
     return os.path.join("src", "static", "templates")
@@ -19,23 +34,44 @@ def split_list(lst, delimiter) -> list[list]:
     ]
 
 
-def get_html(url: str, logger) -> str | None:
+def _timeout(timeout: float, deadline: float | None) -> float:
+    """Clip a request timeout to the time left until the monotonic deadline."""
+    if deadline is None:
+        return timeout
+    return min(timeout, deadline - time.monotonic())
+
+
+def get_direct_html(url: str, logger, timeout: float = DIRECT_TIMEOUT) -> bytes | None:
+    breaker = get_breaker(urlsplit(url).netloc)
+    start = time.monotonic()
     try:
-        resp = requests.get(
+        resp = fetcher.get(
             url,
             headers={
                 "User-Agent": "Mozilla/5.0 (X11; Linux x86_64)",
                 "Accept-Language": "ro-MD,ro;q=0.9,en-US;q=0.8,en;q=0.7,ru;q=0.6",
             },
-            timeout=5,
+            timeout=timeout,
         )
 
+        # a 4xx is an answer about the receipt, only 5xx means the origin is unwell
+        if resp.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
         if resp.status_code == 200:
-            return resp.text
+            direct_latency.add(time.monotonic() - start)
+            # raw bytes, the parser extracts the payload without decoding the page
+            return resp.content
         logger.warning("GET %s response_code=%s", url, resp.status_code)
     except requests.RequestException as e:
+        breaker.record_failure()
         logger.warning("GET %s failed: %s", url, e)
+    return None
+
 
+def get_oxylabs_html(url: str, logger, timeout: float = OXYLABS_TIMEOUT) -> str | None:
     try:
         api_user = os.environ.get("OXYLABS_API_USER")
         api_pass = os.environ.get("OXYLABS_API_PASS")
@@ -44,12 +80,11 @@ def get_html(url: str, logger) -> str | None:
             logger.warning("missing OXYLABS_API_USER and OXYLABS_API_PASS")
             return None
 
-        resp = requests.request(
-            "POST",
+        resp = fetcher.post(
             "https://realtime.oxylabs.io/v1/queries",
             auth=(api_user, api_pass),
             json={"source": "universal", "url": url},
-            timeout=60,
+            timeout=timeout,
         )
 
         if resp.status_code == 200:
@@ -57,10 +92,90 @@ def get_html(url: str, logger) -> str | None:
         logger.warning("oxylabs %s response_code=%s", url, resp.status_code)
     except (requests.RequestException, ValueError, KeyError, IndexError) as e:
         logger.warning("oxylabs %s failed: %s", url, e)
-
     return None
 
 
+def get_html(
+    url: str,
+    logger,
+    deadline: float | None = None,
+    hedged: bool = False,
+    hedge_percentile: float = HEDGE_PERCENTILE,
+) -> str | bytes | None:
+    """
+    Fetch a receipt page directly from the site, falling back to Oxylabs.
+
+    deadline is a time.monotonic() value both requests must finish by. In hedged
+    mode Oxylabs isn't kept waiting for the direct request to time out: it is
+    started once the direct request is slower than hedge_percentile of its recent
+    latencies, and the first page returned by either of them wins.
+
+    While the circuit breaker of the site's host is open the direct request is
+    skipped, apart from the breaker's periodic probe.
+    """
+    if not get_breaker(urlsplit(url).netloc).allow_request():
+        logger.info("GET %s circuit open, using oxylabs", url)
+        timeout = _timeout(OXYLABS_TIMEOUT, deadline)
+        if timeout <= 0:
+            logger.warning("GET %s deadline exceeded", url)
+            return None
+        return get_oxylabs_html(url, logger, timeout)
+
+    if hedged:
+        return _get_html_hedged(url, logger, deadline, hedge_percentile)
+
+    timeout = _timeout(DIRECT_TIMEOUT, deadline)
+    if timeout > 0:
+        page = get_direct_html(url, logger, timeout)
+        if page:
+            return page
+
+    timeout = _timeout(OXYLABS_TIMEOUT, deadline)
+    if timeout <= 0:
+        logger.warning("GET %s deadline exceeded", url)
+        return None
+    return get_oxylabs_html(url, logger, timeout)
+
+
+def _get_html_hedged(
+    url: str, logger, deadline: float | None, hedge_percentile: float
+) -> str | bytes | None:
+    if _timeout(DIRECT_TIMEOUT, deadline) <= 0:
+        logger.warning("GET %s deadline exceeded", url)
+        return None
+
+    # a fresh executor per call stays usable in forked workers; the losing request
+    # is abandoned and ends within its own (deadline-clipped) timeout
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="get_html")
+    try:
+        direct = executor.submit(
+            get_direct_html, url, logger, _timeout(DIRECT_TIMEOUT, deadline)
+        )
+        hedge_delay = direct_latency.percentile(hedge_percentile, DEFAULT_HEDGE_DELAY)
+        wait([direct], timeout=max(_timeout(hedge_delay, deadline), 0))
+        if direct.done() and direct.result():
+            return direct.result()
+
+        timeout = _timeout(OXYLABS_TIMEOUT, deadline)
+        if timeout <= 0:
+            logger.warning("GET %s deadline exceeded", url)
+            return None
+        logger.info("GET %s hedging with oxylabs after %.2fs", url, hedge_delay)
+        pending = {direct, executor.submit(get_oxylabs_html, url, logger, timeout)}
+        while pending:
+            remaining = None if deadline is None else max(_timeout(timeout, deadline), 0)
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                logger.warning("GET %s deadline exceeded", url)
+                return None
+            for future in done:
+                if future.result():
+                    return future.result()
+        return None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
 def validate_barcode(barcode: str) -> bool:
     if not barcode.isdigit() or len(barcode) not in (8, 12, 13, 14):
         return False
@@ -0,0 +1,111 @@
+import os
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+# max keep-alive connections per host; extra concurrent requests wait for a free one
+POOL_MAXSIZE = 8
+
+# gzip/deflate, plus br and zstd only when their decoders are installed
+DEFAULT_HEADERS = {"Accept-Encoding": ACCEPT_ENCODING}
+
+
+class LatencyWindow:
+    """Sliding window of recent request latencies, in seconds."""
+
+    def __init__(self, size: int = 100, min_samples: int = 10):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float, default: float) -> float:
+        """Return the q-th (0..1) percentile, or default until enough samples exist."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return default
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+class HttpFetcher:
+    """
+    Keep-alive HTTP client with one pooled requests.Session per host.
+
+    Reusing the sessions saves a TCP and TLS handshake per receipt on warm
+    function instances. Sessions are dropped in forked children, so process
+    pool workers never share sockets with their parent.
+    """
+
+    def __init__(self, pool_maxsize: int = POOL_MAXSIZE):
+        self.pool_maxsize = pool_maxsize
+        self._sessions: dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def session(self, url: str) -> requests.Session:
+        host = urlsplit(url).netloc
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = self._new_session()
+                    self._sessions[host] = session
+        return session
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.pool_maxsize, pool_block=True
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(DEFAULT_HEADERS)
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.session(url).request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Return requests, opened connections and reused connections per host."""
+        stats = {}
+        for host, session in list(self._sessions.items()):
+            host_stats = {"requests": 0, "connections": 0}
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is not None:
+                        host_stats["requests"] += pool.num_requests
+                        host_stats["connections"] += pool.num_connections
+            host_stats["reused"] = host_stats["requests"] - host_stats["connections"]
+            stats[host] = host_stats
+        return stats
+
+    def reset(self) -> None:
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
+
+    def reset_after_fork(self) -> None:
+        # the parent's lock may be held and its sockets must not be reused
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+
+fetcher = HttpFetcher()
+os.register_at_fork(after_in_child=fetcher.reset_after_fork)
@@ -0,0 +1,139 @@
+import heapq
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+# mean radius of the Earth, in meters
+EARTH_RADIUS = 6371008.8
+# meters per degree of latitude
+METERS_PER_DEGREE = EARTH_RADIUS * math.pi / 180
+# side of the grid cells in degrees, about 550 m of latitude
+DEFAULT_CELL_SIZE = 0.005
+
+
+def distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle (haversine) distance between two points, in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def min_cos_lat(lat: float, radius: float) -> float:
+    """
+    Lowest cos(latitude) around lat: the scale of a degree of longitude at the
+    edge of a search of radius meters, where it is the shortest.
+    """
+    edge = min(abs(lat) + 3 * radius / METERS_PER_DEGREE, 89.0)
+    return math.cos(math.radians(edge))
+
+
+def radius_box(
+    lat: float, lon: float, radius: float
+) -> Tuple[float, float, float, float]:
+    """(lon_min, lat_min, lon_max, lat_max) around the circle of radius meters."""
+    d_lat = radius / METERS_PER_DEGREE
+    d_lon = d_lat / min_cos_lat(lat, radius)
+    return lon - d_lon, lat - d_lat, lon + d_lon, lat + d_lat
+
+
+def shop_location(shop: Dict[str, Any]) -> Tuple[float, float] | None:
+    """(lat, lon) of the OSM data of a shop, None when it has no valid one."""
+    osm_data = shop.get("osm_data") or {}
+    try:
+        lat, lon = float(osm_data["lat"]), float(osm_data["lon"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+class GridIndex:
+    """
+    Points bucketed in square cells of cell_size degrees, for nearest neighbour
+    queries without a database index. A query scans the rings of cells around
+    its point until the cells left are farther than the k-th point found.
+    """
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], List[Tuple[float, float, Any]]] = {}
+        self.size = 0
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_size), math.floor(lon / self.cell_size)
+
+    def add(self, lat: float, lon: float, item: Any) -> None:
+        self._cells.setdefault(self._cell(lat, lon), []).append((lat, lon, item))
+        self.size += 1
+
+    def extend(self, points: Iterable[Tuple[float, float, Any]]) -> None:
+        for lat, lon, item in points:
+            self.add(lat, lon, item)
+
+    def _ring(self, center: Tuple[int, int], ring: int) -> Iterable[Tuple[int, int]]:
+        row, col = center
+        if ring == 0:
+            yield center
+            return
+        for d_col in range(-ring, ring + 1):
+            yield row - ring, col + d_col
+            yield row + ring, col + d_col
+        for d_row in range(-ring + 1, ring):
+            yield row + d_row, col - ring
+            yield row + d_row, col + ring
+
+    def nearest(
+        self, lat: float, lon: float, k: int, radius: float
+    ) -> List[Tuple[float, Any]]:
+        """(meters, item) of the k nearest items within radius, closest first."""
+        if k <= 0 or not self.size:
+            return []
+        center = self._cell(lat, lon)
+        # meters of the shortest step between cells, a degree of longitude at the edge
+        cell_meters = self.cell_size * METERS_PER_DEGREE * min_cos_lat(lat, radius)
+        max_ring = math.ceil(radius / cell_meters) + 1
+        found: List[Tuple[float, int, Any]] = []  # max heap of the k nearest
+        for ring in range(max_ring + 1):
+            # the cells of this ring and beyond are at least this far
+            if found and len(found) == k and (ring - 1) * cell_meters > -found[0][0]:
+                break
+            # sparse grid, the occupied cells left are fewer than those of a ring
+            sparse = 8 * ring > len(self._cells)
+            if sparse:
+                cells = self._cells_from(center, ring, max_ring)
+            else:
+                cells = self._ring(center, ring)
+            for meters, item in self._within(cells, lat, lon, radius):
+                entry = (-meters, id(item), item)
+                if len(found) < k:
+                    heapq.heappush(found, entry)
+                elif meters < -found[0][0]:
+                    heapq.heapreplace(found, entry)
+            if sparse:
+                break
+        return [(-meters, item) for meters, _, item in sorted(found, reverse=True)]
+
+    def _cells_from(
+        self, center: Tuple[int, int], first: int, last: int
+    ) -> List[Tuple[int, int]]:
+        """Occupied cells of the rings first to last around center."""
+        return [
+            cell
+            for cell in self._cells
+            if first <= max(abs(cell[0] - center[0]), abs(cell[1] - center[1])) <= last
+        ]
+
+    def _within(
+        self, cells: Iterable[Tuple[int, int]], lat: float, lon: float, radius: float
+    ) -> Iterator[Tuple[float, Any]]:
+        """(meters, item) of the items of the cells within radius of the point."""
+        for cell in cells:
+            for point_lat, point_lon, item in self._cells.get(cell, ()):
+                meters = distance(lat, lon, point_lat, point_lon)
+                if meters <= radius:
+                    yield meters, item
@@ -1,43 +1,391 @@
+import copy
 import logging
+import os
 import re
-from typing import Tuple
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import cache
+from typing import Callable, Dict, Iterable, List, Tuple
 
 import requests
 from OSMPythonTools.nominatim import Nominatim
 
+from src.adapters.osm_cache.base import BaseOsmCacheBackend
+from src.adapters.osm_cache.sqlite import SQLiteOsmCacheBackend
+from src.schemas.common import EnvType
+
 OSM_HOST = "https://www.openstreetmap.org"
 
+# seconds a lookup is used: shops rarely move, and Nominatim takes 1 request/s
+DEFAULT_TTL = 30 * 24 * 3600.0
+# seconds an id Nominatim doesn't know is remembered, it may just be new
+DEFAULT_NEGATIVE_TTL = 3600.0
+# seconds past the ttl a lookup is still used while it is fetched again
+DEFAULT_STALE_TTL = 7 * 24 * 3600.0
+# lookups kept in the process, the least recently used are dropped
+DEFAULT_MAX_SIZE = 1024
+# ids per Nominatim lookup request, the most it accepts
+LOOKUP_CHUNK = 50
+# Nominatim requests per second, its usage policy allows 1
+DEFAULT_NOMINATIM_RATE = 1.0
+
 logger = logging.getLogger(__name__)
 
 _nominatim = Nominatim()
 
 
+class OsmLookupError(Exception):
+    """A Nominatim response that couldn't be read, nothing is known of its ids."""
+
+
+# failed lookups: they aren't cached, the last known data is returned instead
+FETCH_ERRORS = (requests.exceptions.RequestException, OsmLookupError)
+
+
 def get_osm_id(osm_type: str, osm_key: str) -> str:
     return f"{osm_type[0].upper()}{osm_key}"
 
 
-def lookup_osm_data(osm_type: str, osm_id: str) -> dict:
-    osm_id_str = get_osm_id(osm_type, osm_id)
+class TokenBucket:
+    """
+    Rate limiter: acquire() takes a token, waiting for one if needed. Tokens are
+    added rate per second, up to capacity.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+            self._tokens -= 1
+            # the token is taken now, the caller waits until it would have come
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+nominatim_rate = TokenBucket(
+    float(os.environ.get("NOMINATIM_RATE", DEFAULT_NOMINATIM_RATE))
+)
+
+
+class OsmLookupCache:  # pylint: disable=too-many-instance-attributes
+    """
+    Nominatim lookups by OSM id, kept ttl seconds (negative_ttl for the ids
+    Nominatim doesn't know) in an in-process LRU in front of a persistent backend.
+
+    An entry at most stale_ttl seconds past its ttl is still returned, and
+    fetched again in the background, so a lookup waits for Nominatim only the
+    first time an id is seen. Failed requests aren't cached; the last known data
+    of the id, however old, is returned instead when there is some.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        backend: BaseOsmCacheBackend | None = None,
+        *,
+        ttl: float = DEFAULT_TTL,
+        negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+        stale_ttl: float = DEFAULT_STALE_TTL,
+        max_size: int = DEFAULT_MAX_SIZE,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        # osm id -> (data, fetched_at), least recently used first
+        self._entries: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self._refreshing: set[str] = set()
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def get(self, osm_id: str, fetch: Callable[[str], dict]) -> dict:
+        """Data of the id, from the cache or fetch(osm_id), {} if it has none."""
+        entry = self._entry(osm_id)
+        if self._is_fresh(entry):
+            self._count("hits" if entry[0] else "negative_hits")
+            return copy.deepcopy(entry[0])
+        if self._is_stale(entry):
+            self._count("stale_hits")
+            self._refresh_later([osm_id], lambda ids: {osm_id: fetch(osm_id)})
+            return copy.deepcopy(entry[0])
+
+        self._count("misses")
+        try:
+            data = self._fetch(osm_id, fetch)
+        except FETCH_ERRORS as e:
+            logger.warning("OSM network request failed for %s: %s", osm_id, e)
+            self._count("errors")
+            return copy.deepcopy(entry[0]) if entry else {}
+        return copy.deepcopy(data)
+
+    def get_many(
+        self,
+        osm_ids: List[str],
+        fetch_many: Callable[[List[str]], Dict[str, dict]],
+        chunk_size: int = LOOKUP_CHUNK,
+    ) -> Dict[str, dict]:
+        """
+        Data of the ids, {} for those without. The ids not in the cache or expired
+        are fetched chunk_size at a time; fetch_many returns the data of the ids
+        it found. Stale ids are returned and fetched again in the background, like
+        in get(). Failed chunks aren't cached, the last known data is returned.
+        """
+        osm_ids = list(dict.fromkeys(osm_ids))
+        entries = self._entries_of(osm_ids)
+        results = {}
+        missing, stale = [], []
+        for osm_id in osm_ids:
+            entry = entries.get(osm_id)
+            if self._is_fresh(entry):
+                self._count("hits" if entry[0] else "negative_hits")
+                results[osm_id] = copy.deepcopy(entry[0])
+            elif self._is_stale(entry):
+                self._count("stale_hits")
+                results[osm_id] = copy.deepcopy(entry[0])
+                stale.append(osm_id)
+            else:
+                self._count("misses")
+                missing.append(osm_id)
+        if stale:
+            self._refresh_later(stale, fetch_many, chunk_size)
+
+        for start in range(0, len(missing), chunk_size):
+            chunk = missing[start : start + chunk_size]
+            try:
+                results.update(self._fetch_many(chunk, fetch_many))
+            except FETCH_ERRORS as e:
+                logger.warning("OSM network request failed for %s: %s", chunk, e)
+                self._count("errors")
+                for osm_id in chunk:
+                    entry = entries.get(osm_id)
+                    results[osm_id] = copy.deepcopy(entry[0]) if entry else {}
+        return {osm_id: results[osm_id] for osm_id in osm_ids}
+
+    def _is_fresh(self, entry: tuple[dict, float] | None) -> bool:
+        if entry is None:
+            return False
+        data, fetched_at = entry
+        return time.time() - fetched_at < (self.ttl if data else self.negative_ttl)
+
+    def _is_stale(self, entry: tuple[dict, float] | None) -> bool:
+        """Past its ttl but still returned while it is fetched again."""
+        if entry is None or not entry[0]:
+            return False
+        return time.time() - entry[1] < self.ttl + self.stale_ttl
+
+    def _entries_of(self, osm_ids: List[str]) -> Dict[str, tuple[dict, float]]:
+        """Entries of the ids in the process, then those of the backend."""
+        entries = {}
+        with self._lock:
+            for osm_id in osm_ids:
+                if osm_id in self._entries:
+                    self._entries.move_to_end(osm_id)
+                    entries[osm_id] = self._entries[osm_id]
+        rest = [osm_id for osm_id in osm_ids if osm_id not in entries]
+        if self.backend is None or not rest:
+            return entries
+        try:
+            stored = self.backend.get_many(rest)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("OSM cache read of %s ids failed: %s", len(rest), e)
+            return entries
+        for osm_id, entry in stored.items():
+            self._remember(osm_id, *entry)
+        return {**entries, **stored}
+
+    def _entry(self, osm_id: str) -> tuple[dict, float] | None:
+        with self._lock:
+            if osm_id in self._entries:
+                self._entries.move_to_end(osm_id)
+                return self._entries[osm_id]
+        if self.backend is None:
+            return None
+        try:
+            entry = self.backend.get(osm_id)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("OSM cache read of %s failed: %s", osm_id, e)
+            return None
+        if entry is not None:
+            self._remember(osm_id, *entry)
+        return entry
+
+    def _remember(self, osm_id: str, data: dict, fetched_at: float) -> None:
+        with self._lock:
+            self._entries[osm_id] = (data, fetched_at)
+            self._entries.move_to_end(osm_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _fetch(self, osm_id: str, fetch: Callable[[str], dict]) -> dict:
+        data = fetch(osm_id)
+        self.put(osm_id, data)
+        return data
+
+    def _fetch_many(
+        self, osm_ids: List[str], fetch_many: Callable[[List[str]], Dict[str, dict]]
+    ) -> Dict[str, dict]:
+        found = fetch_many(osm_ids)
+        results = {}
+        for osm_id in osm_ids:
+            data = found.get(osm_id, {})
+            self.put(osm_id, data)
+            results[osm_id] = copy.deepcopy(data)
+        return results
+
+    def put(self, osm_id: str, data: dict, fetched_at: float | None = None) -> None:
+        """Store the data of the id, fetched now unless fetched_at is given."""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        self._remember(osm_id, data, fetched_at)
+        if self.backend is None:
+            return
+        try:
+            self.backend.put(osm_id, data, fetched_at)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("OSM cache write of %s failed: %s", osm_id, e)
+
+    def _refresh_later(
+        self,
+        osm_ids: List[str],
+        fetch_many: Callable[[List[str]], Dict[str, dict]],
+        chunk_size: int = LOOKUP_CHUNK,
+    ) -> None:
+        """Fetch the ids again in a background thread, chunk_size per request."""
+        with self._lock:
+            osm_ids = [osm_id for osm_id in osm_ids if osm_id not in self._refreshing]
+            self._refreshing.update(osm_ids)
+        if not osm_ids:
+            return
+        threading.Thread(
+            target=self._refresh, args=(osm_ids, fetch_many, chunk_size), daemon=True
+        ).start()
+
+    def _refresh(
+        self,
+        osm_ids: List[str],
+        fetch_many: Callable[[List[str]], Dict[str, dict]],
+        chunk_size: int,
+    ) -> None:
+        try:
+            for start in range(0, len(osm_ids), chunk_size):
+                chunk = osm_ids[start : start + chunk_size]
+                try:
+                    self._fetch_many(chunk, fetch_many)
+                    self._count("refreshes", len(chunk))
+                except FETCH_ERRORS as e:
+                    logger.warning("OSM refresh of %s failed: %s", chunk, e)
+                    self._count("errors")
+        finally:
+            with self._lock:
+                self._refreshing.difference_update(osm_ids)
+
+    def _count(self, stat: str, count: int = 1) -> None:
+        with self._lock:
+            self._stats[stat] += count
+
+    def clear(self) -> None:
+        """Forget the entries of the process, the backend keeps its own."""
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {**self._stats, "size": len(self._entries), "max_size": self.max_size}
+
+
+@cache
+def default_osm_cache() -> OsmLookupCache:
+    """
+    Cache configured by the environment: persisted in the SQLite file
+    OSM_CACHE_SQLITE_PATH, or in the Postgres database of the
+    OSM_CACHE_POSTGRES_ENV environment, else in the process only.
+    """
+    backend = None
+    if path := os.environ.get("OSM_CACHE_SQLITE_PATH"):
+        backend = SQLiteOsmCacheBackend(path)
+    elif env := os.environ.get("OSM_CACHE_POSTGRES_ENV"):
+        # psycopg2 is only needed when the cache is in Postgres
+        # pylint: disable=import-outside-toplevel
+        from src.adapters.db.postgresql_pool import get_pool
+        from src.adapters.osm_cache.postgresql import PostgreSQLOsmCacheBackend
+
+        backend = PostgreSQLOsmCacheBackend(get_pool(EnvType(env)))
+    return OsmLookupCache(
+        backend,
+        ttl=float(os.environ.get("OSM_CACHE_TTL", DEFAULT_TTL)),
+        negative_ttl=float(
+            os.environ.get("OSM_CACHE_NEGATIVE_TTL", DEFAULT_NEGATIVE_TTL)
+        ),
+        stale_ttl=float(os.environ.get("OSM_CACHE_STALE_TTL", DEFAULT_STALE_TTL)),
+        max_size=int(os.environ.get("OSM_CACHE_MAX_SIZE", DEFAULT_MAX_SIZE)),
+    )
+
+
+def _lookup_data(elem) -> dict:
+    return {
+        "place_id": elem.placeId(),
+        "osm_type": elem.type(),
+        "osm_id": elem.id(),
+        "display_name": elem.displayName(),
+        "lat": elem.lat(),
+        "lon": elem.lon(),
+        "address": elem.address(),
+        "extratags": elem.tag("extratags") if elem.tag("extratags") else {},
+    }
+
+
+def query_nominatim_many(osm_ids: List[str]) -> Dict[str, dict]:
+    """
+    Nominatim lookup of up to LOOKUP_CHUNK OSM ids in one rate limited request,
+    the data of the ids it knows by id. Raises on network errors, and
+    OsmLookupError when the response can't be read.
+    """
+    found = {}
+    nominatim_rate.acquire()
     try:
-        result = _nominatim.query(osm_id_str, lookup=True)
-        if result and len(result) > 0:
-            elem = result[0]
-            return {
-                "place_id": elem.placeId(),
-                "osm_type": elem.type(),
-                "osm_id": elem.id(),
-                "display_name": elem.displayName(),
-                "lat": elem.lat(),
-                "lon": elem.lon(),
-                "address": elem.address(),
-                "extratags": elem.tag("extratags") if elem.tag("extratags") else {},
-            }
+        result = _nominatim.query(*osm_ids, lookup=True) or []
     except (AttributeError, IndexError, KeyError, TypeError) as e:
-        # OSM object doesn't exist or has unexpected structure
-        logger.warning("OSM lookup failed for %s: %s", osm_id_str, e)
-    except requests.exceptions.RequestException as e:
-        logger.warning("OSM network request failed for %s: %s", osm_id_str, e)
-    return {}
+        # nothing is known of these ids, they must not be cached as unknown
+        raise OsmLookupError(f"OSM lookup failed for {','.join(osm_ids)}: {e}") from e
+    for elem in result:
+        try:
+            found[get_osm_id(elem.type(), str(elem.id()))] = _lookup_data(elem)
+        except (AttributeError, IndexError, KeyError, TypeError) as e:
+            # OSM object has unexpected structure, the others are kept
+            logger.warning("OSM lookup failed for an element of %s: %s", osm_ids, e)
+    return found
+
+
+def query_nominatim(osm_id_str: str) -> dict:
+    """
+    Nominatim lookup of an OSM id, {} if it is unknown; raises like
+    query_nominatim_many.
+    """
+    return query_nominatim_many([osm_id_str]).get(osm_id_str, {})
+
+
+def lookup_osm_data(osm_type: str, osm_id: str) -> dict:
+    return default_osm_cache().get(get_osm_id(osm_type, osm_id), query_nominatim)
+
+
+def lookup_osm_data_many(osm_ids: Iterable[str]) -> Dict[str, dict]:
+    """
+    Data of many OSM ids (e.g. N123, W456) by id, {} for the unknown ones. The
+    ids missing from the cache are looked up LOOKUP_CHUNK per Nominatim request.
+    """
+    osm_ids = [osm_id.strip().upper() for osm_id in osm_ids]
+    return default_osm_cache().get_many(osm_ids, query_nominatim_many)
 
 
 def validate_osm_url(url: str) -> bool:
@@ -9,9 +9,8 @@ SESSION_VALIDITY_DAYS = 7 * 2
 
 def validate_session(cookie: UserSessionCookie | None, logger) -> UserSession | None:
     if cookie:
-        db_session = init_db_session(logger)
-        db_session.use_table(TableName.USER_SESSION)
-        session = db_session.read_one(
+        sessions = init_db_session(logger).table(TableName.USER_SESSION)
+        session = sessions.read_one(
             str(cookie.session_id), partition_key=cookie.identity_provider
         )
 
@@ -20,7 +19,7 @@ def validate_session(cookie: UserSessionCookie | None, logger) -> UserSession |
             now = datetime.now(tz=created_at.tzinfo)
 
             if created_at + timedelta(days=SESSION_VALIDITY_DAYS) < now:
-                db_session.delete_one(session["id"], partition_key=session["user_id"])
+                sessions.delete_one(session["id"], partition_key=session["user_id"])
             else:
                 return UserSession.model_validate(session)
 
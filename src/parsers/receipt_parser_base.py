@@ -14,7 +14,7 @@ class ReceiptParserBase(ABC):
     user_id: UUID
 
     @abstractmethod
-    def parse_html(self, page: str) -> Self:
+    def parse_html(self, page: str | bytes) -> Self:
         pass
 
     @abstractmethod
@@ -0,0 +1,81 @@
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from os import cpu_count
+from typing import Iterable, Iterator
+from uuid import UUID
+
+from src.parsers.sfs_md.receipt_parser import SfsMdReceiptParser
+from src.schemas.sfs_md.receipt import SfsMdReceipt
+
+# batches up to this size are parsed in the calling process
+SERIAL_BATCH_SIZE = 8
+CHUNK_SIZE = 16
+
+logger = logging.getLogger(__name__)
+
+# (user_id, receipt_url, page) as stored for the archived receipt pages
+PageInput = tuple[UUID, str, str | bytes]
+
+
+class ParseError(Exception):
+    def __init__(self, url: str, msg: str):
+        super().__init__(url, msg)
+        self.url = url
+        self.msg = msg
+
+    def __str__(self) -> str:
+        return f"{self.url}: {self.msg}"
+
+
+def _no_db_api(uri: str, method: str, payload) -> None:
+    raise RuntimeError(f"db_api is not available in batch parsing: {method} {uri}")
+
+
+def parse_one(user_id: UUID, url: str, page: str | bytes) -> SfsMdReceipt | ParseError:
+    parser = SfsMdReceiptParser(logger, user_id, url, _no_db_api)
+    try:
+        return parser.parse_html(page).build_receipt().receipt
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        return ParseError(url, str(e))
+
+
+def _parse_chunk(chunk: list[PageInput]) -> list[SfsMdReceipt | ParseError]:
+    return [parse_one(*page) for page in chunk]
+
+
+def _chunked(pages: Iterator[PageInput], size: int) -> Iterator[list[PageInput]]:
+    while chunk := list(islice(pages, size)):
+        yield chunk
+
+
+def parse_many(
+    pages: Iterable[PageInput],
+    max_workers: int | None = None,
+    chunk_size: int = CHUNK_SIZE,
+    serial_batch_size: int = SERIAL_BATCH_SIZE,
+) -> Iterator[SfsMdReceipt | ParseError]:
+    """
+    Parse archived receipt pages, yielding results in input order.
+
+    Failed pages are yielded as ParseError instead of being raised, so one bad
+    page doesn't stop the batch. Batches of up to serial_batch_size pages are
+    parsed in-process, larger ones are submitted in chunks to a process pool
+    with at most two chunks per worker in flight.
+    """
+    pages = iter(pages)
+    head = list(islice(pages, serial_batch_size + 1))
+    if len(head) <= serial_batch_size:
+        yield from _parse_chunk(head)
+        return
+
+    max_workers = max_workers or cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+        for chunk in _chunked(chain(head, pages), chunk_size):
+            in_flight.append(executor.submit(_parse_chunk, chunk))
+            if len(in_flight) >= max_workers * 2:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
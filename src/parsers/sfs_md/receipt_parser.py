@@ -1,18 +1,88 @@
-import html
 import json
 import re
 from datetime import datetime
 from typing import Self, Callable, Any
+from urllib.parse import urlsplit
 from uuid import UUID
 
 from src.helpers.common import split_list
 from src.parsers.receipt_parser_base import ReceiptParserBase
 from src.schemas.common import CountryCode, CurrencyCode, Unit
-from src.schemas.purchased_item import PurchasedItem
 from src.schemas.sfs_md.receipt import SfsMdReceipt
 
 RECEIPT_REGEX = r'wire:initial-data="([^"]*receipt\.index-component[^"]*)"'
 QUANTITY_UNITS_REGEX = r"(?i)(\d+(\.\d+)?)\s*(kg|g|ml|l)(?![A-Za-z])|(kg\s+[A-Za-z]+)"
+_QUANTITY_UNITS_PATTERN = re.compile(QUANTITY_UNITS_REGEX)
+
+# canonical receipt path on both hosts, optionally prefixed with the site locale:
+# /[ro|ru|en/]receipt-verifier/{cash_register_id}/{total}/{key}/{date}
+RECEIPT_PATH_REGEX = re.compile(
+    r"^/(?:(?:ro|ru|en)/)?receipt(?:-verifier)?/(?P<cash_register_id>[A-Za-z0-9]+)"
+    r"/\d+(?:\.\d+)?/(?P<key>\d+)/\d{4}-\d{2}-\d{2}/?$"
+)
+RECEIPT_HOSTS = ("mev.sfs.md", "sift-mev.sfs.md")
+
+INITIAL_DATA_ANCHOR = 'wire:initial-data="'
+RECEIPT_COMPONENT_NAME = "receipt.index-component"
+# entities emitted by Laravel's e() helper; &amp; goes last to avoid double unescaping
+HTML_ENTITIES = (
+    ("&quot;", '"'),
+    ("&#039;", "'"),
+    ("&lt;", "<"),
+    ("&gt;", ">"),
+    ("&amp;", "&"),
+)
+_HTML_ENTITIES_BYTES = tuple((k.encode(), v.encode()) for k, v in HTML_ENTITIES)
+
+
+def extract_receipt_data(page: str | bytes) -> str | bytes | None:
+    """Return the unescaped Livewire payload of the receipt component.
+
+    Scans the page with find() instead of a regex and keeps the input type,
+    so bytes from the HTTP response never get decoded as a whole.
+    """
+    if isinstance(page, bytes):
+        anchor, name, quote = (
+            INITIAL_DATA_ANCHOR.encode(),
+            RECEIPT_COMPONENT_NAME.encode(),
+            b'"',
+        )
+        entities, amp = _HTML_ENTITIES_BYTES, b"&"
+    else:
+        anchor, name, quote = INITIAL_DATA_ANCHOR, RECEIPT_COMPONENT_NAME, '"'
+        entities, amp = HTML_ENTITIES, "&"
+
+    start = page.find(anchor)
+    while start != -1:
+        start += len(anchor)
+        end = page.find(quote, start)
+        if end == -1:
+            return None
+        if page.find(name, start, end) != -1:
+            data = page[start:end]
+            if amp in data:
+                for entity, char in entities:
+                    data = data.replace(entity, char)
+            return data
+        start = page.find(anchor, end)
+    return None
+
+
+def resolve_receipt_id(url: str) -> str | None:
+    """
+    Compute the receipt id from a canonical-form receipt URL without fetching it.
+
+    Query strings and fragments are ignored. Hash-form URLs
+    (/receipt-verifier/{32 hex chars}) don't carry the id and return None.
+    """
+    parts = urlsplit(url.strip())
+    if parts.scheme != "https" or parts.hostname not in RECEIPT_HOSTS:
+        return None
+
+    match = RECEIPT_PATH_REGEX.match(parts.path)
+    if not match:
+        return None
+    return SfsMdReceipt.make_id(match["cash_register_id"], int(match["key"]))
 
 
 class SfsMdReceiptParser(ReceiptParserBase):
@@ -20,26 +90,38 @@ class SfsMdReceiptParser(ReceiptParserBase):
     receipt: SfsMdReceipt
     url: str
 
-    def __init__(self, logger, user_id: UUID, url: str, db_api: Callable[[str, str, Any], Any]):
+    def __init__(
+        self,
+        logger,
+        user_id: UUID,
+        url: str,
+        db_api: Callable[[str, str, Any], Any],
+    ):
         self.logger = logger
         self.user_id = user_id
         self.url = url
         self.query_db_api = db_api
+        self._receipt_json = None
 
     def get_receipt(self) -> SfsMdReceipt | None:
-        receipt = self.query_db_api(
-            "/receipt/get-by-url", "POST", {"url": self.url}
-        )
+        # the id is deterministic, so a canonical URL in any variant finds the receipt;
+        # a miss by id is final, the receipt is then fetched without another lookup
+        receipt_id = resolve_receipt_id(self.url)
+        if receipt_id:
+            receipt = self.query_db_api("/receipt/get-by-id", "POST", {"id": receipt_id})
+        else:
+            # hash-form URLs don't carry the id
+            receipt = self.query_db_api("/receipt/get-by-url", "POST", {"url": self.url})
 
         if receipt and isinstance(receipt, dict):
             return SfsMdReceipt(**receipt)
 
         return None
 
-    def parse_html(self, page: str) -> Self:
-        matches = re.search(RECEIPT_REGEX, page)
-        if matches:
-            self._data = json.loads(html.unescape(matches.group(1)))
+    def parse_html(self, page: str | bytes) -> Self:
+        data = extract_receipt_data(page)
+        if data:
+            self._data = json.loads(data)
         else:
             self.logger.warning(
                 f"Failed to parse receipt data. " f"Page content preview: {page[:200]}"
@@ -59,7 +141,7 @@ class SfsMdReceiptParser(ReceiptParserBase):
         for purchase in data[1]:
             if purchase[0] != "":
                 quantity, price = purchase[1].split(" x ")
-                unit_groups = re.search(QUANTITY_UNITS_REGEX, purchase[0])
+                unit_groups = _QUANTITY_UNITS_PATTERN.search(purchase[0])
                 unit = None
                 unit_quantity = None
                 if unit_groups:
@@ -75,14 +157,16 @@ class SfsMdReceiptParser(ReceiptParserBase):
                             # Leave unit and unit_quantity as None if parsing fails
                             pass
 
+                # plain dicts are validated together with the receipt in a single
+                # pydantic call, which is cheaper than one PurchasedItem per line
                 purchases.append(
-                    PurchasedItem(
-                        name=purchase[0],
-                        quantity=float(quantity),
-                        unit=unit,
-                        unit_quantity=unit_quantity,
-                        price=float(price),
-                    )
+                    {
+                        "name": purchase[0],
+                        "quantity": float(quantity),
+                        "unit": unit,
+                        "unit_quantity": unit_quantity,
+                        "price": float(price),
+                    }
                 )
 
         self.receipt = SfsMdReceipt(
@@ -100,10 +184,17 @@ class SfsMdReceiptParser(ReceiptParserBase):
             purchases=purchases,
             receipt_url=self.url,
         )
+        self._receipt_json = None
         return self
 
+    def to_json(self) -> dict:
+        """Serialize the built receipt once, for both the db payload and the response."""
+        if self._receipt_json is None:
+            self._receipt_json = self.receipt.model_dump(mode="json")
+        return self._receipt_json
+
     def persist(self) -> SfsMdReceipt:
-        receipt = self.receipt.model_dump()
+        receipt = self.to_json()
         self.logger.info(receipt)
         self.query_db_api("/receipt/get-or-create", "POST", receipt)
         return self.receipt
@@ -18,6 +18,7 @@ class TableName(StrEnum):
     USER = "user"
     USER_IDENTITY = "user_identity"
     USER_SESSION = "user_session"
+    CIRCUIT_BREAKER = "circuit_breaker"
 
 
 class TablePartitionKey(StrEnum):
@@ -75,3 +76,10 @@ class ItemBarcodeStatus(StrEnum):
 class Operator(Enum):
     EQ = "eq"
     NE = "ne"
+    IN = "in"
+    GT = "gt"
+    GTE = "gte"
+    LT = "lt"
+    LTE = "lte"
+    # a point within a box, operand (x_min, y_min, x_max, y_max)
+    WITHIN = "within"
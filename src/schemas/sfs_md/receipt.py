@@ -24,8 +24,12 @@ class SfsMdReceipt(Receipt):
     receipt_canonical_url: str | None = None
     shop_id: UUID | None = None
 
+    @staticmethod
+    def make_id(cash_register_id: str, key: int) -> str:
+        return f"{CountryCode.MOLDOVA}_{cash_register_id}_{key}".lower()
+
     def model_post_init(self, __context) -> None:
-        self.id = f"{CountryCode.MOLDOVA}_{self.cash_register_id}_{self.key}".lower()
+        self.id = self.make_id(self.cash_register_id, self.key)
         self.receipt_canonical_url = (
             f"https://mev.sfs.md/receipt-verifier/{self.cash_register_id}/"
             f"{self.total_amount:.2f}/{self.key}/{self.date:%Y-%m-%d}"
@@ -0,0 +1,175 @@
+import os
+import warnings
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+# Suppress testcontainers deprecation warning about @wait_container_is_ready
+warnings.filterwarnings(
+    "ignore", message=".*wait_container_is_ready.*", category=DeprecationWarning
+)
+
+from testcontainers.postgres import PostgresContainer
+
+from src.adapters.db.postgresql_core import PostgreSQLCoreAdapter
+from src.adapters.db.postgresql_pool import close_pools
+from src.helpers.geo import distance, shop_location
+from src.schemas.common import EnvType, Operator, TableName
+
+
+class TestPostgreSQLWhere(TestCase):
+    container = None
+    adapter = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.container = PostgresContainer("postgres:15.14-alpine")
+        cls.container.start()
+
+        os.environ["TEST_POSTGRES_HOST"] = cls.container.get_container_host_ip()
+        os.environ["TEST_POSTGRES_PORT"] = str(cls.container.get_exposed_port(5432))
+        os.environ["TEST_POSTGRES_DB"] = cls.container.dbname
+        os.environ["TEST_POSTGRES_USER"] = cls.container.username
+        os.environ["TEST_POSTGRES_PASSWORD"] = cls.container.password
+
+        cls.adapter = PostgreSQLCoreAdapter(EnvType.TEST, MagicMock())
+        # id and data only, with the GIN index on data
+        cls.adapter.create_table(TableName.RECEIPT)
+        cls.receipts = cls.adapter.table(TableName.RECEIPT)
+        cls.receipts.create_many(
+            [
+                {"id": str(i), "shop_address": f"street {i % 500}", "total": i % 100}
+                for i in range(20000)
+            ]
+        )
+        with cls.adapter.pool.cursor() as cursor:
+            cursor.execute(f"ANALYZE {TableName.RECEIPT}")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.adapter.drop_table(TableName.RECEIPT)
+        close_pools()
+        cls.container.stop()
+
+    def test_containment_uses_gin_index(self):
+        where = {"shop_address": "street 7", "total": 7}
+
+        plan = self.receipts.explain(where)
+        rows = self.receipts.read_many(where)
+
+        self.assertIn(f"Bitmap Index Scan on idx_{TableName.RECEIPT}_data", plan)
+        self.assertEqual(len(rows), 40)
+
+    def test_in_uses_gin_index(self):
+        where = {"shop_address": (Operator.IN, ["street 1", "street 2"])}
+
+        plan = self.receipts.explain(where)
+        rows = self.receipts.read_many(where)
+
+        self.assertIn(f"Bitmap Index Scan on idx_{TableName.RECEIPT}_data", plan)
+        self.assertEqual(len(rows), 80)
+
+    def test_range_and_ne(self):
+        rows = self.receipts.read_many(
+            {
+                "shop_address": "street 7",
+                "total": [(Operator.GTE, 7), (Operator.LT, 50)],
+                "id": (Operator.NE, "7"),
+            }
+        )
+
+        self.assertEqual(len(rows), 39)
+        self.assertTrue(all(row["total"] == 7 for row in rows))
+
+
+class TestPostgreSQLShopLocation(TestCase):
+    container = None
+    pool = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.container = PostgresContainer("postgres:15.14-alpine")
+        cls.container.start()
+
+        os.environ["TEST_POSTGRES_HOST"] = cls.container.get_container_host_ip()
+        os.environ["TEST_POSTGRES_PORT"] = str(cls.container.get_exposed_port(5432))
+        os.environ["TEST_POSTGRES_DB"] = cls.container.dbname
+        os.environ["TEST_POSTGRES_USER"] = cls.container.username
+        os.environ["TEST_POSTGRES_PASSWORD"] = cls.container.password
+
+        adapter = PostgreSQLCoreAdapter(EnvType.TEST, MagicMock())
+        cls.pool = adapter.pool
+        # the shop columns of the application, location as in 006_shop_location
+        with cls.pool.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE shop (
+                    id TEXT PRIMARY KEY,
+                    country_code TEXT,
+                    company_id TEXT,
+                    address TEXT,
+                    osm_data JSONB,
+                    data JSONB NOT NULL DEFAULT '{}',
+                    location point GENERATED ALWAYS AS (
+                        point(
+                            (osm_data->>'lon')::double precision,
+                            (osm_data->>'lat')::double precision
+                        )
+                    ) STORED
+                );
+                CREATE INDEX idx_shop_location ON shop USING GIST (location);
+                """)
+        cls.shops = adapter.table(TableName.SHOP)
+        cls.shops.create_many(
+            [
+                {
+                    "id": f"{i:05}",
+                    "country_code": "md",
+                    "osm_data": {
+                        "lat": str(46 + i % 100 / 50),
+                        "lon": str(28 + i // 100 / 50),
+                    },
+                }
+                for i in range(10000)
+            ]
+        )
+        with cls.pool.cursor() as cursor:
+            cursor.execute("ANALYZE shop")
+
+    @classmethod
+    def tearDownClass(cls):
+        close_pools()
+        cls.container.stop()
+
+    def test_box_uses_gist_index(self):
+        where = {"location": (Operator.WITHIN, (28.0, 46.0, 28.1, 46.1))}
+
+        plan = self.shops.explain(where)
+        rows = self.shops.read_many(where, order_by="id")
+
+        self.assertIn("idx_shop_location", plan)
+        self.assertEqual(len(rows), 36)
+        self.assertEqual(self.shops.count(where), 36)
+        self.assertNotIn("location", rows[0])
+
+    def test_keyset_pages(self):
+        where = {"location": (Operator.WITHIN, (28.0, 46.0, 28.1, 46.1))}
+        first = self.shops.read_many(where, limit=20, order_by="id")
+        rest = self.shops.read_many(
+            {**where, "id": (Operator.GT, first[-1]["id"])}, order_by="id"
+        )
+
+        self.assertEqual(len(first) + len(rest), 36)
+        self.assertLess(first[-1]["id"], rest[0]["id"])
+
+    def test_nearest_as_a_full_scan(self):
+        # off the 0.02 degree grid of the shops, so the distances don't tie
+        lat, lon = 46.505, 28.047
+        rows = self.shops.nearest(lat, lon, k=5, radius=3000)
+
+        expected = sorted(
+            (distance(lat, lon, *shop_location(shop)), shop["id"])
+            for shop in self.shops.iter_many()
+        )[:5]
+        self.assertEqual([row["id"] for row in rows], [_id for _, _id in expected])
+        for row, (meters, _) in zip(rows, expected):
+            self.assertAlmostEqual(row["distance"], meters, delta=0.01)
+        self.assertEqual(self.shops.nearest(lat, lon, k=5, radius=100), [])
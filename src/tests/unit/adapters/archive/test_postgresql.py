@@ -0,0 +1,40 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from src.adapters.archive.postgresql import PostgreSQLArchiveBackend
+
+
+class TestPostgreSQLArchiveBackend(TestCase):
+    def setUp(self):
+        self.data = bytes(range(256)) * 1000
+        self.pool = MagicMock()
+        connection = self.pool.connection.return_value.__enter__.return_value
+        self.cursor = connection.cursor.return_value.__enter__.return_value
+        self.backend = PostgreSQLArchiveBackend(self.pool)
+
+    def test_open_blob_reads_in_chunks(self):
+        def execute(query, params):
+            if "octet_length" in query:
+                self.cursor.fetchone.return_value = (len(self.data),)
+            else:
+                start, length, _ = params
+                self.cursor.fetchone.return_value = (
+                    memoryview(self.data[start - 1 : start - 1 + length]),
+                )
+
+        self.cursor.execute.side_effect = execute
+
+        with self.backend.open_blob("abc") as blob:
+            self.assertEqual(blob.read(), self.data)
+        # one length query, then 64 KB chunks
+        self.assertEqual(self.cursor.execute.call_count, 1 + 4)
+
+    def test_open_missing_blob(self):
+        self.cursor.fetchone.return_value = None
+        self.assertIsNone(self.backend.open_blob("abc"))
+
+    def test_put_blob_reports_duplicates(self):
+        self.cursor.rowcount = 0
+        self.assertFalse(self.backend.put_blob("abc", b"data"))
+        self.cursor.rowcount = 1
+        self.assertTrue(self.backend.put_blob("abc", b"data"))
@@ -49,7 +49,9 @@ class TestGoogleAuth(TestCase):
     def test_create_session(self):
         auth_url = "http://auth_url.com"
         self.google_auth.flow.authorization_url.return_value = (auth_url, STATE_ID)
-        self.mock_db_session.return_value.create_one.return_value = SESSION_ID
+        self.mock_db_session.return_value.table.return_value.create_one.return_value = (
+            SESSION_ID
+        )
 
         auth_url, cookie = self.google_auth.create_session()
 
@@ -57,22 +59,22 @@ class TestGoogleAuth(TestCase):
         self.assertEqual(cookie.session_id, UUID(SESSION_ID))
         self.assertEqual(cookie.identity_provider, IdentityProvider.GOOGLE)
         self.google_auth.flow.authorization_url.assert_called_once()
-        self.mock_db_session.return_value.create_one.assert_called_once()
+        self.mock_db_session.return_value.table.return_value.create_one.assert_called_once()
 
     def test_get_new_session(self):
-        self.mock_db_session.return_value.read_one.return_value = {
+        self.mock_db_session.return_value.table.return_value.read_one.return_value = {
             "state": STATE_ID,
             "_id": SESSION_ID,
         }
         result = self.google_auth.get_new_session(UUID(SESSION_ID))
         self.assertEqual(result.id, UUID(SESSION_ID))
         self.assertEqual(result.state, STATE_ID)
-        self.mock_db_session.return_value.read_one.assert_called_once_with(
+        self.mock_db_session.return_value.table.return_value.read_one.assert_called_once_with(
             SESSION_ID, partition_key=IdentityProvider.GOOGLE
         )
 
     def test_update_session(self):
-        self.mock_db_session.return_value.read_one.return_value = {
+        self.mock_db_session.return_value.table.return_value.read_one.return_value = {
             "user_id": USER_ID_1,
             "_id": "google_id",
             "provider": IdentityProvider.GOOGLE,
@@ -90,9 +92,9 @@ class TestGoogleAuth(TestCase):
 
         self.assertEqual(result.user_id, UUID(USER_ID_1))
         self.assertEqual(result.user_name, google_auth.name)
-        self.mock_db_session.return_value.read_one.assert_called_once_with(
+        self.mock_db_session.return_value.table.return_value.read_one.assert_called_once_with(
             google_auth.google_id, partition_key=IdentityProvider.GOOGLE
         )
-        self.mock_db_session.return_value.update_one.assert_called_once_with(
+        self.mock_db_session.return_value.table.return_value.update_one.assert_called_once_with(
             SESSION_ID, result.model_dump(mode="json")
         )
@@ -0,0 +1,107 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from src.adapters.db.cached import CacheConfig, CacheRegistry, CachedDBAdapter
+from src.schemas.common import EnvType, TableName
+
+MONOTONIC = "src.adapters.db.cached.time.monotonic"
+
+
+class TestCachedDBAdapter(TestCase):
+    def setUp(self):
+        self.adapter = MagicMock(env=EnvType.TEST)
+        self.inner = self.adapter.table.return_value
+        self.inner.read_one.side_effect = lambda _id, **kwargs: {"id": _id, "n": 1}
+        self.caches = CacheRegistry(
+            {TableName.SHOP: CacheConfig(ttl=10, max_size=2, negative_ttl=1)}
+        )
+        self.session = CachedDBAdapter(self.adapter, self.caches).use_db("db")
+        self.shops = self.session.table(TableName.SHOP)
+
+    def test_read_through(self):
+        first = self.shops.read_one("1", partition_key="md")
+        first["n"] = 2
+        second = self.shops.read_one("1", partition_key="md")
+
+        # the cached row isn't modified by the caller
+        self.assertEqual(second, {"id": "1", "n": 1})
+        self.shops.read_one("1", partition_key="ro")
+        self.shops.read_one("1", fields=["id"], partition_key="md")
+        self.assertEqual(self.inner.read_one.call_count, 3)
+        self.assertEqual(
+            self.caches.metrics()["test/db/shop"] | {"hit_rate": None},
+            {
+                "hits": 1,
+                "misses": 2,
+                "negative_hits": 0,
+                "evictions": 0,
+                "invalidations": 0,
+                "size": 1,
+                "max_size": 2,
+                "hit_rate": None,
+            },
+        )
+
+    def test_uncached_tables_are_not_wrapped(self):
+        self.assertIs(self.session.table(TableName.RECEIPT), self.inner)
+
+    def test_expiry_and_negative_ttl(self):
+        self.inner.read_one.side_effect = [None, {"id": "1"}, {"id": "1", "n": 2}]
+        with patch(MONOTONIC, return_value=100):
+            self.assertIsNone(self.shops.read_one("1"))
+            self.assertIsNone(self.shops.read_one("1"))
+        with patch(MONOTONIC, return_value=101.5):
+            self.assertEqual(self.shops.read_one("1"), {"id": "1"})
+            self.assertEqual(self.shops.read_one("1"), {"id": "1"})
+        with patch(MONOTONIC, return_value=112):
+            self.assertEqual(self.shops.read_one("1"), {"id": "1", "n": 2})
+        self.assertEqual(self.inner.read_one.call_count, 3)
+        self.assertEqual(self.caches.metrics()["test/db/shop"]["negative_hits"], 1)
+
+    def test_lru_eviction(self):
+        for _id in ["1", "2", "1", "3", "1", "2"]:
+            self.shops.read_one(_id)
+
+        self.assertEqual(
+            [call.args[0] for call in self.inner.read_one.call_args_list],
+            ["1", "2", "3", "2"],
+        )
+        self.assertEqual(self.caches.metrics()["test/db/shop"]["evictions"], 2)
+
+    def test_writes_invalidate(self):
+        writes = [
+            lambda: self.shops.create_or_update_one({"id": "1"}),
+            lambda: self.shops.update_one("1", {"n": 2}),
+            lambda: self.shops.delete_one("1", partition_key="md"),
+            lambda: self.shops.upsert_many([{"id": "2"}, {"id": "1"}]),
+        ]
+        for write in writes:
+            self.shops.read_one("1")
+            write()
+        self.shops.read_one("1")
+
+        self.assertEqual(self.inner.read_one.call_count, 5)
+
+    def test_read_started_before_a_write_is_not_stored(self):
+        def read_one(_id, **_kwargs):
+            # another thread writes the row while it is read
+            self.session.table(TableName.SHOP).update_one(_id, {"n": 2})
+            return {"id": _id, "n": 1}
+
+        self.inner.read_one.side_effect = read_one
+        self.shops.read_one("1")
+        self.inner.read_one.side_effect = None
+        self.inner.read_one.return_value = {"id": "1", "n": 2}
+
+        self.assertEqual(self.shops.read_one("1"), {"id": "1", "n": 2})
+
+    def test_read_by_ids_reads_missing_ids_only(self):
+        self.shops.read_one("1")
+        self.inner.read_by_ids.return_value = {"2": {"id": "2"}, "3": None}
+
+        rows = self.shops.read_by_ids(["1", "2", "3"])
+
+        self.assertEqual(rows, {"1": {"id": "1", "n": 1}, "2": {"id": "2"}, "3": None})
+        self.inner.read_by_ids.assert_called_once_with(["2", "3"])
+        self.assertIsNone(self.shops.read_one("3"))
+        self.assertEqual(self.inner.read_one.call_count, 1)
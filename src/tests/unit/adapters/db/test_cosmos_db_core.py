@@ -0,0 +1,113 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from azure.cosmos import exceptions
+
+from src.adapters.db.base import WriteError
+from src.adapters.db.cosmos_db_core import CosmosDBTable, format_where
+from src.adapters.db.instrumentation import note_request_charge
+from src.schemas.common import Operator, TableName
+
+
+class TestCosmosDBTable(TestCase):
+    def test_iter_many_follows_pages(self):
+        container = MagicMock()
+        container.query_items.return_value.by_page.return_value = iter(
+            [iter([{"id": "1"}, {"id": "2"}]), iter([{"id": "3"}])]
+        )
+        table = CosmosDBTable(container, TableName.RECEIPT)
+
+        rows = table.iter_many({"company_id": "c"}, batch_size=2)
+
+        self.assertEqual([row["id"] for row in rows], ["1", "2", "3"])
+        container.query_items.assert_called_once_with(
+            "SELECT * FROM r WHERE r.company_id=@company_id",
+            parameters=[{"name": "@company_id", "value": "c"}],
+            partition_key=None,
+            enable_cross_partition_query=True,
+            max_item_count=2,
+            response_hook=note_request_charge,
+        )
+
+    def test_read_by_ids(self):
+        container = MagicMock()
+        container.query_items.return_value = iter([{"id": "2", "total_amount": 5}])
+        table = CosmosDBTable(container, TableName.RECEIPT)
+
+        rows = table.read_by_ids(["1", "2"], partition_key="user")
+
+        self.assertEqual(rows, {"1": None, "2": {"id": "2", "total_amount": 5}})
+        container.query_items.assert_called_once_with(
+            "SELECT * FROM r WHERE ARRAY_CONTAINS(@ids, r.id)",
+            parameters=[{"name": "@ids", "value": ["1", "2"]}],
+            partition_key="user",
+            enable_cross_partition_query=False,
+            response_hook=note_request_charge,
+        )
+
+    def test_format_where(self):
+        where_str, params = format_where(
+            {
+                "company_id": (Operator.IN, ("a", "b")),
+                "total_amount": [(Operator.GT, 10), (Operator.LTE, 20)],
+                "status": (Operator.NE, "paid"),
+            }
+        )
+
+        self.assertEqual(
+            where_str,
+            "ARRAY_CONTAINS(@company_id, r.company_id) AND r.total_amount>@total_amount "
+            "AND r.total_amount<=@total_amount_1 AND r.status!=@status",
+        )
+        self.assertEqual(
+            [param["value"] for param in params], [["a", "b"], 10, 20, "paid"]
+        )
+
+
+class TestCosmosDBBulkWrites(TestCase):
+    def setUp(self):
+        self.container = MagicMock()
+        self.container.read.return_value = {"partitionKey": {"paths": ["/shop_id"]}}
+        self.table = CosmosDBTable(self.container, TableName.SHOP_ITEM)
+        self.rows = [
+            {"id": "1", "shop_id": "a"},
+            {"id": "2", "shop_id": "b"},
+            {"id": "3", "shop_id": "a"},
+        ]
+
+    def test_one_batch_per_partition_key(self):
+        results = self.table.upsert_many(self.rows)
+
+        self.assertEqual(results, ["1", "2", "3"])
+        batches = [call.args for call in self.container.execute_item_batch.call_args_list]
+        self.assertEqual(
+            batches,
+            [
+                ([("upsert", (self.rows[0],)), ("upsert", (self.rows[2],))], "a"),
+                ([("upsert", (self.rows[1],))], "b"),
+            ],
+        )
+        self.container.read.assert_called_once()
+
+    def test_failed_batch_is_retried_row_by_row(self):
+        self.container.execute_item_batch.side_effect = (
+            exceptions.CosmosBatchOperationError(
+                error_index=1, headers={}, status_code=400, message="bad request"
+            )
+        )
+
+        def upsert_item(item, **_kwargs):
+            if item["id"] == "2":
+                raise exceptions.CosmosHttpResponseError(
+                    status_code=400, message="bad request"
+                )
+            return item
+
+        self.container.upsert_item.side_effect = upsert_item
+
+        results = self.table.upsert_many(self.rows)
+
+        self.assertEqual(results[0], "1")
+        self.assertIsInstance(results[1], WriteError)
+        self.assertEqual(results[1].id, "2")
+        self.assertEqual(results[2], "3")
@@ -0,0 +1,142 @@
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import MagicMock, patch
+
+from src.adapters.db.cosmos_db_core import CosmosDBTable
+from src.adapters.db.instrumentation import (
+    QuerySink,
+    add_query_sink,
+    instrumented,
+    note_query,
+    recorder,
+    remove_query_sink,
+    request_summary,
+    summarize,
+)
+from src.schemas.common import TableName
+
+
+class ListSink(QuerySink):
+    def __init__(self):
+        self.events = []
+
+    def record(self, event):
+        self.events.append(event)
+
+
+class FakeTable:
+    backend = "postgres"
+    name = TableName.SHOP
+
+    @instrumented("read_many")
+    def read_many(self, rows):
+        note_query("SELECT * FROM shop WHERE company_id = %s")
+        return rows
+
+    @instrumented("create_many")
+    def create_many(self, rows):
+        return [self.create_one(row) for row in rows]
+
+    @instrumented("create_one")
+    def create_one(self, row):
+        note_query("INSERT INTO shop")
+        if not row:
+            raise ValueError("empty row")
+        return row["id"]
+
+    @instrumented("iter_many")
+    def iter_many(self, rows):
+        note_query("DECLARE")
+        yield from rows
+
+    @instrumented("read_one")
+    async def read_one(self, _id):
+        return {"id": _id}
+
+
+class TestInstrumentation(TestCase):
+    def setUp(self):
+        self.sink = ListSink()
+        add_query_sink(self.sink)
+        self.addCleanup(remove_query_sink, self.sink)
+        self.table = FakeTable()
+
+    def only_event(self):
+        self.assertEqual(len(self.sink.events), 1)
+        return self.sink.events[0]
+
+    def test_call_is_recorded(self):
+        self.table.read_many([{"id": "1"}, {"id": "2"}])
+
+        event = self.only_event()
+        self.assertEqual(
+            (event.backend, event.table, event.operation, event.rows),
+            ("postgres", "shop", "read_many", 2),
+        )
+        self.assertEqual(event.queries, ("SELECT * FROM shop WHERE company_id = %s",))
+        self.assertIsNone(event.error)
+
+    def test_nested_calls_are_part_of_the_outer_call(self):
+        self.table.create_many([{"id": "1"}, {"id": "2"}])
+
+        event = self.only_event()
+        self.assertEqual(event.operation, "create_many")
+        self.assertEqual(event.queries, ("INSERT INTO shop", "INSERT INTO shop"))
+
+    def test_failed_call(self):
+        with self.assertRaises(ValueError):
+            self.table.create_one({})
+
+        self.assertEqual(self.sink.events[0].error, "ValueError")
+
+    def test_generator_is_recorded_when_exhausted(self):
+        rows = self.table.iter_many([{"id": "1"}, {"id": "2"}])
+        self.assertEqual(next(rows), {"id": "1"})
+        # the consumer isn't part of the call
+        note_query("SELECT 1")
+        list(rows)
+
+        event = self.only_event()
+        self.assertEqual((event.rows, event.queries), (2, ("DECLARE",)))
+
+    @patch.object(recorder, "slow_query_ms", 0)
+    def test_slow_call_is_logged_with_its_queries(self):
+        with self.assertLogs("src.adapters.db.instrumentation", "WARNING") as logs:
+            self.table.read_many([])
+
+        self.assertIn("slow db call shop.read_many on postgres", logs.output[0])
+        self.assertIn("SELECT * FROM shop WHERE company_id = %s", logs.output[0])
+
+    def test_request_summary(self):
+        container = MagicMock()
+
+        def read_item(_id, _partition_key, response_hook):
+            response_hook({"x-ms-request-charge": "1.5"}, None)
+            return {"id": _id}
+
+        container.read_item.side_effect = read_item
+        with request_summary() as events:
+            self.table.read_many([{"id": "1"}])
+            CosmosDBTable(container, TableName.USER).read_one("u", partition_key="u")
+        self.table.read_many([])
+
+        summary = summarize(events)
+        self.assertEqual(
+            (summary["calls"], summary["rows"], summary["request_charge"]), (2, 2, 1.5)
+        )
+        self.assertEqual(
+            [(call["backend"], call["table"]) for call in summary["details"]],
+            [("postgres", "shop"), ("cosmos", "user")],
+        )
+
+
+class TestAsyncInstrumentation(IsolatedAsyncioTestCase):
+    async def test_coroutine_is_recorded(self):
+        sink = ListSink()
+        add_query_sink(sink)
+        self.addCleanup(remove_query_sink, sink)
+
+        with request_summary() as events:
+            await FakeTable().read_one("1")
+
+        self.assertEqual(sink.events, events)
+        self.assertEqual((events[0].operation, events[0].rows), ("read_one", 1))
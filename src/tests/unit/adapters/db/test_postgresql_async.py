@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock
+
+from psycopg import IntegrityError
+
+from src.adapters.db.base import WriteError
+from src.adapters.db.postgresql_async import AsyncPostgreSQLCoreAdapter
+from src.schemas.common import EnvType, Operator, TableName
+
+
+def describe(*names):
+    return [SimpleNamespace(name=name) for name in names]
+
+
+class TestAsyncPostgreSQLTable(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.pool = MagicMock()
+        self.connection = AsyncMock()
+        self.connection.cursor = MagicMock()
+        self.cursor = AsyncMock()
+        self.cursor.description = None
+        self.pool.connection.return_value.__aenter__.return_value = self.connection
+        self.connection.cursor.return_value.__aenter__.return_value = self.cursor
+        self.adapter = AsyncPostgreSQLCoreAdapter(EnvType.TEST, MagicMock(), self.pool)
+
+    async def test_read_one(self):
+        self.cursor.description = describe("id", "company_id", "data", "created_at")
+        self.cursor.fetchall.return_value = [("1", "c", {"a": 1}, "2024-01-01")]
+
+        row = await self.adapter.table(TableName.RECEIPT).read_one("1")
+
+        self.assertEqual(row, {"id": "1", "company_id": "c", "a": 1})
+        self.cursor.execute.assert_awaited_once_with(
+            "SELECT * FROM receipt WHERE id = %s", ("1",)
+        )
+
+    async def test_read_many_where(self):
+        self.cursor.description = describe("id")
+        self.cursor.fetchall.return_value = [("1",)]
+
+        rows = await self.adapter.table(TableName.RECEIPT).read_many(
+            {"company_id": (Operator.IN, ["a", "b"]), "shop_address": "Main st. 1"},
+            limit=5,
+            fields=["id"],
+        )
+
+        self.assertEqual(rows, [{"id": "1"}])
+        query, params = self.cursor.execute.call_args.args
+        self.assertEqual(
+            query,
+            "SELECT id FROM receipt WHERE company_id = ANY(%s) "
+            "AND data @> %s::jsonb LIMIT %s",
+        )
+        self.assertEqual(params[0], ["a", "b"])
+        self.assertEqual(params[1].obj, {"shop_address": "Main st. 1"})
+        self.assertEqual(params[2], 5)
+
+    async def test_update_one(self):
+        self.cursor.rowcount = 1
+
+        updated = await self.adapter.table(TableName.SHOP_ITEM).update_one(
+            "1", {"id": "1", "status": "done"}
+        )
+
+        self.assertTrue(updated)
+        self.cursor.execute.assert_awaited_once_with(
+            "UPDATE shop_item SET status = %s WHERE id = %s", ["done", "1"]
+        )
+
+    async def test_upsert_many_retries_failed_group(self):
+        async def execute(_query, values):
+            if values[0] == "2":
+                raise IntegrityError("violates foreign key constraint")
+
+        self.cursor.executemany.side_effect = IntegrityError("batch failed")
+        self.connection.execute.side_effect = execute
+        rows = [{"id": str(i), "shop_id": "s", "name": f"item {i}"} for i in range(3)]
+
+        results = await self.adapter.table(TableName.SHOP_ITEM).upsert_many(
+            rows + [{"name": "no id"}]
+        )
+
+        self.assertEqual(results[:2], ["0", "1"])
+        self.assertEqual(results[2].id, "2")
+        self.assertIsInstance(results[3], WriteError)
+        self.assertEqual(len(self.cursor.executemany.call_args.args[1]), 3)
@@ -0,0 +1,287 @@
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+from uuid import UUID
+
+from psycopg2 import IntegrityError
+
+from src.adapters.db.base import WriteError
+from src.adapters.db.postgresql_core import PostgreSQLCoreAdapter, PostgreSQLTable
+from src.schemas.common import CurrencyCode, EnvType, Operator, TableName
+
+
+def describe(*names):
+    return [SimpleNamespace(name=name) for name in names]
+
+
+class TestPostgreSQLTable(TestCase):
+    def setUp(self):
+        self.pool = MagicMock()
+        self.cursor = self.pool.cursor.return_value.__enter__.return_value
+        self.adapter = PostgreSQLCoreAdapter(EnvType.TEST, MagicMock(), pool=self.pool)
+
+    def test_table_is_bound_to_its_name(self):
+        receipts = self.adapter.table(TableName.RECEIPT)
+
+        self.assertIsInstance(receipts, PostgreSQLTable)
+        receipts.read_one("1")
+        # selecting another table on the adapter doesn't affect existing tables
+        self.adapter.use_table(TableName.SHOP)
+        receipts.read_one("2")
+
+        queries = [call.args[0] for call in self.cursor.execute.call_args_list]
+        self.assertEqual(
+            queries,
+            [
+                f"SELECT * FROM {TableName.RECEIPT} WHERE id = %s",
+                f"SELECT * FROM {TableName.RECEIPT} WHERE id = %s",
+            ],
+        )
+
+    def test_iter_many_uses_server_side_cursor(self):
+        connection = self.pool.transaction.return_value.__enter__.return_value
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.description = describe("id", "company_id", "data", "created_at")
+        cursor.__iter__.return_value = iter(
+            [("1", "c", {"a": 1}, "2024-01-01"), ("2", "c", {}, "2024-01-01")]
+        )
+
+        rows = self.adapter.table(TableName.RECEIPT).iter_many(
+            {"company_id": "c"}, batch_size=50
+        )
+
+        self.pool.transaction.assert_not_called()
+        self.assertEqual(
+            list(rows),
+            [{"id": "1", "company_id": "c", "a": 1}, {"id": "2", "company_id": "c"}],
+        )
+        self.assertEqual(connection.cursor.call_args.kwargs["name"], "iter_receipt")
+        self.assertEqual(cursor.itersize, 50)
+        cursor.execute.assert_called_once_with(
+            "SELECT * FROM receipt WHERE company_id = %s", ("c",)
+        )
+
+    def test_read_many_fields(self):
+        self.cursor.description = describe("id", "shop_address", "company_id")
+        self.cursor.fetchall.return_value = [("1", "Main st. 1", "c")]
+
+        rows = self.adapter.table(TableName.RECEIPT).read_many(
+            {"company_id": "c"}, fields=["id", "shop_address", "company_id"]
+        )
+
+        self.assertEqual(
+            rows, [{"id": "1", "shop_address": "Main st. 1", "company_id": "c"}]
+        )
+        self.cursor.execute.assert_called_once_with(
+            "SELECT id, data->'shop_address' AS \"shop_address\", company_id "
+            "FROM receipt WHERE company_id = %s",
+            ("c",),
+        )
+
+    def test_where(self):
+        self.adapter.table(TableName.RECEIPT).read_many(
+            {
+                "company_id": (Operator.IN, ["a", "b"]),
+                "date": [(Operator.GTE, "2024-01-01"), (Operator.LT, "2024-02-01")],
+                "shop_address": "Main st. 1",
+                "cash_register": "J403001576",
+                "status": (Operator.NE, "paid"),
+                "tag": (Operator.IN, ["x", "y"]),
+            }
+        )
+
+        query, params = self.cursor.execute.call_args.args
+        self.assertEqual(
+            query,
+            "SELECT * FROM receipt WHERE company_id IN %s AND date >= %s AND date < %s "
+            "AND data->%s <> %s::jsonb "
+            "AND (data @> %s::jsonb OR data @> %s::jsonb) "
+            "AND data @> %s::jsonb",
+        )
+        self.assertEqual(params[:4], (("a", "b"), "2024-01-01", "2024-02-01", "status"))
+        self.assertEqual(
+            [param.adapted for param in params[4:]],
+            [
+                "paid",
+                {"tag": "x"},
+                {"tag": "y"},
+                {"shop_address": "Main st. 1", "cash_register": "J403001576"},
+            ],
+        )
+
+    def test_where_values_are_compared_as_stored(self):
+        shop_id = UUID("0e3b7b0e-6a55-4c8c-9a57-2c4a2f1fd8a1")
+        # none of these keys are columns of shop, they are read from data
+        self.adapter.table(TableName.SHOP).read_many(
+            {
+                "opened_at": (Operator.GT, datetime(2024, 1, 1)),
+                "currency_code": (Operator.IN, [CurrencyCode.MOLDOVAN_LEU]),
+                "parent_id": shop_id,
+            }
+        )
+
+        _, params = self.cursor.execute.call_args.args
+        # rows hold the model_dump(mode="json") of the models
+        self.assertEqual(
+            [params[0]] + [param.adapted for param in params[1:]],
+            [
+                "opened_at",
+                "2024-01-01T00:00:00",
+                {"currency_code": "mdl"},
+                {"parent_id": str(shop_id)},
+            ],
+        )
+
+    def test_read_page_within_box(self):
+        shops = self.adapter.table(TableName.SHOP)
+        self.cursor.fetchone.return_value = (12,)
+
+        shops.read_many(
+            {
+                "location": (Operator.WITHIN, (28.7, 46.9, 28.9, 47.1)),
+                "id": (Operator.GT, "a"),
+            },
+            limit=51,
+            order_by="id",
+            offset=5,
+        )
+        total = shops.count({"location": (Operator.WITHIN, (28.7, 46.9, 28.9, 47.1))})
+
+        self.assertEqual(total, 12)
+        page, count = [call.args for call in self.cursor.execute.call_args_list]
+        self.assertEqual(
+            page,
+            (
+                "SELECT * FROM shop WHERE location <@ box(point(%s, %s), point(%s, %s)) "
+                "AND id > %s ORDER BY id LIMIT %s OFFSET %s",
+                (28.7, 46.9, 28.9, 47.1, "a", 51, 5),
+            ),
+        )
+        self.assertEqual(
+            count[0],
+            "SELECT count(*) FROM shop "
+            "WHERE location <@ box(point(%s, %s), point(%s, %s))",
+        )
+        with self.assertRaises(ValueError):
+            shops.read_many(order_by="id; DROP TABLE shop")
+
+    def test_nearest_uses_the_location_index(self):
+        shops = self.adapter.table(TableName.SHOP)
+        self.cursor.description = describe("id", "data", "location", "distance")
+        self.cursor.fetchall.return_value = [
+            ("1", {"address": "a"}, "(28.8,47.0)", 120.0),
+            ("2", {}, "(28.9,47.0)", 6000.0),
+        ]
+
+        rows = shops.nearest(47.0, 28.8, k=2, radius=5000)
+
+        self.assertEqual(rows, [{"id": "1", "address": "a", "distance": 120.0}])
+        query, params = self.cursor.execute.call_args.args
+        self.assertIn("ORDER BY location <-> point(%s, %s)", query)
+        self.assertIn("location <@ circle(", query)
+        self.assertEqual(params[:2], (28.8, 47.0))
+        self.assertEqual(params[-1], 2)
+        with self.assertRaises(ValueError):
+            self.adapter.table(TableName.RECEIPT).nearest(47.0, 28.8)
+
+    @patch("src.adapters.db.postgresql_core.READ_BY_IDS_CHUNK", 2)
+    def test_read_by_ids(self):
+        self.cursor.description = describe("id", "company_id")
+        self.cursor.fetchall.side_effect = [[("3", "c"), ("1", "c")], []]
+
+        rows = self.adapter.table(TableName.RECEIPT).read_by_ids(
+            ["1", "3", "1", "4"], fields=["company_id"]
+        )
+
+        self.assertEqual(
+            rows,
+            {
+                "1": {"id": "1", "company_id": "c"},
+                "3": {"id": "3", "company_id": "c"},
+                "4": None,
+            },
+        )
+        self.assertEqual(
+            self.cursor.execute.call_args_list[0].args,
+            ("SELECT id, company_id FROM receipt WHERE id IN %s", (("1", "3"),)),
+        )
+        self.assertEqual(self.cursor.execute.call_args_list[1].args[1], (("4",),))
+
+    def test_unknown_field(self):
+        with self.assertRaises(ValueError):
+            self.adapter.table(TableName.SHOP_ITEM).read_one("1", fields=["price"])
+        with self.assertRaises(ValueError):
+            self.adapter.table(TableName.RECEIPT).read_one("1", fields=["a'b"])
+        self.cursor.execute.assert_not_called()
+
+    def test_use_table_delegates_to_table(self):
+        with self.assertRaises(ValueError):
+            self.adapter.read_one("1")
+
+        self.adapter.use_table(TableName.SHOP).read_one("1")
+
+        self.cursor.execute.assert_called_once_with(
+            f"SELECT * FROM {TableName.SHOP} WHERE id = %s", ("1",)
+        )
+
+
+@patch("src.adapters.db.postgresql_core.execute_values")
+class TestPostgreSQLBulkWrites(TestCase):
+    def setUp(self):
+        self.pool = MagicMock()
+        self.table = PostgreSQLTable(self.pool, TableName.SHOP_ITEM)
+        self.rows = [
+            {"id": str(i), "shop_id": "shop", "name": f"item {i}", "status": "pending"}
+            for i in range(5)
+        ]
+
+    @patch("src.adapters.db.postgresql_core.PAGE_SIZE", 2)
+    def test_upsert_many_in_pages(self, mock_execute_values):
+        results = self.table.upsert_many(self.rows + [{"name": "no id"}])
+
+        self.assertEqual(results[:5], ["0", "1", "2", "3", "4"])
+        self.assertIsInstance(results[5], WriteError)
+        pages = [call.args[2] for call in mock_execute_values.call_args_list]
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        query = mock_execute_values.call_args.args[1]
+        self.assertIn(
+            "ON CONFLICT (id) DO UPDATE SET shop_id = EXCLUDED.shop_id, "
+            "name = EXCLUDED.name, status = EXCLUDED.status",
+            query,
+        )
+
+    def test_failed_page_is_retried_row_by_row(self, mock_execute_values):
+        def execute(_cursor, _query, values, **_kwargs):
+            if any(value[0] == "3" for value in values):
+                raise IntegrityError("violates foreign key constraint")
+
+        mock_execute_values.side_effect = execute
+
+        results = self.table.create_many(self.rows)
+
+        self.assertEqual(results[:3] + results[4:], ["0", "1", "2", "4"])
+        self.assertEqual(results[3].id, "3")
+        self.assertEqual(results[3].msg, "violates foreign key constraint")
+        # the page, then each of its rows
+        self.assertEqual(mock_execute_values.call_count, 6)
+
+    @patch("src.adapters.db.postgresql_core.COPY_THRESHOLD", 5)
+    def test_create_many_copies_large_inserts(self, mock_execute_values):
+        connection = self.pool.transaction.return_value.__enter__.return_value
+        cursor = connection.cursor.return_value.__enter__.return_value
+        rows = self.rows + [{"shop_id": "shop", "name": "new\titem", "status": None}]
+        # the row without an id has other columns and isn't large enough for COPY
+        del rows[5]["status"]
+
+        results = self.table.create_many(rows)
+
+        self.assertEqual(results[:5], ["0", "1", "2", "3", "4"])
+        self.assertEqual(results[5], rows[5]["id"])
+        copy_sql, buffer = cursor.copy_expert.call_args.args
+        self.assertEqual(
+            copy_sql, "COPY bulk_insert_stage (id, shop_id, name, status) FROM STDIN"
+        )
+        self.assertEqual(buffer.getvalue().splitlines()[0], "0\tshop\titem 0\tpending")
+        mock_execute_values.assert_called_once()
+        self.assertEqual(mock_execute_values.call_args.args[2][0][2], "new\titem")
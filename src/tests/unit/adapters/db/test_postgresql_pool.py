@@ -0,0 +1,143 @@
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from psycopg2 import OperationalError, extensions
+
+from src.adapters.db.postgresql_pool import ConnectionPool, PoolTimeout
+
+
+def make_connection():
+    connection = MagicMock()
+    connection.closed = 0
+    connection.get_transaction_status.return_value = extensions.TRANSACTION_STATUS_IDLE
+    return connection
+
+
+class TestConnectionPool(TestCase):
+    def setUp(self):
+        self.connect = MagicMock(side_effect=make_connection)
+
+    def test_min_size_connections_are_opened(self):
+        pool = ConnectionPool(self.connect, min_size=2, max_size=4)
+
+        self.assertEqual(self.connect.call_count, 2)
+        self.assertEqual(pool.metrics()["idle"], 2)
+
+    def test_connection_is_reused(self):
+        pool = ConnectionPool(self.connect, min_size=0, max_size=4)
+
+        with pool.connection() as first:
+            self.assertTrue(first.autocommit)
+        with pool.connection() as second:
+            self.assertIs(first, second)
+
+        metrics = pool.metrics()
+        self.assertEqual(metrics["connects"], 1)
+        self.assertEqual(metrics["checkouts"], 2)
+        self.assertEqual(metrics["in_use"], 0)
+
+    def test_saturation_and_timeout(self):
+        pool = ConnectionPool(self.connect, min_size=0, max_size=1, timeout=0.05)
+
+        with pool.connection():
+            self.assertEqual(pool.metrics()["saturation"], 1.0)
+            with self.assertRaises(PoolTimeout):
+                with pool.connection():
+                    pass
+
+        self.assertEqual(pool.metrics()["timeouts"], 1)
+
+    def test_waiting_checkout_gets_returned_connection(self):
+        pool = ConnectionPool(self.connect, min_size=0, max_size=1, timeout=2)
+        borrowed = threading.Event()
+
+        def hold():
+            with pool.connection():
+                borrowed.set()
+                time.sleep(0.05)
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        borrowed.wait()
+        with pool.connection():
+            pass
+        thread.join()
+
+        metrics = pool.metrics()
+        self.assertEqual(metrics["connects"], 1)
+        self.assertEqual(metrics["waits"], 1)
+        self.assertGreater(metrics["wait_time_max"], 0)
+
+    def test_broken_connection_is_discarded(self):
+        pool = ConnectionPool(self.connect, min_size=0, max_size=2)
+
+        with pool.connection() as connection:
+            connection.closed = 1
+        with pool.connection() as other:
+            self.assertIsNot(connection, other)
+        self.assertEqual(pool.metrics()["discarded"], 1)
+
+    def test_open_transaction_is_discarded(self):
+        pool = ConnectionPool(self.connect, min_size=0, max_size=2)
+
+        with pool.connection() as connection:
+            connection.get_transaction_status.return_value = (
+                extensions.TRANSACTION_STATUS_INERROR
+            )
+        self.assertEqual(pool.metrics()["size"], 0)
+
+    def test_transaction(self):
+        pool = ConnectionPool(self.connect, min_size=0, max_size=2)
+
+        with pool.transaction() as connection:
+            self.assertFalse(connection.autocommit)
+        connection.__exit__.assert_called_once_with(None, None, None)
+        self.assertTrue(connection.autocommit)
+
+        with self.assertRaises(ValueError):
+            with pool.transaction() as connection:
+                raise ValueError
+        self.assertIs(connection.__exit__.call_args.args[0], ValueError)
+        self.assertTrue(connection.autocommit)
+
+    @patch("src.adapters.db.postgresql_pool.HEALTH_CHECK_IDLE", 0)
+    def test_health_check_on_checkout(self):
+        pool = ConnectionPool(self.connect, min_size=1, max_size=2)
+        with pool.connection() as first:
+            pass
+        first.cursor.return_value.__enter__.return_value.execute.side_effect = (
+            OperationalError("server closed the connection")
+        )
+
+        with pool.connection() as connection:
+            self.assertIsNot(connection, first)
+        self.assertEqual(pool.metrics()["discarded"], 1)
+
+    def test_max_lifetime(self):
+        pool = ConnectionPool(self.connect, min_size=0, max_size=2, max_lifetime=0)
+
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            self.assertIsNot(first, second)
+        self.assertEqual(pool.metrics()["connects"], 2)
+
+    def test_failed_connect_releases_slot(self):
+        pool = ConnectionPool(self.connect, min_size=0, max_size=1)
+        self.connect.side_effect = OperationalError("connection refused")
+
+        with self.assertRaises(OperationalError):
+            with pool.connection():
+                pass
+        self.assertEqual(pool.metrics()["size"], 0)
+
+    def test_close(self):
+        pool = ConnectionPool(self.connect, min_size=2, max_size=2)
+        pool.close()
+
+        self.assertEqual(pool.metrics()["size"], 0)
+        with self.assertRaises(PoolTimeout):
+            with pool.connection():
+                pass
@@ -0,0 +1,53 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from src.adapters.db.cosmos_db_core import CosmosDBTable
+from src.adapters.db.spatial import GridIndexRegistry
+from src.schemas.common import TableName
+
+SHOPS = [
+    {"id": "1", "osm_data": {"lat": "47.0", "lon": "28.80"}},
+    {"id": "2", "osm_data": {"lat": "47.0", "lon": "28.81"}},
+    {"id": "3", "osm_data": {"lat": "47.0", "lon": "28.90"}},
+    {"id": "4", "osm_data": {}},
+]
+
+
+class TestGridIndexRegistry(TestCase):
+    def setUp(self):
+        self.registry = GridIndexRegistry(ttl=60)
+        self.scan = MagicMock(return_value=SHOPS)
+
+    @patch("src.adapters.db.spatial.time.monotonic")
+    def test_grid_is_built_again_once_expired(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        grid = self.registry.get("shops", TableName.SHOP, self.scan)
+        self.assertIs(self.registry.get("shops", TableName.SHOP, self.scan), grid)
+        self.assertEqual(grid.size, 3)
+        self.scan.assert_called_once()
+
+        mock_monotonic.return_value = 161.0
+        self.assertIsNot(self.registry.get("shops", TableName.SHOP, self.scan), grid)
+        self.assertEqual(self.scan.call_count, 2)
+
+    def test_table_without_location(self):
+        with self.assertRaises(ValueError):
+            self.registry.get("receipts", TableName.RECEIPT, self.scan)
+
+
+class TestCosmosNearest(TestCase):
+    @patch("src.adapters.db.base.grid_indexes", GridIndexRegistry(ttl=60))
+    def test_nearest_from_the_grid(self):
+        container = MagicMock()
+        container.query_items.return_value.by_page.return_value = iter([iter(SHOPS)])
+        table = CosmosDBTable(container, TableName.SHOP)
+
+        rows = table.nearest(47.0, 28.80, k=5, radius=1000)
+        again = CosmosDBTable(container, TableName.SHOP).nearest(47.0, 28.81, k=1)
+
+        self.assertEqual([row["id"] for row in rows], ["1", "2"])
+        self.assertEqual(rows[0]["distance"], 0.0)
+        self.assertAlmostEqual(rows[1]["distance"], 758.5, delta=1)
+        self.assertEqual([row["id"] for row in again], ["2"])
+        # the grid of the container is scanned once
+        container.query_items.assert_called_once()
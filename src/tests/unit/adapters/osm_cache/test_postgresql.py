@@ -0,0 +1,28 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from src.adapters.osm_cache.postgresql import PostgreSQLOsmCacheBackend
+
+
+class TestPostgreSQLOsmCacheBackend(TestCase):
+    def setUp(self):
+        self.pool = MagicMock()
+        connection = self.pool.connection.return_value.__enter__.return_value
+        self.cursor = connection.cursor.return_value.__enter__.return_value
+        self.backend = PostgreSQLOsmCacheBackend(self.pool)
+
+    def test_put_upserts_the_lookup(self):
+        self.backend.put("N1", {"display_name": "Linella"}, 100.0)
+
+        query, (osm_id, data, fetched_at) = self.cursor.execute.call_args.args
+        self.assertIn("ON CONFLICT (id) DO UPDATE", query)
+        self.assertEqual(
+            (osm_id, data.adapted, fetched_at), ("N1", {"display_name": "Linella"}, 100.0)
+        )
+
+    def test_get(self):
+        self.cursor.fetchone.return_value = ({"display_name": "Linella"}, 100.0)
+        self.assertEqual(self.backend.get("N1"), ({"display_name": "Linella"}, 100.0))
+
+        self.cursor.fetchone.return_value = None
+        self.assertIsNone(self.backend.get("N2"))
@@ -0,0 +1,43 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from src.adapters.osm_cache.sqlite import SQLiteOsmCacheBackend
+
+
+class TestSQLiteOsmCacheBackend(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.backend = SQLiteOsmCacheBackend(os.path.join(self.tmp_dir, "osm.sqlite"))
+
+    def tearDown(self):
+        self.backend.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_put_and_get(self):
+        self.assertIsNone(self.backend.get("N1"))
+
+        self.backend.put("N1", {"display_name": "Linella"}, 100.0)
+        self.backend.put("W2", {}, 100.0)
+        self.backend.put("N1", {"display_name": "Linella 2"}, 200.0)
+
+        self.assertEqual(self.backend.get("N1"), ({"display_name": "Linella 2"}, 200.0))
+        self.assertEqual(self.backend.get("W2"), ({}, 100.0))
+
+    def test_get_many(self):
+        for i in range(600):
+            self.backend.put(f"N{i}", {"osm_id": i}, 100.0)
+
+        entries = self.backend.get_many([f"N{i}" for i in range(0, 1200, 2)])
+
+        self.assertEqual(len(entries), 300)
+        self.assertEqual(entries["N598"], ({"osm_id": 598}, 100.0))
+
+    def test_delete_older(self):
+        self.backend.put("N1", {}, 100.0)
+        self.backend.put("N2", {}, 200.0)
+
+        self.assertEqual(self.backend.delete_older(150.0), 1)
+        self.assertIsNone(self.backend.get("N1"))
+        self.assertIsNotNone(self.backend.get("N2"))
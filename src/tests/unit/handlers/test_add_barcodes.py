@@ -1,7 +1,8 @@
-from unittest import TestCase
-from unittest.mock import patch, MagicMock
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import MagicMock, patch
 
-from src.handlers.add_barcodes import add_barcodes_handler
+from src.adapters.db.base import WriteError
+from src.handlers.add_barcodes import add_barcodes_handler, async_add_barcodes_handler
 from src.schemas.common import ItemBarcodeStatus
 from src.tests import SHOP_ID_1, BARCODE_1, SHOP_ITEM_ID_1
 
@@ -26,11 +27,36 @@ class TestAddBarcodesHandler(TestCase):
         mock_session = MagicMock()
         mock_init_db_session.return_value = mock_session
 
-        status, body = add_barcodes_handler(SHOP_ID_1, self.items, self.logger)
+        items = self.items + [{**self.items[0], "item_id": SHOP_ITEM_ID_1}]
+        mock_session.table.return_value.upsert_many.side_effect = lambda rows: [
+            row["id"] for row in rows
+        ]
+
+        status, body = add_barcodes_handler(SHOP_ID_1, items, self.logger)
 
         self.assertEqual(status, 200)
         self.assertEqual(body, SUCCESS_RESPONSE_BODY)
-        mock_session.create_or_update_one.assert_called()
+        # a single bulk write, new items get an id
+        (rows,) = mock_session.table.return_value.upsert_many.call_args.args
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(rows[0]["id"])
+        self.assertEqual(rows[1]["id"], SHOP_ITEM_ID_1)
+        mock_session.table.return_value.create_or_update_one.assert_not_called()
+
+    @patch("src.handlers.add_barcodes.init_db_session")
+    def test_failed_writes_are_invalid_items(self, mock_init_db_session):
+        mock_session = MagicMock()
+        mock_init_db_session.return_value = mock_session
+        mock_session.table.return_value.upsert_many.side_effect = lambda rows: [
+            WriteError(rows[0]["id"], "conflict")
+        ]
+
+        status, body = add_barcodes_handler(SHOP_ID_1, self.items, self.logger)
+
+        self.assertEqual(status, 400)
+        self.assertEqual(
+            body["invalid_items"], [{"name": self.name, "error": "conflict"}]
+        )
 
     @patch("src.handlers.add_barcodes.init_db_session")
     def test_invalid_items(self, mock_init_db_session):
@@ -60,3 +86,24 @@ class TestAddBarcodesHandler(TestCase):
             ],
         )
         self.logger.error.assert_called()
+
+
+class TestAsyncAddBarcodesHandler(IsolatedAsyncioTestCase):
+    @patch("src.handlers.add_barcodes.init_db_session")
+    async def test_valid_items(self, mock_init_session):
+        shop_items = MagicMock()
+        mock_init_session.return_value = MagicMock()
+        mock_init_session.return_value.table.return_value = shop_items
+        items = [
+            {
+                "purchase_id": "Test Item_1",
+                "status": ItemBarcodeStatus.PENDING.value,
+                "barcode": BARCODE_1,
+            }
+        ]
+
+        status, body = await async_add_barcodes_handler(SHOP_ID_1, items, MagicMock())
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, SUCCESS_RESPONSE_BODY)
+        self.assertEqual(shop_items.upsert_many.call_args.args[0][0]["name"], "Test Item")
@@ -1,8 +1,8 @@
-from unittest import TestCase
-from unittest.mock import patch, MagicMock
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import MagicMock, patch
 from uuid import UUID
 
-from src.handlers.link_shop import link_shop_handler
+from src.handlers.link_shop import async_link_shop_handler, link_shop_handler
 from src.helpers.osm import OSM_HOST
 from src.schemas.common import OsmType, CountryCode
 from src.tests import USER_ID_1, SHOP_ID_1
@@ -23,7 +23,7 @@ class TestLinkShopHandler(TestCase):
     def test_receipt_not_found(self, mock_init_db_session):
         mock_session = MagicMock()
         mock_init_db_session.return_value = mock_session
-        mock_session.read_one.return_value = None
+        mock_session.table.return_value.read_one.return_value = None
 
         status, body = link_shop_handler(OSM_HOST, USER_ID_1, "receipt_id", self.logger)
 
@@ -34,7 +34,7 @@ class TestLinkShopHandler(TestCase):
     def test_invalid_osm_url(self, mock_init_db_session):
         mock_session = MagicMock()
         mock_init_db_session.return_value = mock_session
-        mock_session.read_many.return_value = []
+        mock_session.table.return_value.read_many.return_value = []
 
         status, body = link_shop_handler(OSM_HOST, USER_ID_1, "receipt_id", self.logger)
 
@@ -49,7 +49,7 @@ class TestLinkShopHandler(TestCase):
     ):
         mock_session = MagicMock()
         mock_init_db_session.return_value = mock_session
-        mock_session.read_many.return_value = []
+        mock_session.table.return_value.read_many.return_value = []
 
         mock_parse_osm_url.return_value = ("osm_type", "osm_key")
         mock_lookup_osm_data.return_value = None
@@ -66,8 +66,8 @@ class TestLinkShopHandler(TestCase):
         shop_data = {"_id": SHOP_ID_1}
         mock_session = MagicMock()
         mock_init_db_session.return_value = mock_session
-        mock_session.read_many.return_value = [shop_data]
-        mock_session.update_one.return_value = True
+        mock_session.table.return_value.read_many.return_value = [shop_data]
+        mock_session.table.return_value.update_one.return_value = True
 
         status, body = link_shop_handler(
             f"{OSM_HOST}/node/123", USER_ID_1, "receipt_id", self.logger
@@ -85,14 +85,14 @@ class TestLinkShopHandler(TestCase):
     ):
         mock_session = MagicMock()
         mock_init_db_session.return_value = mock_session
-        mock_session.read_one.return_value = {
+        mock_session.table.return_value.read_one.return_value = {
             "country_code": CountryCode.MOLDOVA,
             "company_id": "company_id",
             "shop_address": "shop_address",
         }
-        mock_session.read_many.return_value = []  # shop doesn't exist
-        mock_session.create_one.return_value = True
-        mock_session.update_one.return_value = True
+        mock_session.table.return_value.read_many.return_value = []  # shop doesn't exist
+        mock_session.table.return_value.create_one.return_value = True
+        mock_session.table.return_value.update_one.return_value = True
         mock_parse_osm_url.return_value = (OsmType.WAY, "123")
         mock_lookup_osm_data.return_value = {
             "lat": "10.2",
@@ -107,3 +107,63 @@ class TestLinkShopHandler(TestCase):
 
         self.assertEqual(status, 200)
         self.assertTrue(UUID(body["data"]["shop_id"]))  # assert it's a valid UUID
+
+
+@patch("src.handlers.link_shop.init_db_session")
+class TestAsyncLinkShopHandler(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.logger = MagicMock()
+        self.table = MagicMock()
+        self.receipt = {
+            "user_id": USER_ID_1,
+            "country_code": CountryCode.MOLDOVA,
+            "company_id": "company_id",
+            "shop_address": "shop_address",
+        }
+
+    def session(self, mock_init_session):
+        mock_init_session.return_value = MagicMock()
+        mock_init_session.return_value.table.return_value = self.table
+
+    async def test_receipt_not_found(self, mock_init_session):
+        self.session(mock_init_session)
+        self.table.read_one.return_value = None
+
+        status, body = await async_link_shop_handler(
+            OSM_HOST, USER_ID_1, "receipt_id", self.logger
+        )
+
+        self.assertEqual(status, 404)
+        self.assertEqual(body, {"msg": "Receipt not found"})
+        # the receipt is only looked up in the partition of the user
+        self.table.read_one.assert_called_once_with("receipt_id", partition_key=USER_ID_1)
+
+    @patch("src.handlers.link_shop.parse_osm_url")
+    @patch("src.handlers.link_shop.lookup_osm_data")
+    async def test_new_shop_successfully_linked(
+        self, mock_lookup_osm_data, mock_parse_osm_url, mock_init_session
+    ):
+        self.session(mock_init_session)
+        self.table.read_one.return_value = self.receipt
+        self.table.read_many.return_value = []
+        mock_parse_osm_url.return_value = (OsmType.WAY, "123")
+        mock_lookup_osm_data.return_value = {
+            "lat": "10.2",
+            "lon": "20.1",
+            "display_name": "display_name",
+            "address": {"city": "city", "country": "country"},
+        }
+
+        status, body = await async_link_shop_handler(
+            f"{OSM_HOST}/node/123", USER_ID_1, "receipt_id", self.logger
+        )
+
+        self.assertEqual(status, 200)
+        shop_id = body["data"]["shop_id"]
+        self.assertEqual(
+            self.table.read_many.call_args.kwargs["partition_key"], CountryCode.MOLDOVA
+        )
+        self.assertEqual(self.table.create_one.call_args.args[0]["id"], shop_id)
+        self.table.update_one.assert_called_once_with(
+            "receipt_id", {**self.receipt, "shop_id": shop_id}
+        )
@@ -10,14 +10,17 @@ class TestParseFromUrlHandler(TestCase):
         self.url = "http://valid.url"
         self.user_id = USER_ID_1
         self.logger = MagicMock()
+        self.db_api = MagicMock()
 
     def test_no_url(self):
-        status, body = parse_from_url_handler("", self.user_id, self.logger)
+        status, body = parse_from_url_handler("", self.user_id, self.logger, self.db_api)
         self.assertEqual(status, 400)
         self.assertEqual(body, {"msg": "URL is required"})
 
     def test_invalid_user_id(self):
-        status, body = parse_from_url_handler(self.url, "invalid_user_id", self.logger)
+        status, body = parse_from_url_handler(
+            self.url, "invalid_user_id", self.logger, self.db_api
+        )
         self.assertEqual(status, 400)
         self.assertEqual(body, {"msg": "Invalid user ID"})
 
@@ -25,7 +28,9 @@ class TestParseFromUrlHandler(TestCase):
     def test_unsupported_url(self, mock_parser):
         mock_parser_instance = mock_parser.return_value
         mock_parser_instance.validate_receipt_url.return_value = False
-        status, body = parse_from_url_handler(self.url, self.user_id, self.logger)
+        status, body = parse_from_url_handler(
+            self.url, self.user_id, self.logger, self.db_api
+        )
         self.assertEqual(status, 400)
         self.assertEqual(body, {"msg": "Unsupported URL"})
 
@@ -36,7 +41,9 @@ class TestParseFromUrlHandler(TestCase):
         mock_parser_instance.validate_receipt_url.return_value = True
         mock_parser_instance.get_receipt.return_value = None
         mock_get_html.return_value = None
-        status, body = parse_from_url_handler(self.url, self.user_id, self.logger)
+        status, body = parse_from_url_handler(
+            self.url, self.user_id, self.logger, self.db_api
+        )
         self.assertEqual(status, 400)
         self.assertEqual(body, {"msg": "Failed to fetch receipt"})
 
@@ -47,13 +54,10 @@ class TestParseFromUrlHandler(TestCase):
         mock_parser_instance.validate_receipt_url.return_value = True
         mock_parser_instance.get_receipt.return_value = None
         mock_get_html.return_value = "<html></html>"
-        mock_receipt = MagicMock()
-        mock_receipt.model_dump.return_value = {"id": "receipt_id"}
-        # pylint: disable=line-too-long
-        mock_parser_instance.parse_html.return_value.build_receipt.return_value.persist.return_value = (
-            mock_receipt
+        mock_parser_instance.to_json.return_value = {"id": "receipt_id"}
+        status, body = parse_from_url_handler(
+            self.url, self.user_id, self.logger, self.db_api
         )
-        status, body = parse_from_url_handler(self.url, self.user_id, self.logger)
         self.assertEqual(status, 200)
         self.assertEqual(
             body, {"msg": "Receipt successfully processed", "data": {"id": "receipt_id"}}
@@ -65,7 +69,9 @@ class TestParseFromUrlHandler(TestCase):
         mock_parser_instance.validate_receipt_url.return_value = True
         mock_parser_instance.get_receipt.side_effect = Exception("DB Error")
 
-        status, body = parse_from_url_handler(self.url, self.user_id, self.logger)
+        status, body = parse_from_url_handler(
+            self.url, self.user_id, self.logger, self.db_api
+        )
         self.assertEqual(status, 500)
         self.assertEqual(body, {"msg": "Error retrieving receipt"})
 
@@ -78,7 +84,9 @@ class TestParseFromUrlHandler(TestCase):
         mock_receipt.model_dump.return_value = {"_id": "receipt_id_direct"}
         mock_parser_instance.get_receipt.return_value = mock_receipt
 
-        status, body = parse_from_url_handler(self.url, self.user_id, self.logger)
+        status, body = parse_from_url_handler(
+            self.url, self.user_id, self.logger, self.db_api
+        )
         self.assertEqual(status, 200)
         self.assertEqual(
             body,
@@ -0,0 +1,112 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from src.handlers.shops import (
+    decode_cursor,
+    encode_cursor,
+    nearest_shops_handler,
+    shops_handler,
+)
+from src.schemas.common import Operator
+
+
+@patch("src.handlers.shops.init_postgres_session")
+class TestShopsHandler(TestCase):
+    def setUp(self):
+        self.logger = MagicMock()
+        self.shops = [{"id": str(i), "country_code": "md"} for i in range(1, 4)]
+
+    def table(self, mock_init_session):
+        table = mock_init_session.return_value.table.return_value
+        table.count.return_value = 7
+        return table
+
+    def test_bbox_and_page_are_queried(self, mock_init_session):
+        table = self.table(mock_init_session)
+        table.read_many.return_value = self.shops
+
+        status, body = shops_handler(
+            {"country_code": "md", "lat_min": "47.0", "limit": "2"}, self.logger
+        )
+
+        self.assertEqual(status, 200)
+        where = {
+            "country_code": "md",
+            "location": (Operator.WITHIN, (28.77, 47.0, 28.90, 47.07)),
+        }
+        table.read_many.assert_called_once_with(where, limit=3, order_by="id", offset=0)
+        table.count.assert_called_once_with(where)
+        self.assertEqual(body["items"], self.shops[:2])
+        self.assertEqual(body["total"], 7)
+        self.assertEqual(body["limit"], 2)
+        self.assertEqual(decode_cursor(body["next_cursor"]), "2")
+
+    def test_cursor_continues_after_its_shop(self, mock_init_session):
+        table = self.table(mock_init_session)
+        table.read_many.return_value = self.shops[2:]
+
+        status, body = shops_handler(
+            {"cursor": encode_cursor("2"), "offset": "10", "limit": "2"}, self.logger
+        )
+
+        self.assertEqual(status, 200)
+        table.read_many.assert_called_once_with(
+            {"id": (Operator.GT, "2")}, limit=3, order_by="id", offset=0
+        )
+        table.count.assert_called_once_with({})
+        self.assertEqual(body["items"], self.shops[2:])
+        self.assertIsNone(body["next_cursor"])
+
+    def test_limit_zero_returns_a_page(self, mock_init_session):
+        table = self.table(mock_init_session)
+        table.read_many.return_value = self.shops[:2]
+
+        status, body = shops_handler({"limit": "0"}, self.logger)
+
+        self.assertEqual(status, 200)
+        table.read_many.assert_called_once_with({}, limit=2, order_by="id", offset=0)
+        self.assertEqual(body["items"], self.shops[:1])
+        self.assertEqual(body["limit"], 1)
+        self.assertEqual(decode_cursor(body["next_cursor"]), "1")
+
+    def test_negative_offset_starts_at_the_first_shop(self, mock_init_session):
+        table = self.table(mock_init_session)
+        table.read_many.return_value = []
+
+        status, body = shops_handler({"offset": "-3"}, self.logger)
+
+        self.assertEqual(status, 200)
+        table.read_many.assert_called_once_with({}, limit=51, order_by="id", offset=0)
+        self.assertEqual(body["items"], [])
+        self.assertIsNone(body["next_cursor"])
+
+    def test_invalid_cursor(self, mock_init_session):
+        table = self.table(mock_init_session)
+
+        status, body = shops_handler({"cursor": "not a cursor"}, self.logger)
+
+        self.assertEqual(status, 400)
+        self.assertEqual(body, {"msg": "Invalid cursor"})
+        table.read_many.assert_not_called()
+
+
+@patch("src.handlers.shops.init_postgres_session")
+class TestNearestShopsHandler(TestCase):
+    def test_nearest_shops(self, mock_init_session):
+        table = mock_init_session.return_value.table.return_value
+        table.nearest.return_value = [{"id": "1", "distance": 120.04}]
+
+        status, body = nearest_shops_handler(
+            {"lat": "47.01", "lon": "28.86", "k": "500", "radius": "abc"}, MagicMock()
+        )
+
+        self.assertEqual(status, 200)
+        table.nearest.assert_called_once_with(47.01, 28.86, 50, 5000.0)
+        self.assertEqual(body["items"], [{"id": "1", "distance": 120.0}])
+        self.assertEqual(body["k"], 50)
+
+    def test_point_is_required(self, mock_init_session):
+        for query_params in [{"lat": "47.01"}, {"lat": "91", "lon": "28.86"}]:
+            status, _ = nearest_shops_handler(query_params, MagicMock())
+            self.assertEqual(status, 400)
+        mock_init_session.assert_not_called()
@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+from glob import glob
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import zstandard
+
+from src.adapters.archive.filesystem import FilesystemArchiveBackend
+from src.helpers.archive import PageArchive, archive_page, content_hash
+from src.tests import get_stub_file_path
+
+URL = "https://mev.sfs.md/receipt-verifier/J403001576/118.04/135932/2024-01-17"
+
+
+def load_stub_pages() -> list[bytes]:
+    pages = []
+    for path in sorted(
+        glob(get_stub_file_path(os.path.join("receipts", "sfs_md", "*.html")))
+    ):
+        with open(path, "rb") as file:
+            pages.append(file.read())
+    return pages
+
+
+class TestPageArchive(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pages = load_stub_pages()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.archive = PageArchive(FilesystemArchiveBackend(self.tmp_dir))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_put_and_get(self):
+        page = self.pages[0]
+        page_hash = self.archive.put(URL, page)
+
+        self.assertEqual(page_hash, content_hash(page))
+        self.assertEqual(self.archive.get(URL), page)
+        self.assertIsNone(self.archive.get(URL + "/other"))
+
+    def test_str_page(self):
+        self.archive.put(URL, "<html>receipt</html>")
+        self.assertEqual(self.archive.get(URL), b"<html>receipt</html>")
+
+    def test_same_content_is_stored_once(self):
+        self.archive.put(URL, self.pages[0])
+        self.archive.put(URL + "?lang=ru", self.pages[0])
+
+        blobs = glob(os.path.join(self.tmp_dir, "blobs", "*", "*.zst"))
+        self.assertEqual(len(blobs), 1)
+        self.assertEqual(self.archive.get(URL + "?lang=ru"), self.pages[0])
+
+    def test_url_points_to_latest_page(self):
+        self.archive.put(URL, self.pages[0])
+        self.archive.put(URL, self.pages[1])
+        self.assertEqual(self.archive.get(URL), self.pages[1])
+
+    def test_dictionary(self):
+        plain_size = len(zstandard.ZstdCompressor(level=9).compress(self.pages[0]))
+        dict_id = self.archive.train_dictionary(self.pages[1:] * 10, dict_size=16 * 1024)
+        page_hash = self.archive.put(URL, self.pages[0])
+
+        blob = self.archive.backend.open_blob(page_hash)
+        with blob:
+            data = blob.read()
+        self.assertEqual(zstandard.get_frame_parameters(data).dict_id, dict_id)
+        self.assertLess(len(data), plain_size * 0.75)
+
+        # a new instance finds the dictionary in the backend
+        archive = PageArchive(FilesystemArchiveBackend(self.tmp_dir))
+        self.assertEqual(archive.get(URL), self.pages[0])
+        archive.put(URL + "?lang=ru", self.pages[1])
+        with archive.backend.open_blob(content_hash(self.pages[1])) as blob:
+            self.assertEqual(zstandard.get_frame_parameters(blob.read()).dict_id, dict_id)
+
+    def test_dictionary_is_loaded_once(self):
+        dict_id = self.archive.train_dictionary(self.pages * 10, dict_size=16 * 1024)
+        archive = PageArchive(FilesystemArchiveBackend(self.tmp_dir))
+
+        with patch.object(
+            archive.backend, "get_dictionary", wraps=archive.backend.get_dictionary
+        ) as get_dictionary:
+            for page in self.pages:
+                archive.put(URL, page)
+
+        get_dictionary.assert_called_once_with(dict_id)
+        with archive.backend.open_blob(content_hash(self.pages[-1])) as blob:
+            self.assertEqual(zstandard.get_frame_parameters(blob.read()).dict_id, dict_id)
+
+    def test_pages_stay_readable_after_retraining(self):
+        self.archive.put(URL, self.pages[0])
+        self.archive.train_dictionary(self.pages * 10, dict_size=16 * 1024)
+        self.archive.put(URL + "?lang=ru", self.pages[1])
+
+        self.assertEqual(self.archive.get(URL), self.pages[0])
+        self.assertEqual(self.archive.get(URL + "?lang=ru"), self.pages[1])
+
+    def test_streaming_read(self):
+        self.archive.put(URL, self.pages[0])
+
+        with self.archive.open(URL) as stream:
+            chunks = iter(lambda: stream.read(4096), b"")
+            self.assertEqual(b"".join(chunks), self.pages[0])
+
+
+class TestArchivePage(TestCase):
+    def test_archive_errors_are_logged(self):
+        logger = MagicMock()
+        archive = MagicMock()
+        archive.put.side_effect = OSError("disk full")
+
+        with patch("src.helpers.archive.default_archive", return_value=archive):
+            archive_page(URL, b"<html></html>", logger)
+
+        logger.warning.assert_called_once()
+
+    def test_no_archive_configured(self):
+        with patch("src.helpers.archive.default_archive", return_value=None):
+            archive_page(URL, b"<html></html>", MagicMock())
@@ -0,0 +1,146 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from src.helpers.circuit_breaker import (
+    BreakerRegistry,
+    BreakerState,
+    CircuitBreaker,
+    DBBreakerBackend,
+    default_breaker_backend,
+)
+from src.schemas.common import EnvType
+
+NOW = 1_700_000_000.0
+
+
+@patch("src.helpers.circuit_breaker.time.time")
+class TestCircuitBreaker(TestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker(
+            "mev.sfs.md", window_size=4, min_calls=4, failure_rate=0.5, probe_interval=30
+        )
+
+    def test_opens_on_failure_rate(self, mock_time):
+        mock_time.return_value = NOW
+        for _ in range(2):
+            self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, BreakerState.CLOSED)
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, BreakerState.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_needs_min_calls(self, mock_time):
+        mock_time.return_value = NOW
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, BreakerState.CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_one_probe_per_interval(self, mock_time):
+        mock_time.return_value = NOW
+        for _ in range(4):
+            self.breaker.record_failure()
+
+        mock_time.return_value = NOW + 31
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, BreakerState.HALF_OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+        # the probe failed: open for another interval
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, BreakerState.OPEN)
+        mock_time.return_value = NOW + 45
+        self.assertFalse(self.breaker.allow_request())
+
+        mock_time.return_value = NOW + 62
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, BreakerState.CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_lost_probe_is_retried(self, mock_time):
+        mock_time.return_value = NOW
+        for _ in range(4):
+            self.breaker.record_failure()
+
+        mock_time.return_value = NOW + 31
+        self.assertTrue(self.breaker.allow_request())
+        mock_time.return_value = NOW + 62
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_metrics(self, mock_time):
+        mock_time.return_value = NOW
+        for _ in range(4):
+            self.breaker.record_failure()
+        mock_time.return_value = NOW + 31
+        self.breaker.allow_request()
+        self.breaker.record_success()
+
+        metrics = self.breaker.metrics()
+        self.assertEqual(metrics["state"], "closed")
+        self.assertEqual(
+            metrics["transitions"],
+            {"closed->open": 1, "open->half_open": 1, "half_open->closed": 1},
+        )
+
+    def test_shared_backend(self, mock_time):
+        mock_time.return_value = NOW
+        backend = MagicMock()
+        backend.load.return_value = (BreakerState.OPEN, NOW - 10)
+        breaker = CircuitBreaker("mev.sfs.md", probe_interval=30, backend=backend)
+
+        # another worker opened the breaker 10 s ago
+        self.assertFalse(breaker.allow_request())
+        self.assertEqual(breaker.state, BreakerState.OPEN)
+        self.assertEqual(breaker.opened_at, NOW - 10)
+        backend.save.assert_not_called()
+
+        mock_time.return_value = NOW + 21
+        breaker.sync_interval = 0
+        self.assertTrue(breaker.allow_request())
+        breaker.record_success()
+        backend.save.assert_called_with("mev.sfs.md", BreakerState.CLOSED, NOW - 10)
+
+    def test_backend_errors_are_ignored(self, mock_time):
+        mock_time.return_value = NOW
+        backend = MagicMock()
+        backend.load.side_effect = RuntimeError("db down")
+        backend.save.side_effect = RuntimeError("db down")
+        breaker = CircuitBreaker("mev.sfs.md", min_calls=1, backend=backend)
+
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, BreakerState.OPEN)
+
+
+class TestBreakerRegistry(TestCase):
+    def test_one_breaker_per_host(self):
+        registry = BreakerRegistry()
+        breaker = registry.get("mev.sfs.md")
+        self.assertIs(breaker, registry.get("mev.sfs.md"))
+        self.assertIsNot(breaker, registry.get("sift-mev.sfs.md"))
+
+        backend = MagicMock()
+        registry.set_backend(backend)
+        self.assertIs(breaker.backend, backend)
+        self.assertEqual(
+            [m["name"] for m in registry.metrics()], ["mev.sfs.md", "sift-mev.sfs.md"]
+        )
+
+    @patch.dict("os.environ", {}, clear=True)
+    def test_default_backend_not_configured(self):
+        self.assertIsNone(default_breaker_backend())
+
+    @patch.dict(
+        "os.environ",
+        {"CIRCUIT_BREAKER_POSTGRES_ENV": "test", "TEST_POSTGRES_DB": "receipts"},
+    )
+    @patch("src.adapters.db.postgresql_core.get_pool")
+    def test_default_backend_in_postgres(self, mock_get_pool):
+        backend = default_breaker_backend()
+
+        self.assertIsInstance(backend, DBBreakerBackend)
+        self.assertEqual(backend.db_session.current_db, "receipts")
+        mock_get_pool.assert_called_once_with(EnvType.TEST)
@@ -1,6 +1,22 @@
+import time
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
 
-from src.helpers.common import split_list, validate_barcode
+import requests
+
+from src.helpers.circuit_breaker import CircuitBreaker
+from src.helpers.common import get_direct_html, get_html, split_list, validate_barcode
+from src.helpers.fetcher import LatencyWindow
+
+URL = "https://mev.sfs.md/receipt-verifier/J403001576/118.04/135932/2024-01-17"
+
+
+def delayed(seconds: float, result):
+    def fetch(*_):
+        time.sleep(seconds)
+        return result
+
+    return fetch
 
 
 class TestCommon(TestCase):
@@ -29,3 +45,99 @@ class TestCommon(TestCase):
         self.assertFalse(validate_barcode(invalid_code_13))
         valid_code_with_spaces = "1234 5678 9012 8"
         self.assertFalse(validate_barcode(valid_code_with_spaces))
+
+
+@patch("src.helpers.common.get_breaker", lambda _: CircuitBreaker("mev.sfs.md"))
+@patch("src.helpers.common.DEFAULT_HEDGE_DELAY", 0.05)
+@patch("src.helpers.common.direct_latency", LatencyWindow())
+@patch("src.helpers.common.get_oxylabs_html")
+@patch("src.helpers.common.get_direct_html")
+class TestGetHtml(TestCase):
+    def setUp(self):
+        self.logger = MagicMock()
+
+    def test_direct(self, mock_direct, mock_oxylabs):
+        mock_direct.return_value = b"direct"
+
+        self.assertEqual(get_html(URL, self.logger), b"direct")
+        mock_oxylabs.assert_not_called()
+
+    def test_fallback_timeout_is_clipped_to_deadline(self, mock_direct, mock_oxylabs):
+        mock_direct.return_value = None
+        mock_oxylabs.return_value = "oxylabs"
+
+        page = get_html(URL, self.logger, deadline=time.monotonic() + 3)
+
+        self.assertEqual(page, "oxylabs")
+        self.assertLessEqual(mock_oxylabs.call_args.args[2], 3)
+
+    def test_deadline_exceeded(self, mock_direct, mock_oxylabs):
+        for hedged in (False, True):
+            with self.subTest(hedged=hedged):
+                page = get_html(URL, self.logger, time.monotonic() - 1, hedged)
+                self.assertIsNone(page)
+        mock_direct.assert_not_called()
+        mock_oxylabs.assert_not_called()
+
+    def test_hedged_direct_answers_first(self, mock_direct, mock_oxylabs):
+        mock_direct.return_value = b"direct"
+
+        self.assertEqual(get_html(URL, self.logger, hedged=True), b"direct")
+        mock_oxylabs.assert_not_called()
+
+    def test_hedged_oxylabs_answers_first(self, mock_direct, mock_oxylabs):
+        mock_direct.side_effect = delayed(1, b"direct")
+        mock_oxylabs.side_effect = delayed(0.05, "oxylabs")
+
+        start = time.monotonic()
+        page = get_html(URL, self.logger, hedged=True)
+
+        self.assertEqual(page, "oxylabs")
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_hedged_direct_failure_starts_oxylabs(self, mock_direct, mock_oxylabs):
+        mock_direct.return_value = None
+        mock_oxylabs.return_value = "oxylabs"
+
+        self.assertEqual(get_html(URL, self.logger, hedged=True), "oxylabs")
+
+    def test_hedged_deadline_while_waiting(self, mock_direct, mock_oxylabs):
+        mock_direct.side_effect = delayed(1, b"direct")
+        mock_oxylabs.side_effect = delayed(1, "oxylabs")
+
+        start = time.monotonic()
+        page = get_html(URL, self.logger, deadline=start + 0.2, hedged=True)
+
+        self.assertIsNone(page)
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_open_circuit_skips_direct(self, mock_direct, mock_oxylabs):
+        breaker = CircuitBreaker("mev.sfs.md", min_calls=1)
+        breaker.record_failure()
+        mock_oxylabs.return_value = "oxylabs"
+
+        with patch("src.helpers.common.get_breaker", lambda _: breaker):
+            for hedged in (False, True):
+                with self.subTest(hedged=hedged):
+                    self.assertEqual(get_html(URL, self.logger, hedged=hedged), "oxylabs")
+        mock_direct.assert_not_called()
+
+
+@patch("src.helpers.common.fetcher")
+class TestGetDirectHtml(TestCase):
+    def setUp(self):
+        self.logger = MagicMock()
+        self.breaker = MagicMock()
+
+    def test_outcomes_are_recorded(self, mock_fetcher):
+        with patch("src.helpers.common.get_breaker", return_value=self.breaker):
+            for status_code in (200, 404):
+                mock_fetcher.get.return_value = MagicMock(status_code=status_code)
+                get_direct_html(URL, self.logger)
+            self.assertEqual(self.breaker.record_success.call_count, 2)
+
+            mock_fetcher.get.return_value = MagicMock(status_code=503)
+            get_direct_html(URL, self.logger)
+            mock_fetcher.get.side_effect = requests.Timeout()
+            self.assertIsNone(get_direct_html(URL, self.logger))
+            self.assertEqual(self.breaker.record_failure.call_count, 2)
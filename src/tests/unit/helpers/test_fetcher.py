@@ -0,0 +1,78 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+
+from src.helpers.fetcher import HttpFetcher, LatencyWindow
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        body = self.headers.get("Accept-Encoding", "").encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpFetcher(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.fetcher = HttpFetcher()
+
+    def tearDown(self):
+        self.fetcher.reset()
+
+    def test_connection_is_reused(self):
+        for _ in range(3):
+            resp = self.fetcher.get(self.url, timeout=5)
+            self.assertEqual(resp.status_code, 200)
+
+        host = self.url.split("/")[2]
+        self.assertEqual(
+            self.fetcher.stats(), {host: {"requests": 3, "connections": 1, "reused": 2}}
+        )
+
+    def test_accept_encoding(self):
+        resp = self.fetcher.get(self.url, timeout=5)
+        self.assertIn("gzip", resp.text)
+
+    def test_one_session_per_host(self):
+        session = self.fetcher.session("https://mev.sfs.md/receipt-verifier/1")
+        self.assertIs(session, self.fetcher.session("https://mev.sfs.md/other"))
+        self.assertIsNot(session, self.fetcher.session("https://realtime.oxylabs.io/"))
+
+    def test_reset_after_fork(self):
+        session = self.fetcher.session(self.url)
+        self.fetcher.reset_after_fork()
+
+        self.assertEqual(self.fetcher.stats(), {})
+        self.assertIsNot(session, self.fetcher.session(self.url))
+
+
+class TestLatencyWindow(TestCase):
+    def test_percentile(self):
+        window = LatencyWindow(size=100, min_samples=10)
+        for i in range(9):
+            window.add(i / 10)
+        self.assertEqual(window.percentile(0.9, default=2.0), 2.0)
+
+        for i in range(9, 200):
+            window.add(i / 10)
+        # only the last 100 samples (10.0 .. 19.9) are kept
+        self.assertEqual(window.percentile(0.5, default=2.0), 15.0)
+        self.assertEqual(window.percentile(1.0, default=2.0), 19.9)
@@ -0,0 +1,58 @@
+import random
+from unittest import TestCase
+
+from src.helpers.geo import GridIndex, distance, radius_box, shop_location
+
+
+class TestGeo(TestCase):
+    def test_distance(self):
+        # a degree of latitude, and a degree of longitude at 60° is about half of it
+        self.assertAlmostEqual(distance(47.0, 28.8, 48.0, 28.8), 111_195, delta=1)
+        self.assertAlmostEqual(distance(60.0, 28.0, 60.0, 29.0), 55_597, delta=10)
+        self.assertEqual(distance(47.0, 28.8, 47.0, 28.8), 0.0)
+
+    def test_radius_box_holds_the_circle(self):
+        lon_min, lat_min, lon_max, lat_max = radius_box(47.0, 28.8, 1000)
+
+        self.assertGreaterEqual(distance(47.0, 28.8, 47.0, lon_max), 1000)
+        self.assertGreaterEqual(distance(47.0, 28.8, lat_min, 28.8), 999.9)
+        self.assertLess(lon_min, 28.8)
+        self.assertGreater(lat_max, 47.0)
+
+    def test_shop_location(self):
+        self.assertEqual(
+            shop_location({"osm_data": {"lat": "47.01", "lon": "28.86"}}), (47.01, 28.86)
+        )
+        self.assertIsNone(shop_location({"osm_data": {"lat": "", "lon": "28.86"}}))
+        self.assertIsNone(shop_location({"osm_data": {"lat": "147", "lon": "28.86"}}))
+        self.assertIsNone(shop_location({"address": "str. Ismail 1"}))
+
+
+class TestGridIndex(TestCase):
+    def setUp(self):
+        rnd = random.Random(7)
+        self.points = [
+            (46.95 + rnd.random() * 0.12, 28.77 + rnd.random() * 0.13, str(i))
+            for i in range(2000)
+        ]
+        self.grid = GridIndex()
+        self.grid.extend(self.points)
+
+    def brute_force(self, lat, lon, k, radius):
+        found = sorted(
+            (distance(lat, lon, point_lat, point_lon), item)
+            for point_lat, point_lon, item in self.points
+        )
+        return [(meters, item) for meters, item in found if meters <= radius][:k]
+
+    def test_nearest_as_a_full_scan(self):
+        for lat, lon in [(47.0, 28.83), (46.95, 28.77), (47.2, 28.83)]:
+            for k, radius in [(1, 500), (10, 5000), (50, 50000)]:
+                self.assertEqual(
+                    self.grid.nearest(lat, lon, k, radius),
+                    self.brute_force(lat, lon, k, radius),
+                )
+
+    def test_empty(self):
+        self.assertEqual(GridIndex().nearest(47.0, 28.83, 10, 5000), [])
+        self.assertEqual(self.grid.nearest(47.0, 28.83, 0, 5000), [])
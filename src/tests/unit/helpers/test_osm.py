@@ -1,7 +1,26 @@
+import os
+import tempfile
 from unittest import TestCase
 from unittest.mock import patch, MagicMock
 
-from src.helpers.osm import get_osm_id, lookup_osm_data, validate_osm_url, parse_osm_url
+import requests
+
+from src.adapters.osm_cache.sqlite import SQLiteOsmCacheBackend
+from src.helpers.osm import (
+    OsmLookupCache,
+    OsmLookupError,
+    TokenBucket,
+    default_osm_cache,
+    get_osm_id,
+    lookup_osm_data,
+    lookup_osm_data_many,
+    query_nominatim_many,
+    validate_osm_url,
+    parse_osm_url,
+)
+
+NOW = 1_700_000_000.0
+SHOP = {"display_name": "Linella", "lat": "47.01", "lon": "28.86"}
 
 
 class TestOsm(TestCase):
@@ -12,6 +31,7 @@ class TestOsm(TestCase):
 
     @patch("src.helpers.osm._nominatim")
     def test_lookup_osm_data(self, mock_nominatim):
+        default_osm_cache().clear()
         mock_elem = MagicMock()
         mock_elem.placeId.return_value = 12345
         mock_elem.type.return_value = "node"
@@ -28,9 +48,54 @@ class TestOsm(TestCase):
         self.assertEqual(result["display_name"], "Test Place")
 
         # Test empty result
+        default_osm_cache().clear()
         mock_nominatim.query.return_value = []
         self.assertEqual(lookup_osm_data("node", "123"), {})
 
+    @patch("src.helpers.osm.nominatim_rate")
+    @patch("src.helpers.osm._nominatim")
+    def test_lookup_osm_data_many(self, mock_nominatim, mock_rate):
+        default_osm_cache().clear()
+
+        def element(osm_type, osm_id):
+            elem = MagicMock()
+            elem.type.return_value = osm_type
+            elem.id.return_value = osm_id
+            elem.displayName.return_value = f"{osm_type} {osm_id}"
+            elem.tag.return_value = None
+            return elem
+
+        mock_nominatim.query.side_effect = lambda *osm_ids, lookup: [
+            element("node" if osm_id[0] == "N" else "way", int(osm_id[1:]))
+            for osm_id in osm_ids
+            if osm_id != "N99"
+        ]
+        osm_ids = [f"n{i}" for i in range(60)] + ["W7", "N99", "N1"]
+
+        result = lookup_osm_data_many(osm_ids)
+
+        self.assertEqual(list(result), [f"N{i}" for i in range(60)] + ["W7", "N99"])
+        self.assertEqual(result["W7"]["display_name"], "way 7")
+        self.assertEqual(result["N99"], {})
+        # 62 ids, 50 per request, each request rate limited
+        self.assertEqual(
+            [len(call.args) for call in mock_nominatim.query.call_args_list], [50, 12]
+        )
+        self.assertEqual(mock_rate.acquire.call_count, 2)
+
+        # the lookups are cached
+        self.assertEqual(lookup_osm_data("way", "7")["display_name"], "way 7")
+        self.assertEqual(lookup_osm_data_many(["N5", "N99"])["N5"]["osm_id"], 5)
+        self.assertEqual(mock_nominatim.query.call_count, 2)
+
+    @patch("src.helpers.osm.nominatim_rate")
+    @patch("src.helpers.osm._nominatim")
+    def test_query_nominatim_many_unreadable_response(self, mock_nominatim, _):
+        mock_nominatim.query.side_effect = KeyError("features")
+
+        with self.assertRaises(OsmLookupError):
+            query_nominatim_many(["N1", "N2"])
+
     def test_validate_osm_url(self):
         self.assertTrue(validate_osm_url("https://www.openstreetmap.org/node/123"))
         self.assertFalse(validate_osm_url("https://www.example.com/node/123"))
@@ -41,3 +106,167 @@ class TestOsm(TestCase):
         )
         with self.assertRaises(ValueError):
             parse_osm_url("https://www.example.com/node/123")
+
+
+class _SyncThread:
+    """Runs the target on start, for the background refreshes."""
+
+    def __init__(self, target, args, daemon):
+        self.target = target
+        self.args = args
+        self.daemon = daemon
+
+    def start(self):
+        self.target(*self.args)
+
+
+@patch("src.helpers.osm.time.time")
+class TestOsmLookupCache(TestCase):
+    def setUp(self):
+        self.cache = OsmLookupCache(ttl=100, negative_ttl=10, stale_ttl=50, max_size=2)
+        self.fetch = MagicMock(return_value=SHOP)
+
+    def test_lookup_is_fetched_once(self, mock_time):
+        mock_time.return_value = NOW
+        self.assertEqual(self.cache.get("N1", self.fetch), SHOP)
+        mock_time.return_value = NOW + 99
+        self.assertEqual(self.cache.get("N1", self.fetch), SHOP)
+
+        self.fetch.assert_called_once_with("N1")
+        self.assertEqual(self.cache.metrics()["hits"], 1)
+
+    def test_unknown_id_is_kept_for_negative_ttl(self, mock_time):
+        mock_time.return_value = NOW
+        self.fetch.return_value = {}
+        self.assertEqual(self.cache.get("N1", self.fetch), {})
+        self.assertEqual(self.cache.get("N1", self.fetch), {})
+        self.assertEqual(self.fetch.call_count, 1)
+
+        mock_time.return_value = NOW + 10
+        self.cache.get("N1", self.fetch)
+        self.assertEqual(self.fetch.call_count, 2)
+
+    @patch("src.helpers.osm.threading.Thread", _SyncThread)
+    def test_stale_lookup_is_returned_and_refreshed(self, mock_time):
+        mock_time.return_value = NOW
+        self.cache.get("N1", self.fetch)
+
+        mock_time.return_value = NOW + 120
+        self.fetch.return_value = {**SHOP, "display_name": "Linella 2"}
+        self.assertEqual(self.cache.get("N1", self.fetch), SHOP)
+        self.assertEqual(self.cache.get("N1", self.fetch)["display_name"], "Linella 2")
+        self.assertEqual(self.fetch.call_count, 2)
+
+        # too old to be returned while fetching
+        mock_time.return_value = NOW + 120 + 150
+        self.fetch.return_value = {**SHOP, "display_name": "Linella 3"}
+        self.assertEqual(self.cache.get("N1", self.fetch)["display_name"], "Linella 3")
+
+    def test_failed_request_is_not_cached(self, mock_time):
+        mock_time.return_value = NOW
+        self.fetch.side_effect = requests.exceptions.ConnectionError()
+        self.assertEqual(self.cache.get("N1", self.fetch), {})
+
+        self.fetch.side_effect = None
+        self.assertEqual(self.cache.get("N1", self.fetch), SHOP)
+
+        # the last known data is kept when the refresh fails
+        mock_time.return_value = NOW + 1000
+        self.fetch.side_effect = requests.exceptions.ConnectionError()
+        self.assertEqual(self.cache.get("N1", self.fetch), SHOP)
+
+    def test_lookups_persist_in_the_backend(self, mock_time):
+        mock_time.return_value = NOW
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "osm.sqlite")
+            OsmLookupCache(SQLiteOsmCacheBackend(path), ttl=100).get("N1", self.fetch)
+
+            # another process, or this one after a restart
+            cache = OsmLookupCache(SQLiteOsmCacheBackend(path), ttl=100)
+            self.assertEqual(cache.get("N1", self.fetch), SHOP)
+            self.assertEqual(cache.get("N1", self.fetch), SHOP)
+
+        self.fetch.assert_called_once()
+
+    def test_get_many_fetches_the_missing_ids_in_chunks(self, mock_time):
+        mock_time.return_value = NOW
+        self.cache.put("N1", SHOP)
+        fetch_many = MagicMock(
+            side_effect=[{"N2": SHOP}, requests.exceptions.ConnectionError()]
+        )
+
+        result = self.cache.get_many(["N1", "N2", "N3", "N4"], fetch_many, chunk_size=2)
+
+        self.assertEqual(result, {"N1": SHOP, "N2": SHOP, "N3": {}, "N4": {}})
+        self.assertEqual(
+            [call.args[0] for call in fetch_many.call_args_list], [["N2", "N3"], ["N4"]]
+        )
+        # N3 is unknown to Nominatim, N4 failed and is fetched again
+        fetch_many.side_effect = None
+        fetch_many.return_value = {"N4": SHOP}
+        result = self.cache.get_many(["N3", "N4"], fetch_many, chunk_size=2)
+        self.assertEqual(result, {"N3": {}, "N4": SHOP})
+        fetch_many.assert_called_with(["N4"])
+
+    def test_get_many_unreadable_response_is_not_cached(self, mock_time):
+        mock_time.return_value = NOW
+        fetch_many = MagicMock(side_effect=OsmLookupError("unexpected response"))
+
+        self.assertEqual(
+            self.cache.get_many(["N1", "N2"], fetch_many), {"N1": {}, "N2": {}}
+        )
+
+        fetch_many.side_effect = None
+        fetch_many.return_value = {"N1": SHOP}
+        self.assertEqual(
+            self.cache.get_many(["N1", "N2"], fetch_many), {"N1": SHOP, "N2": {}}
+        )
+        self.assertEqual(fetch_many.call_count, 2)
+
+    @patch("src.helpers.osm.threading.Thread", _SyncThread)
+    def test_get_many_refreshes_stale_ids_in_the_background(self, mock_time):
+        mock_time.return_value = NOW
+        self.cache.put("N1", SHOP)
+        self.cache.put("N2", SHOP)
+
+        mock_time.return_value = NOW + 120
+        fetch_many = MagicMock(return_value={"N1": {**SHOP, "display_name": "Linella 2"}})
+        # the stale data is returned, the refresh is a single request
+        self.assertEqual(
+            self.cache.get_many(["N1", "N2"], fetch_many), {"N1": SHOP, "N2": SHOP}
+        )
+        fetch_many.assert_called_once_with(["N1", "N2"])
+        self.assertEqual(
+            self.cache.get_many(["N1"], fetch_many)["N1"]["display_name"], "Linella 2"
+        )
+        self.assertEqual(self.cache.metrics()["refreshes"], 2)
+
+    def test_least_recently_used_are_dropped(self, mock_time):
+        mock_time.return_value = NOW
+        for osm_id in ["N1", "N2", "N1", "N3"]:
+            self.cache.get(osm_id, self.fetch)
+        self.assertEqual(self.cache.metrics()["size"], 2)
+
+        self.cache.get("N2", self.fetch)
+        self.assertEqual(
+            [call.args[0] for call in self.fetch.call_args_list], ["N1", "N2", "N3", "N2"]
+        )
+
+
+@patch("src.helpers.osm.time.sleep")
+@patch("src.helpers.osm.time.monotonic")
+class TestTokenBucket(TestCase):
+    def test_waits_for_the_tokens(self, mock_monotonic, mock_sleep):
+        mock_monotonic.return_value = 100.0
+        bucket = TokenBucket(rate=2.0, capacity=2.0)
+
+        for _ in range(4):
+            bucket.acquire()
+
+        # 2 tokens at hand, then one every 0.5 s
+        self.assertEqual([call.args[0] for call in mock_sleep.call_args_list], [0.5, 1.0])
+
+        mock_sleep.reset_mock()
+        mock_monotonic.return_value = 110.0
+        bucket.acquire()
+        mock_sleep.assert_not_called()
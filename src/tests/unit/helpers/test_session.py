@@ -21,7 +21,7 @@ class TestSession(TestCase):
 
     @patch("src.helpers.session.init_db_session")
     def test_validate_missing_session(self, mock_db_session):
-        mock_db_session.return_value.read_one.return_value = None
+        mock_db_session.return_value.table.return_value.read_one.return_value = None
         cookie = UserSessionCookie(
             session_id=UUID(SESSION_ID), identity_provider=IdentityProvider.GOOGLE
         )
@@ -30,7 +30,7 @@ class TestSession(TestCase):
 
     @patch("src.helpers.session.init_db_session")
     def test_validate_expired_session(self, mock_db_session):
-        mock_db_session.return_value.read_one.return_value = {
+        mock_db_session.return_value.table.return_value.read_one.return_value = {
             "_id": "1",
             "user_id": "test",
             "created_at": (
@@ -45,7 +45,7 @@ class TestSession(TestCase):
 
     @patch("src.helpers.session.init_db_session")
     def test_validate_session(self, mock_db_session):
-        mock_db_session.return_value.read_one.return_value = {
+        mock_db_session.return_value.table.return_value.read_one.return_value = {
             "_id": SESSION_ID,
             "user_id": USER_ID_1,
             "user_name": "John Doe",
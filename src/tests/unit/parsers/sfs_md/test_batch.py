@@ -0,0 +1,52 @@
+import os
+from unittest import TestCase
+from uuid import UUID
+
+from src.parsers.sfs_md.batch import ParseError, parse_many
+from src.tests import load_stub_file, USER_ID_1
+from src.tests.stubs.receipts.sfs_md.expected_objects import (
+    LIN_RECEIPT,
+    KL_RECEIPT,
+    LIN_RECEIPT_2,
+    NANU_RECEIPT,
+)
+
+EXPECTED_RECEIPTS = {
+    "kaufland.html": KL_RECEIPT,
+    "linella.html": LIN_RECEIPT,
+    "linella2.html": LIN_RECEIPT_2,
+    "nanu.html": NANU_RECEIPT,
+}
+INVALID_URL = "https://mev.sfs.md/receipt-verifier/invalid"
+
+
+class TestParseMany(TestCase):
+    def setUp(self):
+        self.user_id = UUID(USER_ID_1)
+        self.pages = []
+        self.expected = []
+        for name, receipt in EXPECTED_RECEIPTS.items():
+            page = load_stub_file(os.path.join("receipts", "sfs_md", name))
+            self.pages.append((self.user_id, receipt.receipt_url, page))
+            self.expected.append(receipt)
+        self.pages.insert(1, (self.user_id, INVALID_URL, "<html></html>"))
+
+    def _assert_results(self, results, repeat=1):
+        self.assertEqual(len(results), 5 * repeat)
+        for i in range(repeat):
+            batch = results[i * 5 : (i + 1) * 5]
+            self.assertIsInstance(batch[1], ParseError)
+            self.assertEqual(batch[1].url, INVALID_URL)
+            self.assertEqual(batch[:1] + batch[2:], self.expected)
+
+    def test_serial(self):
+        self._assert_results(list(parse_many(self.pages)))
+
+    def test_process_pool_keeps_order(self):
+        results = list(
+            parse_many(self.pages * 3, max_workers=2, chunk_size=2, serial_batch_size=0)
+        )
+        self._assert_results(results, repeat=3)
+
+    def test_empty(self):
+        self.assertEqual(list(parse_many([])), [])
@@ -3,8 +3,12 @@ from unittest import TestCase
 from unittest.mock import Mock
 from uuid import UUID
 
-from src.parsers.sfs_md.receipt_parser import SfsMdReceiptParser
-from src.tests import load_stub_file, USER_ID_1
+from src.parsers.sfs_md.receipt_parser import (
+    SfsMdReceiptParser,
+    extract_receipt_data,
+    resolve_receipt_id,
+)
+from src.tests import load_stub_file, get_stub_file_path, USER_ID_1
 from src.tests.stubs.receipts.sfs_md.expected_objects import (
     LIN_RECEIPT,
     KL_RECEIPT,
@@ -43,6 +47,51 @@ class TestSfsMdReceiptParser(TestCase):
                     expected,
                 )
 
+    def test_to_json_is_cached(self):
+        """Test that the built receipt is serialized once in JSON mode"""
+        parser = SfsMdReceiptParser(
+            Mock(), UUID(USER_ID_1), KL_RECEIPT.receipt_url, Mock()
+        )
+        parser.parse_html(load_stub_file(KL_RECEIPT_PATH)).build_receipt()
+
+        receipt_json = parser.to_json()
+
+        self.assertEqual(receipt_json, KL_RECEIPT.model_dump(mode="json"))
+        self.assertIs(parser.to_json(), receipt_json)
+        self.assertIsNot(parser.build_receipt().to_json(), receipt_json)
+
+    def test_parse_bytes(self):
+        """Test parsing raw response bytes gives the same receipt as str"""
+        logger = Mock()
+        db_api = Mock()
+        with open(get_stub_file_path(KL_RECEIPT_PATH), "rb") as file:
+            page = file.read()
+
+        parser = SfsMdReceiptParser(
+            logger, UUID(USER_ID_1), KL_RECEIPT.receipt_url, db_api
+        )
+
+        self.assertEqual(parser.parse_html(page).build_receipt().receipt, KL_RECEIPT)
+
+    def test_extract_receipt_data_skips_other_components(self):
+        """Test that only the receipt component payload is extracted and unescaped"""
+        page = (
+            '<div wire:initial-data="{&quot;name&quot;:&quot;livewire-ui-modal&quot;}">'
+            '<div wire:initial-data="{&quot;name&quot;:&quot;receipt.index-component&quot;,'
+            '&quot;shop&quot;:&quot;A &amp; B &lt;&#039;x&#039;&gt;&quot;}"></div>'
+        )
+        expected = '{"name":"receipt.index-component","shop":"A & B <\'x\'>"}'
+
+        self.assertEqual(extract_receipt_data(page), expected)
+        self.assertEqual(extract_receipt_data(page.encode()), expected.encode())
+
+    def test_extract_receipt_data_missing(self):
+        """Test that pages without the receipt component return None"""
+        for page in ["", '<div wire:initial-data="{}">', '<div wire:initial-data="{']:
+            with self.subTest(page=page):
+                self.assertIsNone(extract_receipt_data(page))
+                self.assertIsNone(extract_receipt_data(page.encode()))
+
     def test_parse_invalid_html_missing_receipt_data(self):
         """Test parsing HTML without receipt data raises ValueError"""
         logger = Mock()
@@ -216,9 +265,10 @@ class TestSfsMdReceiptParser(TestCase):
         result = parser.persist()
 
         db_api.assert_called_once_with(
-            "/receipt/get-or-create", "POST", parser.receipt.model_dump()
+            "/receipt/get-or-create", "POST", parser.receipt.model_dump(mode="json")
         )
         self.assertEqual(result, parser.receipt)
+        self.assertIs(parser.to_json(), db_api.call_args.args[2])
 
     def test_get_receipt_calls_db_api(self):
         """Test that get_receipt method calls the database API"""
@@ -232,10 +282,62 @@ class TestSfsMdReceiptParser(TestCase):
         result = parser.get_receipt()
 
         db_api.assert_called_once_with(
-            "/receipt/get-by-url", "POST", {"url": LIN_RECEIPT.receipt_url}
+            "/receipt/get-by-id", "POST", {"id": LIN_RECEIPT.id}
+        )
+        self.assertEqual(result, LIN_RECEIPT)
+
+    def test_get_receipt_miss_by_id_is_final(self):
+        """Test that a receipt not found by id isn't looked up by URL as well"""
+        db_api = Mock(return_value=None)
+
+        parser = SfsMdReceiptParser(
+            Mock(), UUID(USER_ID_1), LIN_RECEIPT.receipt_url, db_api
+        )
+
+        self.assertIsNone(parser.get_receipt())
+        db_api.assert_called_once_with(
+            "/receipt/get-by-id", "POST", {"id": LIN_RECEIPT.id}
         )
+
+    def test_get_receipt_by_url_for_hash_urls(self):
+        """Test that URLs without the receipt id are looked up by URL"""
+        db_api = Mock()
+        db_api.return_value = LIN_RECEIPT.model_dump()
+        url = "https://mev.sfs.md/receipt-verifier/6747480235B70F66FBD7F12ADD2961D2"
+
+        parser = SfsMdReceiptParser(Mock(), UUID(USER_ID_1), url, db_api)
+        result = parser.get_receipt()
+
+        db_api.assert_called_once_with("/receipt/get-by-url", "POST", {"url": url})
         self.assertEqual(result, LIN_RECEIPT)
 
+    def test_resolve_receipt_id(self):
+        """Test that the receipt id is computed from every canonical URL shape"""
+        urls = [
+            LIN_RECEIPT_URL,
+            LIN_RECEIPT_URL + "/",
+            LIN_RECEIPT_URL + "?lang=ro#receipt",
+            "https://sift-mev.sfs.md/receipt/J403001576/118.04/135932/2024-01-17",
+            "https://mev.sfs.md/ro/receipt-verifier/J403001576/118.04/135932/2024-01-17",
+            " https://mev.sfs.md/en/receipt-verifier/j403001576/118.04/135932/2024-01-17",
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(resolve_receipt_id(url), LIN_RECEIPT.id)
+
+    def test_resolve_receipt_id_unresolvable(self):
+        """Test that hash-form and foreign URLs don't resolve to an id"""
+        urls = [
+            "https://mev.sfs.md/receipt-verifier/6747480235B70F66FBD7F12ADD2961D2",
+            "http://mev.sfs.md/receipt-verifier/J403001576/118.04/135932/2024-01-17",
+            "https://example.com/receipt-verifier/J403001576/118.04/135932/2024-01-17",
+            "https://mev.sfs.md/receipt-verifier/J403001576/118.04/135932",
+            "",
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertIsNone(resolve_receipt_id(url))
+
     def test_parse_chain_methods(self):
         """Test that parse_html and build_receipt can be chained"""
         logger = Mock()
@@ -0,0 +1,51 @@
+import json
+from unittest import TestCase
+
+from benchmarks.fixtures import load_stub_pages, make_large_page
+from benchmarks.suite import compare, measure, summarize
+from src.parsers.sfs_md.receipt_parser import SfsMdReceiptParser, extract_receipt_data
+from src.tests import USER_ID_1
+
+
+def make_results(p50: float, p99: float) -> dict:
+    return {"results": {"parse_html": {"kaufland": {"p50_us": p50, "p99_us": p99}}}}
+
+
+class TestBenchmarks(TestCase):
+    def test_make_large_page(self):
+        url, page = load_stub_pages()["kaufland"]
+        large_page = make_large_page(page, 100)
+
+        parser = SfsMdReceiptParser(None, USER_ID_1, url, None).parse_html(large_page)
+        receipt = parser.build_receipt().receipt
+
+        self.assertEqual(len(receipt.purchases), 100)
+        self.assertEqual(
+            json.loads(extract_receipt_data(page))["fingerprint"],
+            json.loads(extract_receipt_data(large_page))["fingerprint"],
+        )
+
+    def test_summarize(self):
+        summary = summarize([1000 * i for i in range(1, 101)], 2048)
+        self.assertEqual(summary["iterations"], 100)
+        self.assertEqual(summary["p50_us"], 50.5)
+        self.assertEqual(summary["p99_us"], 99.0)
+        self.assertEqual(summary["peak_alloc_kb"], 2.0)
+
+    def test_measure_peak_alloc_of_a_call(self):
+        timings, peak_bytes = measure(lambda: bytearray(1_000_000), 3)
+
+        self.assertEqual(len(timings), 3)
+        # the allocation of the call, not the memory of the process
+        self.assertGreaterEqual(peak_bytes, 1_000_000)
+        self.assertLess(peak_bytes, 1_100_000)
+
+    def test_compare(self):
+        base = make_results(100.0, 200.0)
+
+        self.assertEqual(compare(base, make_results(105.0, 210.0), 0.1), [])
+        self.assertEqual(
+            compare(base, make_results(150.0, 210.0), 0.1),
+            ["parse_html kaufland p50_us: 100.0 -> 150.0 (+50%)"],
+        )
+        self.assertEqual(compare({"results": {}}, make_results(150.0, 210.0), 0.1), [])
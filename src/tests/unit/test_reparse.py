@@ -0,0 +1,153 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+from uuid import UUID
+
+from benchmarks.fixtures import load_stub_pages
+from reparse import RateLimiter, Reparser, load_checkpoint
+from src.adapters.db.base import WriteError
+from src.adapters.archive.filesystem import FilesystemArchiveBackend
+from src.helpers.archive import PageArchive
+from src.schemas.common import Operator
+from src.tests.stubs.receipts.sfs_md.expected_objects import (
+    KL_RECEIPT,
+    LIN_RECEIPT,
+    NANU_RECEIPT,
+)
+
+
+def keyset(rows, where):
+    """The rows after the id of a (Operator.GT, id) where, like the backends."""
+    if where is None:
+        return rows
+    _, last_id = where["id"]
+    return [row for row in rows if row["id"] > last_id]
+
+
+SHOP_ID = "0e3b7b0e-6a55-4c8c-9a57-2c4a2f1fd8a1"
+ITEM_ID = "5f0f6b43-2b8e-4d0a-9a56-0a2f3b8f1c11"
+
+
+class TestReparser(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.checkpoint = os.path.join(self.tmp_dir, "checkpoint.json")
+        self.archive = PageArchive(FilesystemArchiveBackend(self.tmp_dir))
+        for url, page in load_stub_pages().values():
+            self.archive.put(url, page)
+
+        kaufland = KL_RECEIPT.model_dump()
+        # an old parser got the company name wrong, the receipt was linked since
+        linella = LIN_RECEIPT.model_dump()
+        linella["company_name"] = "old name"
+        linella["shop_id"] = UUID(SHOP_ID)
+        linella["purchases"][0]["item_id"] = UUID(ITEM_ID)
+        nanu = NANU_RECEIPT.model_dump()
+        nanu["receipt_url"] += "?not-archived"
+
+        rows = [nanu, linella, kaufland]
+        self.db_session = MagicMock()
+        self.receipts = self.db_session.table.return_value
+        self.receipts.iter_many.side_effect = lambda where, **_: iter(
+            sorted(keyset(rows, where), key=lambda row: row["id"])
+        )
+        self.receipts.count.side_effect = lambda where: len(keyset(rows, where))
+        self.receipts.upsert_many.side_effect = lambda batch: [row["id"] for row in batch]
+        self.logger = MagicMock()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_dry_run_report(self):
+        report = io.StringIO()
+        reparser = Reparser(
+            self.db_session, self.archive, self.logger, self.checkpoint, report
+        )
+
+        counts = reparser.run()
+
+        self.assertEqual(
+            counts,
+            {"processed": 3, "changed": 1, "written": 0, "failed": 0, "missing": 1},
+        )
+        lines = [json.loads(line) for line in report.getvalue().splitlines()]
+        self.assertEqual(
+            lines,
+            [
+                {
+                    "id": LIN_RECEIPT.id,
+                    "changes": {"company_name": ["old name", LIN_RECEIPT.company_name]},
+                }
+            ],
+        )
+        self.receipts.upsert_many.assert_not_called()
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_changed_receipts_are_written(self):
+        reparser = Reparser(self.db_session, self.archive, self.logger, self.checkpoint)
+
+        counts = reparser.run(batch_size=1)
+
+        self.assertEqual(counts["written"], 1)
+        self.receipts.upsert_many.assert_called_once()
+        self.receipts.iter_many.assert_called_once_with(None, batch_size=1, order_by="id")
+        [data] = self.receipts.upsert_many.call_args.args[0]
+        self.assertEqual(data["company_name"], LIN_RECEIPT.company_name)
+        # fields set after parsing are kept
+        self.assertEqual(data["shop_id"], SHOP_ID)
+        self.assertEqual(data["purchases"][0]["item_id"], ITEM_ID)
+        self.assertEqual(
+            load_checkpoint(self.checkpoint),
+            max(KL_RECEIPT.id, LIN_RECEIPT.id, NANU_RECEIPT.id),
+        )
+
+    def test_resume_from_checkpoint(self):
+        with open(self.checkpoint, "w", encoding="utf-8") as file:
+            json.dump({"last_id": LIN_RECEIPT.id}, file)
+        reparser = Reparser(self.db_session, self.archive, self.logger, self.checkpoint)
+
+        counts = reparser.run()
+
+        self.assertEqual(
+            counts["processed"],
+            len([i for i in (KL_RECEIPT.id, NANU_RECEIPT.id) if i > LIN_RECEIPT.id]),
+        )
+        # only the receipts after the checkpoint are read
+        self.assertEqual(
+            self.receipts.iter_many.call_args.args[0],
+            {"id": (Operator.GT, LIN_RECEIPT.id)},
+        )
+        self.receipts.upsert_many.assert_not_called()
+
+    def test_write_errors_are_counted(self):
+        self.receipts.upsert_many.side_effect = lambda batch: [
+            WriteError(row["id"], "conflict") for row in batch
+        ]
+        reparser = Reparser(self.db_session, self.archive, self.logger, self.checkpoint)
+
+        counts = reparser.run()
+
+        self.assertEqual((counts["written"], counts["failed"]), (0, 1))
+        self.logger.warning.assert_called_once()
+
+
+@patch("reparse.time.sleep")
+@patch("reparse.time.monotonic", return_value=100.0)
+class TestRateLimiter(TestCase):
+    def test_no_limit(self, _, mock_sleep):
+        limiter = RateLimiter(None)
+        for _ in range(3):
+            limiter.wait(1000)
+        mock_sleep.assert_not_called()
+
+    def test_limit(self, _, mock_sleep):
+        limiter = RateLimiter(100)
+        limiter.wait(50)
+        mock_sleep.assert_not_called()
+        # the first 50 rows take half a second at 100 rows/s
+        limiter.wait(50)
+        mock_sleep.assert_called_once_with(0.5)